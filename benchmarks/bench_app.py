@@ -0,0 +1,119 @@
+"""Premier affichage et relances de my_data_app.py, page par page, dans un interpréteur neuf
+
+Pour chaque page, un processus séparé importe le banc d'essai de Streamlit (AppTest, donc streamlit
+lui-même), puis mesure le premier passage du script (imports de la page compris, comme à la première
+session d'un serveur), la médiane des durées d'exécution du script lors des relances suivantes, les
+octets des éléments envoyés au navigateur et les modules lourds chargés. Un premier passage de chaque page est fait au préalable
+pour que les profils, agrégats et l'entrepôt d'annonces soient déjà construits. --ref mesure aussi
+l'application telle qu'elle était à une révision git donnée (arbre extrait dans un dossier temporaire).
+Usage : python benchmarks/bench_app.py [--reruns 10] [--ref 658b1fa]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_startup import extract_tree
+
+PAGES = ['Accueil', 'Scraping', 'Téléchargement', 'Dashboard', 'Évaluation']
+LOURDS = ['pandas', 'numpy', 'pyarrow', 'plotly.express', 'requests', 'bs4']
+
+MEASURE = '''
+import json, os, statistics, sys, time
+os.chdir({root!r})
+from streamlit.runtime.scriptrunner import script_runner
+from streamlit.testing.v1 import AppTest
+
+# Durée d'exécution du script lui-même (sans l'attente du banc d'essai, qui scrute la fin toutes les ms)
+script_times = []
+_exec = script_runner.exec_func_with_error_handling
+
+
+def timed_exec(func, ctx):
+    start = time.perf_counter()
+    try:
+        return _exec(func, ctx)
+    finally:
+        script_times.append(time.perf_counter() - start)
+
+
+script_runner.exec_func_with_error_handling = timed_exec
+
+
+def payload(node):
+    """Octets des éléments (protobuf) de l'arbre rendu"""
+    children = getattr(node, 'children', None)
+    if isinstance(children, dict):
+        return sum(payload(child) for child in children.values())
+    proto = getattr(node, 'proto', None)
+    return proto.ByteSize() if proto is not None else 0
+
+
+at = AppTest.from_file(os.path.join({root!r}, 'my_data_app.py'), default_timeout=300)
+at.session_state.current_page = {page!r}
+before = set(sys.modules)
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+loaded = [name for name in {lourds!r} if name in sys.modules and name not in before]
+errors = [str(e.value) for e in at.exception]
+for _ in range({reruns}):
+    at.run()
+print(json.dumps({{'premier_s': first, 'premier_script_s': script_times[0],
+                  'relance_s': statistics.median(script_times[1:]) if {reruns} else None,
+                  'octets': payload(at._tree), 'modules': loaded, 'erreurs': errors}}))
+'''
+
+
+def measure(root, page, reruns):
+    code = MEASURE.format(root=root, page=page, reruns=reruns, lourds=LOURDS)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_tree(label, root, reruns):
+    print(label)
+    for page in PAGES:
+        # Passage préalable : fichiers annexes (profils, agrégats) et entrepôt construits
+        measure(root, page, 0)
+    results = {}
+    for page in PAGES:
+        r = results[page] = measure(root, page, reruns)
+        print(f"  {page:<15} premier passage {r['premier_s'] * 1000:5.0f} ms (script {r['premier_script_s'] * 1000:4.0f} ms)  "
+              f"relance {r['relance_s'] * 1000:5.1f} ms  {r['octets'] / 1024:5.1f} Ko  "
+              f"modules {', '.join(r['modules']) or '-'}")
+        for error in r['erreurs']:
+            print(f"    erreur : {error}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=10)
+    parser.add_argument('--ref', help="révision git de l'application de référence")
+    args = parser.parse_args()
+
+    current = bench_tree('Application actuelle', ROOT, args.reruns)
+    if not args.ref:
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        extract_tree(args.ref, tmp)
+        # Jeux de données non suivis (Parquet, profils) recopiés : seul le code diffère
+        shutil.copytree(os.path.join(ROOT, 'data'), os.path.join(tmp, 'data'), dirs_exist_ok=True)
+        reference = bench_tree(f'Application @{args.ref}', tmp, args.reruns)
+
+    print("Gain (référence / actuelle)")
+    for page in PAGES:
+        old, new = reference[page], current[page]
+        print(f"  {page:<15} premier passage x{old['premier_s'] / new['premier_s']:.2f}  "
+              f"relance x{old['relance_s'] / new['relance_s']:.2f}  octets x{old['octets'] / new['octets']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
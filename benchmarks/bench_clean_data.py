@@ -0,0 +1,109 @@
+"""Compare l'ancien clean_data et la version vectorisée (cleaning.clean_data) sur des données synthétiques
+
+Chaque mesure tourne dans un processus séparé : temps de nettoyage et pic de mémoire (RSS) ajouté
+par le nettoyage, au-delà du DataFrame d'entrée. Vérifie aussi que les valeurs produites sont identiques.
+Usage : python benchmarks/bench_clean_data.py [--rows 1000000 10000000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cleaning import clean_data
+
+SOURCE = os.path.join(ROOT, 'data', 'data_to_analyse.csv')
+
+
+def legacy_clean_data(dataframe):
+    """clean_data tel qu'écrit à l'origine dans my_data_app.py"""
+    if dataframe.empty:
+        return dataframe
+    df_clean = dataframe.copy()
+    df_clean.drop(columns=['web-scraper-order', 'web-scraper-start-url', 'containers_links', 'containers_links-href'], inplace=True)
+    df_clean["prix_numerique"] = df_clean["prix"].str.replace(r"[^\d]", "", regex=True)
+    df_clean["prix_numerique"] = pd.to_numeric(df_clean["prix_numerique"], errors='coerce')
+    df_clean["annee_numerique"] = df_clean["annee"].str.extract(r"(\d{4})")
+    df_clean["annee_numerique"] = pd.to_numeric(df_clean["annee_numerique"], errors='coerce')
+    df_clean["kilometrage_numerique"] = df_clean["kilometrage"].str.replace(r"[^\d-]", "", regex=True)
+    df_clean["kilometrage_numerique"] = pd.to_numeric(df_clean["kilometrage_numerique"], errors='coerce')
+    df_clean.loc[df_clean["kilometrage_numerique"] < 0, "kilometrage_numerique"] = np.nan
+    return df_clean
+
+
+def synthetic_frame(n_rows, seed=0):
+    """Export Web Scraper synthétique : lignes réelles tirées au hasard, prix et kilométrages variés"""
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(SOURCE)
+    df = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+    prix = rng.integers(5, 400, n_rows) * 50_000
+    df['prix'] = pd.Series(prix).map('{:,} F CFA'.format).str.replace(',', ' ')
+    km = rng.integers(0, 400_000, n_rows)
+    df['kilometrage'] = pd.Series(km).astype(str) + ' km'
+    df['annee'] = 'Année: ' + pd.Series(rng.integers(1990, 2025, n_rows)).astype(str)
+    # Quelques valeurs manquantes ou invalides, comme dans les vrais exports
+    df.loc[rng.random(n_rows) < 0.05, 'kilometrage'] = np.nan
+    df.loc[rng.random(n_rows) < 0.02, 'prix'] = 'Prix sur demande'
+    return df
+
+
+MEASURE = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {bench_dir!r})
+from bench_clean_data import legacy_clean_data, synthetic_frame
+from cleaning import clean_data
+
+def peak_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+
+df = synthetic_frame({rows})
+before = peak_kb()
+start = time.perf_counter()
+result = {func}(df)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'extra_peak_kb': peak_kb() - before,
+                  'result_kb': int(result.memory_usage(deep=True).sum()) // 1024}}))
+'''
+
+
+def measure(func, rows):
+    code = MEASURE.format(root=ROOT, bench_dir=os.path.dirname(os.path.abspath(__file__)), rows=rows, func=func)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_equal(rows=50_000):
+    df = synthetic_frame(rows, seed=1)
+    old, new = legacy_clean_data(df), clean_data(df)
+    for col in ('prix_numerique', 'annee_numerique', 'kilometrage_numerique'):
+        pd.testing.assert_series_equal(old[col].astype('float64'), new[col].astype('float64'), check_names=False)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    print("Valeurs identiques à l'ancien clean_data :", check_equal())
+    for rows in args.rows:
+        print(f"{rows:,} lignes")
+        results = {}
+        for label, func in (('ancien', 'legacy_clean_data'), ('vectorisé', 'clean_data')):
+            results[label] = measure(func, rows)
+            r = results[label]
+            print(f"  {label:<10} {r['seconds']:7.2f}s  pic +{r['extra_peak_kb'] / 1024:8.1f} Mo  "
+                  f"résultat {r['result_kb'] / 1024:8.1f} Mo")
+        print(f"  x{results['ancien']['seconds'] / results['vectorisé']['seconds']:.1f} plus rapide")
+
+
+if __name__ == '__main__':
+    main()
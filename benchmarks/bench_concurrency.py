@@ -0,0 +1,46 @@
+"""Compare le scraping séquentiel et concurrent contre un serveur local avec latence
+
+Usage : python benchmarks/bench_concurrency.py [--pages 40] [--latency 0.2]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import build_pages
+from benchmarks.stub_server import StubServer
+from scraping_functions import scrape_voitures_data
+
+
+def run(pages, latency, concurrency, per_host_limit):
+    with StubServer(build_pages('voitures', pages), latency=latency) as server:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = scrape_voitures_data(pages, concurrency=concurrency, per_host_limit=per_host_limit,
+                                      base_url=server.base_url)
+        elapsed = time.perf_counter() - start
+        return elapsed, len(df), server.max_in_flight
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.2, help='latence par requête en secondes')
+    parser.add_argument('--per-host', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.pages} pages, latence {args.latency}s, limite par hôte {args.per_host}")
+    baseline = None
+    for concurrency in (1, 2, 4, 8):
+        elapsed, rows, in_flight = run(args.pages, args.latency, concurrency, args.per_host)
+        baseline = baseline or elapsed
+        print(f"concurrency={concurrency:<2} {elapsed:6.2f}s  {args.pages / elapsed:6.1f} pages/s  "
+              f"{rows} lignes  max simultanées={in_flight}  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
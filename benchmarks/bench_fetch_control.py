@@ -0,0 +1,73 @@
+"""Scraping contre un serveur local qui injecte des 429, des 503, des réponses lentes et des coupures
+
+Compare le téléchargement sans reprise (une seule tentative) et avec le contrôleur (débit adaptatif,
+reprises avec backoff, Retry-After), puis vérifie que le disjoncteur arrête de solliciter un site en
+panne (une requête test par pause) et signale les pages perdues une fois l'attente maximale dépassée.
+
+Usage : python benchmarks/bench_fetch_control.py [--pages 60] [--latency 0.1]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import build_pages
+from benchmarks.stub_server import StubServer
+from fetch_control import configure_controller
+from http_client import configure_client
+from scraping_functions import scrape_voitures_data
+
+
+FAULTS = {'rate_429': 0.10, 'retry_after': 1, 'rate_503': 0.05, 'rate_slow': 0.05, 'slow_latency': 3.0,
+          'rate_reset': 0.05, 'max_concurrent': 3}
+
+
+def run(pages, latency, faults, max_attempts, concurrency=8, per_host_limit=8):
+    # Délai maximal de 2 s : les réponses lentes (3 s) échouent en délai dépassé
+    configure_client(use_cache=False, timeout=2)
+    # Disjoncteur raccourci (pause de 1 s, 3 s d'attente au plus) pour que le scénario de panne reste bref
+    controller = configure_controller(max_attempts=max_attempts, backoff_base=0.2, circuit_pause=1.0,
+                                      circuit_wait=3.0)
+    with StubServer(build_pages('voitures', pages), latency=latency, faults=faults) as server:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = scrape_voitures_data(pages, concurrency=concurrency, per_host_limit=per_host_limit,
+                                      base_url=server.base_url)
+        elapsed = time.perf_counter() - start
+    skipped = df.attrs['pages_en_erreur']
+    return {
+        'elapsed': elapsed, 'rows': len(df), 'skipped': len(skipped), 'requests': server.requests,
+        'injected': server.injected, 'stats': controller.stats, 'limits': controller.limits(),
+        'reasons': sorted({reason for _, _, reason in skipped}),
+    }
+
+
+def report(label, result, pages):
+    stats = result['stats']
+    print(f"  {label:<28} {result['elapsed']:6.2f}s  {pages - result['skipped']}/{pages} pages  "
+          f"{result['rows']} lignes  {result['requests']} requêtes  {stats['retries']} reprises")
+    print(f"  {'':<28} pannes injectées {result['injected']}  fenêtre finale {result['limits']}")
+    if result['skipped']:
+        print(f"  {'':<28} {result['skipped']} pages signalées perdues : {', '.join(result['reasons'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.1, help='latence par requête en secondes')
+    args = parser.parse_args()
+
+    print(f"{args.pages} pages, latence {args.latency}s, 8 requêtes simultanées demandées, serveur limité à 3")
+    report("sans reprise", run(args.pages, args.latency, FAULTS, max_attempts=1), args.pages)
+    report("contrôleur", run(args.pages, args.latency, FAULTS, max_attempts=4), args.pages)
+
+    print("Site en panne (100 % de 503)")
+    report("contrôleur + disjoncteur", run(args.pages, args.latency, {'rate_503': 1.0}, max_attempts=4), args.pages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Analyse des pages dans un pool de processus : débit selon le nombre de processus et mémoire bornée
+
+1. Analyse seule : pages enregistrées (fixtures.scaled_pages) passées à scraping_functions.parse_pages,
+   dans le thread courant (0) puis avec 1, 2, 4 et 8 processus.
+2. Bout en bout : téléchargements concurrents contre le serveur local, analyse dans le pool.
+3. Mémoire : pic de mémoire Python du processus principal pour N puis 4N pages (contre-pression).
+
+Le gain dépend des cœurs disponibles (affichés en tête) : sur un seul cœur, le pool ne peut pas accélérer.
+Usage : python benchmarks/bench_parse_pool.py [--pages 200] [--backend html.parser] [--processes 1 2 4 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import scaled_pages
+from benchmarks.stub_server import StubServer
+from http_client import configure_client
+from listing_parser import parse_page_compact
+from scraping_functions import get_parser_pool, parse_pages, scrape_voitures_data
+
+
+def warm_up(processes, page, category, backend):
+    """Démarre tous les processus du pool (import des modules) avant la mesure"""
+    if processes:
+        pool = get_parser_pool(processes)
+        list(pool.map(parse_page_compact, [page] * processes * 2, [category] * processes * 2,
+                      [backend] * processes * 2))
+
+
+def parse_only(pages, category, backend, processes):
+    """Renvoie (secondes, lignes) pour analyser des pages déjà téléchargées"""
+    warm_up(processes, pages[0], category, backend)
+    start = time.perf_counter()
+    fetched = ((f'page-{i}', html, None, {}) for i, html in enumerate(pages, start=1))
+    rows = sum(len(rows) for _, rows, _, _ in parse_pages(fetched, category, backend, processes=processes))
+    return time.perf_counter() - start, rows
+
+
+def end_to_end(pages, backend, processes, latency, concurrency):
+    configure_client(use_cache=False)
+    warm_up(processes, pages[0], 'voitures', backend)
+    with StubServer(pages, latency=latency) as server:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = scrape_voitures_data(len(pages), concurrency=concurrency, per_host_limit=concurrency,
+                                      base_url=server.base_url, parser_backend=backend, parser_processes=processes)
+        return time.perf_counter() - start, len(df)
+
+
+def memory_peak(n_pages, category, backend, processes):
+    """Pic de mémoire Python pendant l'analyse de n_pages générées au fil de l'eau"""
+    template = scaled_pages(category, 1)[0]
+    warm_up(processes, template, category, backend)
+    fetched = ((f'page-{i}', template, None, {}) for i in range(n_pages))
+    tracemalloc.start()
+    for _ in parse_pages(fetched, category, backend, processes=processes):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--backend', default='html.parser', help='backend de parsing (html.parser = BeautifulSoup)')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"{cores} cœur(s) disponible(s), backend {args.backend}, {args.pages} pages")
+    pages = scaled_pages('voitures', args.pages)
+
+    print("Analyse seule")
+    base = None
+    for processes in [0, *args.processes]:
+        elapsed, rows = parse_only(pages, 'voitures', args.backend, processes)
+        base = base or elapsed
+        label = 'thread courant' if processes == 0 else f'{processes} processus'
+        print(f"  {label:<15} {elapsed:6.2f}s  {rows / elapsed:8.0f} cartes/s  x{base / elapsed:.2f}")
+
+    print(f"Bout en bout (latence {args.latency}s, {args.concurrency} téléchargements simultanés)")
+    base = None
+    for processes in [0, *args.processes]:
+        elapsed, rows = end_to_end(pages, args.backend, processes, args.latency, args.concurrency)
+        base = base or elapsed
+        label = 'thread courant' if processes == 0 else f'{processes} processus'
+        print(f"  {label:<15} {elapsed:6.2f}s  {len(pages) / elapsed:6.1f} pages/s  {rows} lignes  x{base / elapsed:.2f}")
+
+    print("Mémoire du processus principal (2 processus d'analyse)")
+    for n_pages in (args.pages // 4, args.pages):
+        print(f"  {n_pages:>5} pages  pic {memory_peak(n_pages, 'voitures', args.backend, 2) / 1024 / 1024:6.1f} Mo")
+
+
+if __name__ == '__main__':
+    main()
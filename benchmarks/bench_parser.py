@@ -0,0 +1,108 @@
+"""Débit de parsing (cartes/s) de l'ancien code BeautifulSoup et du moteur listing_parser par backend
+
+Vérifie aussi que chaque backend produit exactement les mêmes lignes que l'ancien code, y compris
+sur une page qui ne contient qu'une seule annonce.
+Usage : python benchmarks/bench_parser.py [--pages 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup as bs
+
+from benchmarks.fixtures import build_pages
+from listing_parser import BACKENDS, CONTAINER_CLASS, parse_listing_page
+
+
+def legacy_parse_page(html, category):
+    """Extraction telle qu'écrite à l'origine dans scrape_*_data (document complet, html.parser)"""
+    data = []
+    soup = bs(html, 'html.parser')
+    for container in soup.select('.listings-cards__list-item'):
+        try:
+            prix_raw = container.select_one('.listing-card__header__price')
+            prix = prix_raw.text.strip() if prix_raw else ''
+            cleaned_price = int(re.sub(r"[^\d]", "", prix)) if prix else None
+
+            titre = container.select_one('.listing-card__header__title a')
+            nom_complet = titre.text.strip().split() if titre else []
+            marque = nom_complet[0] if nom_complet else None
+            annee = nom_complet[-1] if nom_complet else None
+
+            localisation_elem = container.select_one('.entry-zone-address')
+            localisation = localisation_elem.text.strip() if localisation_elem else None
+
+            auteur_elem = container.select_one('.time-author a')
+            publie_par = auteur_elem.text.strip() if auteur_elem else None
+            proprietaire = publie_par[4:] if publie_par else None
+
+            kilometrage = type_boite = carburant = None
+            if category != 'location':
+                for attr in container.select('.listing-card__attribute'):
+                    text = attr.text.strip()
+                    icon = attr.select_one('i')
+                    if icon and 'icon-road-perspective' in icon['class']:
+                        kilometrage = int(text.replace(' km', '').replace(' ', ''))
+                    elif icon and 'icon-gear-icon' in icon['class']:
+                        type_boite = text
+                    elif icon and 'icon-fuel' in icon['class']:
+                        carburant = text
+
+            if category == 'voitures':
+                row = [marque, annee, cleaned_price, localisation, kilometrage, type_boite, carburant, proprietaire]
+            elif category == 'motos':
+                row = [marque, annee, cleaned_price, localisation, kilometrage, proprietaire]
+            else:
+                row = [marque, annee, cleaned_price, localisation, proprietaire]
+            data.append({f'V{i}': value for i, value in enumerate(row, start=1)})
+        except Exception as e:
+            print(f"Erreur interne dans un container: {e}")
+    return data
+
+
+def single_card_page(page):
+    """Page réduite à sa première annonce, suivie seulement de balises fermantes"""
+    first = page.find(CONTAINER_CLASS)
+    second = page.find(CONTAINER_CLASS, first + 1)
+    return page[:page.rfind('<', 0, second)] + '</div></div></body></html>' if second != -1 else page
+
+
+def measure(parse, pages, category):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        rows = [row for page in pages for row in parse(page, category)]
+        elapsed = time.perf_counter() - start
+    return rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    args = parser.parse_args()
+
+    for category in ('voitures', 'motos', 'location'):
+        pages = build_pages(category, args.pages)
+        reference, elapsed = measure(legacy_parse_page, pages, category)
+        base_rate = len(reference) / elapsed
+        print(f"[{category}] {len(reference)} cartes")
+        print(f"  {'ancien code':<12} {base_rate:10.0f} cartes/s")
+        for name in BACKENDS:
+            rows, elapsed = measure(lambda html, cat: parse_listing_page(html, cat, name), pages, category)
+            status = 'identique' if rows == reference else 'DIFFÉRENT'
+            print(f"  {name:<12} {len(rows) / elapsed:10.0f} cartes/s  x{len(rows) / elapsed / base_rate:5.1f}  {status}")
+
+        single = single_card_page(pages[0])
+        reference = legacy_parse_page(single, category)
+        for name in BACKENDS:
+            status = 'identique' if parse_listing_page(single, category, name) == reference else 'DIFFÉRENT'
+            print(f"  {name:<12} page d'une seule annonce : {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Mémoire et temps d'assemblage des lignes scrapées : liste de dicts + pd.DataFrame contre tampon colonnaire
+
+Les lignes viennent de l'analyse des pages enregistrées (fixtures.scaled_pages), page par page,
+comme pendant un crawl : chaque ligne est un nouveau dictionnaire avec ses propres chaînes.
+Chaque méthode tourne dans un processus séparé ; tracemalloc mesure la mémoire retenue par les
+lignes accumulées, le pic pendant la construction du DataFrame et la taille du DataFrame final.
+Usage : python benchmarks/bench_row_buffer.py [--rows 100000 250000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MEASURE = '''
+import json, sys, time, tracemalloc
+sys.path.insert(0, {root!r})
+import pandas as pd
+from benchmarks.fixtures import scaled_pages
+from listing_parser import parse_listing_page
+from row_buffer import ColumnBuffer
+
+pages = scaled_pages('voitures', 50)
+rows_per_pass = sum(len(parse_listing_page(page, 'voitures')) for page in pages)
+passes = -(-{rows} // rows_per_pass)
+
+tracemalloc.start()
+start = time.perf_counter()
+if {method!r} == 'dicts':
+    data = []
+    for _ in range(passes):
+        for page in pages:
+            data.extend(parse_listing_page(page, 'voitures'))
+else:
+    data = ColumnBuffer('voitures')
+    for _ in range(passes):
+        for page in pages:
+            data.extend(parse_listing_page(page, 'voitures'))
+collected = time.perf_counter() - start
+retained = tracemalloc.get_traced_memory()[0]
+tracemalloc.reset_peak()
+
+start = time.perf_counter()
+df = pd.DataFrame(data) if {method!r} == 'dicts' else data.to_frame()
+assembled = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print(json.dumps({{'rows': len(df), 'collect_s': collected, 'frame_s': assembled, 'retained_mb': retained / 2**20,
+                  'peak_mb': peak / 2**20, 'frame_mb': int(df.memory_usage(deep=True).sum()) / 2**20}}))
+'''
+
+
+def measure(method, rows):
+    code = MEASURE.format(root=ROOT, rows=rows, method=method)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"{rows:,} lignes")
+        results = {}
+        for label, method in (('dicts', 'dicts'), ('colonnes', 'buffer')):
+            r = results[label] = measure(method, rows)
+            print(f"  {label:<9} lignes retenues {r['retained_mb']:7.1f} Mo  pic DataFrame {r['peak_mb']:7.1f} Mo  "
+                  f"DataFrame {r['frame_mb']:6.1f} Mo  collecte {r['collect_s']:6.2f}s  "
+                  f"assemblage {r['frame_s']:6.3f}s")
+        print(f"  mémoire retenue /{results['dicts']['retained_mb'] / results['colonnes']['retained_mb']:.1f}, "
+              f"pic /{results['dicts']['peak_mb'] / results['colonnes']['peak_mb']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
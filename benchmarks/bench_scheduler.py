@@ -0,0 +1,67 @@
+"""Rafraîchissement de toutes les catégories : un crawl par catégorie, l'un après l'autre, contre un seul passage
+
+Les deux méthodes scrapent le même nombre de pages par catégorie contre un serveur local avec
+latence, avec la même limite de requêtes simultanées ; le contrôleur de débit (fetch_control) est
+remis à zéro avant chaque passage. Mesures : durée totale, délai avant la page 1 de chaque catégorie
+(la plus récente) et délai avant que toutes les catégories aient leur page 1.
+Usage : python benchmarks/bench_scheduler.py [--pages 2 10] [--latency 0.1] [--concurrency 4]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import scaled_pages
+from benchmarks.stub_server import StubServer
+from fetch_control import configure_controller
+from http_client import configure_client
+from scraping_functions import CATEGORY_URLS, iter_crawl
+
+
+def crawl(crawls, concurrency, base_urls):
+    """Enchaîne les crawls (budgets par catégorie) ; renvoie (durée, délai de la page 1 par catégorie, lignes)"""
+    configure_controller()
+    first_page = {}
+    rows = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for budgets in crawls:
+            for category, batch in iter_crawl(budgets, concurrency, concurrency, base_urls):
+                rows += len(batch.rows)
+                first_page.setdefault(category, time.perf_counter() - start)
+    return time.perf_counter() - start, first_page, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[2, 10], help='pages par catégorie')
+    parser.add_argument('--latency', type=float, default=0.1, help='latence par requête en secondes')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    configure_client(use_cache=False)
+    categories = list(CATEGORY_URLS)
+    for pages in args.pages:
+        print(f"{len(categories)} catégories x {pages} pages, latence {args.latency}s, "
+              f"{args.concurrency} requêtes simultanées")
+        with StubServer(scaled_pages('voitures', pages), latency=args.latency) as server:
+            base_urls = {category: f'{server.base_url}/{category}' for category in categories}
+            results = {
+                'séquentiel': crawl([{category: pages} for category in categories], args.concurrency, base_urls),
+                'un passage': crawl([dict.fromkeys(categories, pages)], args.concurrency, base_urls),
+            }
+        for label, (elapsed, first_page, rows) in results.items():
+            firsts = '  '.join(f"{category} {first_page[category]:5.2f}s" for category in categories)
+            print(f"  {label:<11} total {elapsed:6.2f}s  page 1 : {firsts}  toutes {max(first_page.values()):5.2f}s  "
+                  f"{rows} lignes")
+        (seq, seq_first, _), (multi, multi_first, _) = results.values()
+        print(f"  gain : total x{seq / multi:.2f}, toutes les catégories à jour "
+              f"x{max(seq_first.values()) / max(multi_first.values()):.2f}")
+
+
+if __name__ == '__main__':
+    main()
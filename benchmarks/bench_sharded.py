@@ -0,0 +1,66 @@
+"""Crawl découpé en tranches avec 1, 2, 4 processus workers contre un serveur local avec latence
+
+Vérifie que la fusion est identique quel que soit le nombre de workers (les pages au-delà des
+données bouclent sur les mêmes annonces : la fusion doit les dédoublonner par annonce_id).
+
+Usage : python benchmarks/bench_sharded.py [--pages 60] [--shard-pages 10] [--latency 0.2]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import CARDS_PER_PAGE, build_pages
+from benchmarks.stub_server import StubServer
+import dedup
+from http_client import configure_client
+from sharded_crawl import run_sharded_crawl
+
+
+def run(pages, shard_pages, latency, workers):
+    with StubServer(build_pages('voitures', pages), latency=latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'voitures.csv')
+        # Historique des annonces isolé : les annonces de test ne se mêlent pas aux vraies
+        dedup.HISTORY_PATH = os.path.join(tmp, 'historique.sqlite')
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = run_sharded_crawl('voitures', pages, output, workers=workers, shard_pages=shard_pages,
+                                     base_url=server.base_url)
+        elapsed = time.perf_counter() - start
+        with open(output, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        return elapsed, rows, digest, server.requests, server.max_in_flight
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--shard-pages', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.2, help='latence par requête en secondes')
+    args = parser.parse_args()
+
+    # Sans cache HTTP : chaque worker télécharge réellement ses pages
+    configure_client(use_cache=False)
+    print(f"{args.pages} pages ({args.pages * CARDS_PER_PAGE} cartes), tranches de {args.shard_pages} pages, "
+          f"latence {args.latency}s")
+    baseline = None
+    digests = set()
+    for workers in (1, 2, 4):
+        elapsed, rows, digest, requests, in_flight = run(args.pages, args.shard_pages, args.latency, workers)
+        baseline = baseline or elapsed
+        digests.add(digest)
+        print(f"  {workers} worker(s) : {elapsed:6.2f}s  x{baseline / elapsed:4.1f}  {rows} lignes uniques  "
+              f"{requests} requêtes  max {in_flight} simultanées  sortie {digest}")
+    print("Fusion identique pour tous les nombres de workers" if len(digests) == 1
+          else "ATTENTION : la fusion dépend du nombre de workers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Temps de démarrage à froid du crawler en ligne de commande, comparé à l'import de scraping_functions
+
+Chaque mesure lance un nouvel interpréteur Python (médiane de --repeat lancements) :
+interpréteur seul, import des modules que chargeait l'ancien scraping_functions (streamlit, pandas,
+pyarrow, BeautifulSoup), import actuel de scraping_functions, scrape_cli.py --help, et un crawl
+d'une page contre le serveur local. --ref mesure aussi l'import de scraping_functions tel qu'il
+était à une révision git donnée (arbre extrait dans un dossier temporaire).
+Usage : python benchmarks/bench_startup.py [--repeat 7] [--ref 658b1fa]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import scaled_pages
+from benchmarks.stub_server import StubServer
+
+# Modules lourds qu'un crawl sans interface ne doit pas charger
+LOURDS = ['streamlit', 'plotly', 'matplotlib', 'pandas', 'numpy', 'pyarrow', 'bs4']
+ANCIEN_IMPORT = 'import streamlit, pandas, pyarrow, bs4, scraping_functions'
+
+
+def cold_start(args, cwd=ROOT, repeat=7):
+    """Médiane (secondes) du temps de lancement d'un nouvel interpréteur avec ces arguments"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def loaded_modules(code, cwd=ROOT):
+    """Modules de LOURDS présents dans sys.modules après code"""
+    check = f"{code}\nimport sys\nprint(' '.join(m for m in {LOURDS!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', check], cwd=cwd, capture_output=True, text=True,
+                            check=True).stdout
+    return output.splitlines()[-1].split()
+
+
+def extract_tree(ref, directory):
+    """Extrait l'arbre du dépôt à la révision ref dans directory"""
+    archive = subprocess.run(['git', 'archive', ref], cwd=ROOT, capture_output=True, check=True).stdout
+    subprocess.run(['tar', '-x', '-C', directory], input=archive, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--ref', help="révision git dont l'import de scraping_functions sert de référence")
+    args = parser.parse_args()
+
+    cases = [
+        ('interpréteur seul', ['-c', 'pass'], ROOT),
+        ("modules de l'ancien en-tête", ['-c', ANCIEN_IMPORT], ROOT),
+        ('import scraping_functions', ['-c', 'import scraping_functions'], ROOT),
+        ('scrape_cli.py --help', ['scrape_cli.py', '--help'], ROOT),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.ref:
+            extract_tree(args.ref, tmp)
+            cases.insert(2, (f'import scraping_functions @{args.ref}', ['-c', 'import scraping_functions'], tmp))
+
+        print(f"Démarrage à froid, médiane de {args.repeat} lancements")
+        results = {}
+        for label, command, cwd in cases:
+            results[label] = cold_start(command, cwd, args.repeat)
+            print(f"  {label:<40} {results[label] * 1000:7.0f} ms")
+
+        with StubServer(scaled_pages('voitures', 1)) as server:
+            output = os.path.join(tmp, 'voitures.csv')
+            crawl = ['scrape_cli.py', 'voitures', '1', '--output', output, '--no-cache', '--base-url', server.base_url,
+                     '--quiet']
+            label = 'scrape_cli.py, crawl d\'une page (local)'
+            results[label] = cold_start(crawl, ROOT, args.repeat)
+            print(f"  {label:<40} {results[label] * 1000:7.0f} ms")
+            # Modules chargés par un vrai crawl, écriture du CSV comprise
+            cli_modules = loaded_modules(f"import runpy, sys\nsys.argv = {crawl!r}\ntry:\n"
+                                         f"    runpy.run_path('scrape_cli.py', run_name='__main__')\n"
+                                         f"except SystemExit:\n    pass")
+
+    reference = results["modules de l'ancien en-tête"]
+    print(f"scrape_cli.py --help : {results['scrape_cli.py --help'] / reference:.0%} du temps de l'ancien import")
+    print(f"Modules lourds chargés par scrape_cli : {cli_modules or 'aucun'}")
+    print(f"Modules lourds de l'ancien en-tête     : {loaded_modules(ANCIEN_IMPORT)}")
+
+
+if __name__ == '__main__':
+    main()
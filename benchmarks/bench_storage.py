@@ -0,0 +1,81 @@
+"""Compare le chargement CSV brut et Parquet typé (temps et mémoire RSS), avec et sans projection de colonnes
+
+Le CSV de data/ est répliqué pour simuler de plus gros crawls ; chaque mesure tourne dans un
+processus séparé pour que le pic RSS ne soit pas faussé par les mesures précédentes.
+Usage : python benchmarks/bench_storage.py [--copies 1 20 100]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SOURCE = os.path.join(ROOT, 'data', 'dakar-voiture-2753-sitemap.csv')
+DASHBOARD_COLUMNS = ['prix', 'annee', 'kilometrage', 'boite_vitesse', 'carburant']
+
+# Code exécuté dans le sous-processus : charge le fichier et renvoie temps et RSS en JSON
+MEASURE = '''
+import json, resource, sys, time
+import pandas as pd
+sys.path.insert(0, {root!r})
+from storage import typed_frame
+
+def peak_kb():
+    # VmHWM est remis à zéro par exec, contrairement à ru_maxrss hérité du processus parent
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+before = peak_kb()
+start = time.perf_counter()
+mode, path, columns = {mode!r}, {path!r}, {columns!r}
+if mode == 'csv':
+    df = typed_frame(pd.read_csv(path, usecols=columns))
+else:
+    df = pd.read_parquet(path, columns=columns)
+elapsed = time.perf_counter() - start
+after = peak_kb()
+print(json.dumps({{'seconds': elapsed, 'rss_kb': after - before, 'rows': len(df)}}))
+'''
+
+
+def measure(mode, path, columns):
+    code = MEASURE.format(root=ROOT, mode=mode, path=path, columns=columns)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    import dedup
+    from benchmarks.fixtures import replicate_csv
+    from storage import convert_to_parquet
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 20, 100])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Historique des annonces isolé : les copies ne se mêlent pas aux vraies annonces
+        dedup.HISTORY_PATH = os.path.join(tmp, 'historique.sqlite')
+        for copies in args.copies:
+            csv_path = os.path.join(tmp, f'voitures-x{copies}.csv')
+            rows = replicate_csv(SOURCE, copies, csv_path)
+            parquet_path = convert_to_parquet(csv_path)
+            print(f"x{copies}: {rows} lignes, CSV {os.path.getsize(csv_path) / 1e6:.1f} Mo, "
+                  f"Parquet {os.path.getsize(parquet_path) / 1e6:.1f} Mo")
+            for label, columns in (('toutes colonnes', None), ('colonnes dashboard', DASHBOARD_COLUMNS)):
+                csv = measure('csv', csv_path, columns)
+                parquet = measure('parquet', parquet_path, columns)
+                print(f"  {label:<19} CSV {csv['seconds']:7.3f}s {csv['rss_kb'] / 1024:7.1f} Mo | "
+                      f"Parquet {parquet['seconds']:7.3f}s {parquet['rss_kb'] / 1024:7.1f} Mo | "
+                      f"x{csv['seconds'] / parquet['seconds']:.1f} plus rapide")
+
+
+if __name__ == '__main__':
+    main()
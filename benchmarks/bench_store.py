@@ -0,0 +1,99 @@
+"""Entrepôt SQLite des annonces contre chargement pandas : dashboard, page filtrée et triée, export
+
+Le CSV de data/ est répliqué (identifiants d'annonces distincts par copie) pour simuler de gros
+crawls. Côté pandas, chaque mesure relit le jeu typé (Parquet) comme au premier affichage d'une
+session ; côté entrepôt, le jeu est ingéré une fois puis seules les lignes utiles sont lues.
+Usage : python benchmarks/bench_store.py [--copies 1 100 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dedup
+import exports
+from benchmarks.fixtures import replicate_csv
+from cleaning import clean_data
+from dashboard_metrics import query_aggregates
+from listing_store import ListingStore
+from storage import ensure_parquet, load_dataset
+from table_view import DATASET_COLUMNS, filter_frame, page_slice
+
+SOURCE = os.path.join(ROOT, 'data', 'data_to_analyse.csv')
+# Colonnes lues par l'ancien dashboard pandas
+DASHBOARD_COLUMNS = ['prix', 'annee', 'kilometrage', 'boite_vitesse', 'carburant']
+FILTERS = {'marques': ['Toyota'], 'prix': (2_000_000, 15_000_000)}
+
+
+def timed(func, repeat=3):
+    """Meilleur temps sur repeat exécutions, et le résultat"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def pandas_dashboard(csv_path):
+    """Référence pandas : jeu chargé et nettoyé (clean_data), puis nombre d'annonces complètes et somme des prix"""
+    df = clean_data(load_dataset(csv_path)[DASHBOARD_COLUMNS])
+    df = df.dropna(subset=['prix_numerique', 'annee_numerique', 'kilometrage_numerique'])
+    return len(df), float(df['prix_numerique'].astype('float64').sum())
+
+
+def pandas_page(csv_path):
+    view = filter_frame(load_dataset(csv_path), DATASET_COLUMNS, **FILTERS)
+    view = view.sort_values('prix', ascending=False, na_position='last', kind='stable')
+    return len(view), page_slice(view, 2, 50)
+
+
+def store_page(store, jeu):
+    return store.count(jeu, FILTERS), store.page(jeu, FILTERS, 'prix', True, offset=50, limit=50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Historique des annonces et exports isolés dans le dossier temporaire
+        dedup.HISTORY_PATH = os.path.join(tmp, 'historique.sqlite')
+        exports.EXPORT_DIR = os.path.join(tmp, 'exports')
+        store = ListingStore(os.path.join(tmp, 'entrepot.sqlite'))
+        for copies in args.copies:
+            csv_path = os.path.join(tmp, f'voitures-x{copies}.csv')
+            rows = replicate_csv(SOURCE, copies, csv_path)
+            ensure_parquet(csv_path)
+            start = time.perf_counter()
+            jeu = store.ensure(csv_path, 'voitures')
+            ingest = time.perf_counter() - start
+            print(f"x{copies}: {rows} lignes, ingestion {ingest:.2f}s (une fois par version du fichier)")
+
+            pandas_time, pandas_result = timed(lambda: pandas_dashboard(csv_path))
+            store_time, store_result = timed(lambda: query_aggregates(csv_path, store))
+            assert pandas_result == (store_result.count, store_result.sum_prix)
+            print(f"  dashboard          pandas {pandas_time * 1000:8.1f} ms | entrepôt {store_time * 1000:8.1f} ms")
+
+            pandas_time, (pandas_count, pandas_rows) = timed(lambda: pandas_page(csv_path))
+            store_time, (store_count, store_rows) = timed(lambda: store_page(store, jeu))
+            assert pandas_count == store_count and list(pandas_rows['prix']) == list(store_rows['prix'])
+            print(f"  page filtrée/triée pandas {pandas_time * 1000:8.1f} ms | entrepôt {store_time * 1000:8.1f} ms"
+                  f"  ({store_count} lignes filtrées)")
+
+            pandas_time, _ = timed(lambda: exports.export_file(load_dataset(csv_path), f'p{copies}', 'CSV (gzip)',
+                                                               source_key=time.perf_counter()), repeat=1)
+            store_time, _ = timed(lambda: exports.export_chunks(lambda: store.iter_chunks(jeu), f's{copies}',
+                                                                'CSV (gzip)', time.perf_counter()), repeat=1)
+            print(f"  export CSV gzip    pandas {pandas_time * 1000:8.1f} ms | entrepôt {store_time * 1000:8.1f} ms"
+                  f"  (par blocs de lignes, mémoire bornée)")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Pages d'annonces dakar-auto pour les benchmarks hors ligne
+
+Pages enregistrées sur le site (benchmarks/pages/, voir record_pages.py) ou, à défaut, reconstituées
+à partir des CSV de data/ ; scaled_pages() en génère autant que voulu à partir de leurs cartes.
+"""
+import csv
+import glob
+import gzip
+import html
+import os
+import re
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+# Fichier source et nombre d'annonces par page pour chaque catégorie
+CATEGORIES = {
+    'voitures': 'data_to_analyse.csv',
+    'motos': 'motos-scooters-sitemap.csv',
+    'location': 'dakar-location-voitures-sitemap.csv',
+}
+CARDS_PER_PAGE = 20
+
+# Entête et pied de page volumineux pour que le coût du parsing ressemble à celui du vrai site
+_NAV = ''.join(f'<li class="menu-item"><a href="/senegal/categorie-{i}">Catégorie {i}</a></li>' for i in range(150))
+_FOOTER = ''.join(f'<div class="footer-link"><a href="/page-{i}">Lien {i}</a><p>{"Lorem ipsum dolor sit amet. " * 4}</p></div>' for i in range(150))
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html lang="fr">
+<head><meta charset="utf-8"><title>Dakar Auto</title>
+<script>var config = {{"tracking": true, "items": [{script}]}};</script>
+</head>
+<body>
+<header><nav><ul class="menu">{nav}</ul></nav></header>
+<main>
+<div class="listings-cards">
+<div class="listings-cards__list">
+{cards}
+</div>
+</div>
+</main>
+<footer>{footer}</footer>
+</body>
+</html>'''
+
+CARD_TEMPLATE = '''<div class="listings-cards__list-item">
+  <div class="listing-card">
+    <div class="listing-card__header">
+      <h2 class="listing-card__header__title"><a href="{href}">{titre}</a></h2>
+      <div class="listing-card__header__price">{prix}</div>
+    </div>
+    <div class="listing-card__attributes">{attributes}</div>
+    <div class="listing-card__footer">
+      <div class="entry-zone-address">{adresse}</div>
+      <div class="time-author"><span>il y a 2 jours</span> <a href="#">Par {proprietaire}</a></div>
+    </div>
+  </div>
+</div>'''
+
+ATTRIBUTE_TEMPLATE = '<span class="listing-card__attribute"><i class="{icon}"></i> {text}</span>'
+
+
+def load_rows(category):
+    """Lit les lignes du CSV source d'une catégorie"""
+    with open(os.path.join(DATA_DIR, CATEGORIES[category]), encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def render_card(row):
+    """Génère le HTML d'une carte d'annonce à partir d'une ligne CSV"""
+    attributes = []
+    # Les exports Web Scraper décalent parfois les colonnes : on ne garde que les valeurs plausibles
+    if re.fullmatch(r'\d+ km', row.get('kilometrage', '')):
+        attributes.append(ATTRIBUTE_TEMPLATE.format(icon='icon-road-perspective', text=html.escape(row['kilometrage'])))
+    if row.get('boite_vitesse'):
+        attributes.append(ATTRIBUTE_TEMPLATE.format(icon='icon-gear-icon', text=html.escape(row['boite_vitesse'])))
+    if row.get('carburant'):
+        attributes.append(ATTRIBUTE_TEMPLATE.format(icon='icon-fuel', text=html.escape(row['carburant'])))
+
+    prix = row['prix'] if re.search(r'\d', row['prix']) else ''
+    return CARD_TEMPLATE.format(
+        href=html.escape(row['containers_links-href']),
+        titre=html.escape(row['containers_links']),
+        prix=html.escape(prix),
+        attributes=''.join(attributes),
+        adresse=html.escape(row['adresse']),
+        proprietaire=html.escape(row['proprietaire']),
+    )
+
+
+def render_page(rows):
+    """Génère une page de liste complète contenant les cartes des lignes données"""
+    return PAGE_TEMPLATE.format(
+        script=','.join(str(i) for i in range(2000)),
+        nav=_NAV,
+        cards='\n'.join(render_card(row) for row in rows),
+        footer=_FOOTER,
+    )
+
+
+def build_pages(category, n_pages=None):
+    """Découpe les lignes d'une catégorie en pages HTML, en bouclant sur les données si besoin"""
+    rows = load_rows(category)
+    total = n_pages if n_pages is not None else -(-len(rows) // CARDS_PER_PAGE)
+    pages = []
+    for p in range(total):
+        start = (p * CARDS_PER_PAGE) % len(rows)
+        page_rows = (rows + rows)[start:start + CARDS_PER_PAGE]
+        pages.append(render_page(page_rows))
+    return pages
+
+
+def replicate_csv(source, copies, output_path):
+    """Écrit copies fois les lignes d'un CSV de data/ ; renvoie le nombre de lignes écrites
+
+    Chaque copie reçoit ses propres identifiants d'annonces : sans cela, le dédoublonnage
+    (dedup.py) ramènerait le jeu à sa taille d'origine.
+    """
+    with open(source, encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for copy in range(copies):
+            offset = copy * 10_000_000
+            for row in rows:
+                href = re.sub(r'annonce-(\d+)', lambda m: f'annonce-{int(m.group(1)) + offset}',
+                              row['containers_links-href'])
+                writer.writerow({**row, 'containers_links-href': href})
+    return len(rows) * copies
+
+
+def recorded_path(category, page):
+    return os.path.join(RECORDED_DIR, f'{category}-{page:03d}.html.gz')
+
+
+def recorded_pages(category):
+    """Pages enregistrées d'une catégorie (dans l'ordre), ou deux pages reconstituées s'il n'y en a pas"""
+    paths = sorted(glob.glob(os.path.join(RECORDED_DIR, f'{category}-*.html.gz')))
+    if not paths:
+        return build_pages(category, 2)
+    pages = []
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+_CARD_START = re.compile(r'<(\w+)[^>]*class="[^"]*\blistings-cards__list-item\b[^"]*"')
+
+
+def _element_end(page, start, tag):
+    """Position qui suit la balise fermante de l'élément ouvert à start (éléments imbriqués du même nom compris)"""
+    pattern = re.compile(rf'<(/?){tag}\b[^>]*>', re.I)
+    depth = 0
+    for match in pattern.finditer(page, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return len(page)
+
+
+def split_page(page):
+    """Découpe une page en (début, [cartes HTML], fin)"""
+    matches = list(_CARD_START.finditer(page))
+    if not matches:
+        return page, [], ''
+    cards = []
+    for match in matches:
+        cards.append(page[match.start():_element_end(page, match.start(), match.group(1))])
+    end = matches[-1].start() + len(cards[-1])
+    return page[:matches[0].start()], cards, page[end:]
+
+
+def scaled_pages(category, n_pages, cards_per_page=CARDS_PER_PAGE):
+    """n_pages pages synthétiques : les cartes des pages enregistrées, reprises en boucle
+
+    Chaque reprise décale les identifiants d'annonces (annonce-XXXX) : toutes les annonces générées
+    sont distinctes, comme sur un vrai crawl. L'entête et le pied de page sont ceux de la première page.
+    """
+    head, _, tail = split_page(recorded_pages(category)[0])
+    cards = [card for page in recorded_pages(category) for card in split_page(page)[1]]
+    if not cards:
+        raise ValueError(f"Aucune carte d'annonce dans les pages enregistrées de {category}")
+    pages = []
+    for p in range(n_pages):
+        page_cards = []
+        for i in range(p * cards_per_page, (p + 1) * cards_per_page):
+            offset = (i // len(cards)) * 10_000_000
+            card = cards[i % len(cards)]
+            page_cards.append(re.sub(r'annonce-(\d+)', lambda m: f'annonce-{int(m.group(1)) + offset}', card)
+                              if offset else card)
+        pages.append(head + '\n'.join(page_cards) + tail)
+    return pages
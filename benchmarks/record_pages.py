@@ -0,0 +1,40 @@
+"""Enregistre des pages de liste dakar-auto (compressées) dans benchmarks/pages/ pour les benchmarks hors ligne
+
+Les pages sont téléchargées une à une, sans cache, avec le client HTTP du projet. Une fois
+enregistrées, elles remplacent les pages reconstituées à partir de data/ (fixtures.recorded_pages).
+Usage : python benchmarks/record_pages.py [--pages 2] [--category voitures motos location]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import RECORDED_DIR, recorded_path, split_page
+from http_client import configure_client
+from scraping_functions import CATEGORY_URLS, page_urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--category', nargs='+', choices=sorted(CATEGORY_URLS), default=sorted(CATEGORY_URLS))
+    parser.add_argument('--pause', type=float, default=1.0, help='secondes entre deux requêtes (politesse)')
+    args = parser.parse_args()
+
+    client = configure_client(use_cache=False)
+    os.makedirs(RECORDED_DIR, exist_ok=True)
+    for category in args.category:
+        for page, url in enumerate(page_urls(CATEGORY_URLS[category], args.pages), start=1):
+            html = client.get_text(url)
+            path = recorded_path(category, page)
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                f.write(html)
+            print(f"{category} page {page} : {len(split_page(html)[1])} cartes -> {os.path.relpath(path)}")
+            time.sleep(args.pause)
+
+
+if __name__ == '__main__':
+    main()
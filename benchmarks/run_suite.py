@@ -0,0 +1,208 @@
+"""Suite de benchmarks hors ligne : parsing, crawl de bout en bout, clean_data et préparation du dashboard
+
+Tout tourne sans réseau : pages enregistrées (ou reconstituées) mises à l'échelle par
+fixtures.scaled_pages, serveur HTTP local, jeux de données de data/ répliqués. Les résultats sont
+écrits en JSON (benchmarks/results/ par défaut) ; --compare les confronte à un passage précédent et
+signale les régressions au-delà du seuil.
+
+Usage : python benchmarks/run_suite.py [--sections parse pool crawl clean dashboard] [--compare ANCIEN.json]
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dedup
+from benchmarks.bench_clean_data import measure as measure_clean_data
+from benchmarks.bench_parse_pool import parse_only
+from benchmarks.bench_store import pandas_dashboard
+from benchmarks.fixtures import replicate_csv, scaled_pages
+from benchmarks.stub_server import StubServer
+from dashboard_metrics import query_aggregates
+from fetch_control import configure_controller
+from http_client import configure_client
+from listing_parser import BACKENDS, parse_listing_page
+from listing_store import ListingStore
+from scraping_functions import scrape_location_data, scrape_motos_data, scrape_voitures_data
+from storage import ensure_parquet
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+SECTIONS = ['parse', 'pool', 'crawl', 'clean', 'dashboard']
+SCRAPERS = {'voitures': scrape_voitures_data, 'motos': scrape_motos_data, 'location': scrape_location_data}
+DASHBOARD_SOURCE = os.path.join(ROOT, 'data', 'data_to_analyse.csv')
+# Écart relatif au-delà duquel une mesure est signalée comme régression
+SEUIL = 0.10
+
+
+def result(name, value, unit, higher_is_better):
+    return {'nom': name, 'valeur': value, 'unite': unit, 'meilleur': 'haut' if higher_is_better else 'bas'}
+
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parse(args):
+    """Cartes analysées par seconde, par catégorie (scraper) et par backend"""
+    results = []
+    for category in SCRAPERS:
+        pages = scaled_pages(category, args.parse_pages)
+        cards = sum(len(parse_listing_page(page, category)) for page in pages)
+        for backend in BACKENDS:
+            elapsed = best_of(lambda: [parse_listing_page(page, category, backend) for page in pages])
+            results.append(result(f'parse.{category}.{backend}', round(cards / elapsed), 'cartes/s', True))
+            print(f"  parse {category:<9} {backend:<12} {cards / elapsed:10.0f} cartes/s")
+    return results
+
+
+def bench_pool(args):
+    """Analyse (BeautifulSoup) dans le thread courant puis dans un pool de 1, 2, 4 et 8 processus"""
+    results = []
+    pages = scaled_pages('voitures', args.parse_pages * 5)
+    for processes in [0, *args.parser_processes]:
+        elapsed, rows = parse_only(pages, 'voitures', 'html.parser', processes)
+        results.append(result(f'pool.voitures.p{processes}', round(rows / elapsed), 'cartes/s', True))
+        print(f"  pool  {processes} processus   {rows / elapsed:10.0f} cartes/s")
+    return results
+
+
+def bench_crawl(args):
+    """Débit de bout en bout (téléchargement, analyse, DataFrame) contre le serveur local, par concurrence"""
+    results = []
+    configure_client(use_cache=False)
+    configure_controller()
+    for category, scrape in SCRAPERS.items():
+        pages = scaled_pages(category, args.crawl_pages)
+        for concurrency in args.concurrency:
+            with StubServer(pages, latency=args.latency) as server:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    df = scrape(args.crawl_pages, concurrency=concurrency, per_host_limit=concurrency,
+                                base_url=server.base_url)
+                elapsed = time.perf_counter() - start
+            name = f'crawl.{category}.c{concurrency}'
+            results.append(result(f'{name}.pages_par_s', round(args.crawl_pages / elapsed, 2), 'pages/s', True))
+            results.append(result(f'{name}.lignes_par_s', round(len(df) / elapsed), 'lignes/s', True))
+            print(f"  crawl {category:<9} concurrence {concurrency:<2} {args.crawl_pages / elapsed:7.1f} pages/s  "
+                  f"{len(df) / elapsed:8.0f} lignes/s")
+    return results
+
+
+def bench_clean(args):
+    """Temps et pic de mémoire ajouté par clean_data (processus séparé par taille)"""
+    results = []
+    for rows in args.clean_rows:
+        measured = measure_clean_data('clean_data', rows)
+        results.append(result(f'clean_data.{rows}.secondes', round(measured['seconds'], 4), 's', False))
+        results.append(result(f'clean_data.{rows}.pic_memoire', round(measured['extra_peak_kb'] / 1024, 1), 'Mo',
+                              False))
+        print(f"  clean_data {rows:>10,} lignes  {measured['seconds']:7.3f}s  "
+              f"pic +{measured['extra_peak_kb'] / 1024:7.1f} Mo")
+    return results
+
+
+def bench_dashboard(args):
+    """Préparation des données du dashboard : chargement + nettoyage + agrégats (pandas) et requête (entrepôt)"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        dedup.HISTORY_PATH = os.path.join(tmp, 'historique.sqlite')
+        store = ListingStore(os.path.join(tmp, 'entrepot.sqlite'))
+        try:
+            for copies in args.dashboard_copies:
+                csv_path = os.path.join(tmp, f'voitures-x{copies}.csv')
+                rows = replicate_csv(DASHBOARD_SOURCE, copies, csv_path)
+                ensure_parquet(csv_path)
+                store.ensure(csv_path, 'voitures')
+
+                pandas_time = best_of(lambda: pandas_dashboard(csv_path))
+                store_time = best_of(lambda: query_aggregates(csv_path, store))
+                results.append(result(f'dashboard.{rows}.pandas', round(pandas_time * 1000, 2), 'ms', False))
+                results.append(result(f'dashboard.{rows}.entrepot', round(store_time * 1000, 2), 'ms', False))
+                print(f"  dashboard {rows:>8} lignes  pandas {pandas_time * 1000:8.1f} ms  "
+                      f"entrepôt {store_time * 1000:8.1f} ms")
+        finally:
+            store.close()
+    return results
+
+
+def environment():
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'plateforme': platform.platform(), 'processeurs': os.cpu_count(),
+            'pandas': pandas.__version__, 'numpy': numpy.__version__, 'backends': list(BACKENDS)}
+
+
+def compare(current, previous_path, threshold=SEUIL):
+    """Affiche l'écart de chaque mesure avec un passage précédent ; renvoie la liste des régressions"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {entry['nom']: entry for entry in json.load(f)['resultats']}
+    regressions = []
+    print(f"\nComparaison avec {previous_path} (seuil {threshold:.0%})")
+    for entry in current:
+        old = previous.get(entry['nom'])
+        if old is None or not old['valeur']:
+            continue
+        change = entry['valeur'] / old['valeur'] - 1
+        worse = change < -threshold if entry['meilleur'] == 'haut' else change > threshold
+        if worse:
+            regressions.append(entry['nom'])
+        print(f"  {'RÉGRESSION' if worse else '':<10} {entry['nom']:<40} {old['valeur']:>12} -> "
+              f"{entry['valeur']:>12} {entry['unite']:<9} {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    parser.add_argument('--parse-pages', type=int, default=20)
+    parser.add_argument('--crawl-pages', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.05, help='latence du serveur local en secondes')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--parser-processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--clean-rows', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--dashboard-copies', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--output', help='fichier JSON de résultats (par défaut benchmarks/results/<date>.json)')
+    parser.add_argument('--compare', help='résultats JSON d\'un passage précédent')
+    parser.add_argument('--threshold', type=float, default=SEUIL)
+    args = parser.parse_args()
+
+    benches = {'parse': bench_parse, 'pool': bench_pool, 'crawl': bench_crawl, 'clean': bench_clean, 'dashboard': bench_dashboard}
+    results = []
+    for section in args.sections:
+        print(f"[{section}]")
+        results += benches[section](args)
+
+    report = {'environnement': environment(), 'parametres': vars(args), 'resultats': results}
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"\nRésultats écrits dans {os.path.relpath(output)}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Serveur HTTP local qui sert des pages d'annonces enregistrées avec une latence artificielle
+
+Des pannes peuvent être injectées (faults) : réponses 429 avec Retry-After, erreurs 503, réponses
+lentes, connexions coupées, et 429 systématique au-delà d'un nombre de requêtes simultanées.
+"""
+import hashlib
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# Paramètres des pannes injectées (probabilités par requête)
+DEFAULT_FAULTS = {
+    'rate_429': 0.0,          # 429 Too Many Requests
+    'retry_after': 1,         # valeur de l'entête Retry-After des 429
+    'rate_503': 0.0,          # 503 Service Unavailable
+    'rate_slow': 0.0,         # réponse retardée de slow_latency secondes
+    'slow_latency': 3.0,
+    'rate_reset': 0.0,        # connexion fermée sans réponse
+    'max_concurrent': None,   # au-delà, 429 (limitation de débit côté serveur)
+    'seed': 0,
+}
+
+
+class StubServer:
+    """Sert pages[i - 1] pour '/<chemin>?page=i' (la page 1 n'a pas de paramètre)"""
+
+    def __init__(self, pages, latency=0.0, faults=None):
+        self.pages = [page.encode('utf-8') for page in pages]
+        self.latency = latency
+        self.faults = {**DEFAULT_FAULTS, **(faults or {})}
+        self.injected = {'429': 0, '503': 0, 'slow': 0, 'reset': 0}
+        self._random = random.Random(self.faults['seed'])
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        # Clients qui abandonnent une réponse lente (délai dépassé) : pas de trace d'erreur
+        self.httpd.handle_error = lambda request, client_address: None
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}/senegal/annonces'
+
+    def _draw_fault(self):
+        """Tire la panne éventuelle de la requête (sous verrou : tirages reproductibles)"""
+        faults = self.faults
+        if faults['max_concurrent'] is not None and self._in_flight > faults['max_concurrent']:
+            return '429'
+        draw = self._random.random()
+        for name in ('429', '503', 'slow', 'reset'):
+            rate = faults[f'rate_{name}']
+            if draw < rate:
+                return name
+            draw -= rate
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                    fault = server._draw_fault()
+                    if fault:
+                        server.injected[fault] += 1
+                try:
+                    if fault == 'reset':
+                        # Coupure brutale : le client reçoit une erreur de connexion
+                        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                        self.close_connection = True
+                        return
+                    time.sleep(server.latency + (server.faults['slow_latency'] if fault == 'slow' else 0))
+                    if fault in ('429', '503'):
+                        self.send_response(int(fault))
+                        if fault == '429':
+                            self.send_header('Retry-After', str(server.faults['retry_after']))
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    query = parse_qs(urlparse(self.path).query)
+                    index = int(query.get('page', ['1'])[0]) - 1
+                    body = server.pages[index % len(server.pages)]
+                    etag = '"%s"' % hashlib.md5(body).hexdigest()
+                    if self.headers.get('If-None-Match') == etag:
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
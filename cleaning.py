@@ -0,0 +1,93 @@
+"""Nettoyage des données scrapées pour l'analyse (sans dépendance à Streamlit)"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Colonnes techniques de Web Scraper, inutiles pour l'analyse
+SCRAPER_COLUMNS = ['web-scraper-order', 'web-scraper-start-url', 'containers_links', 'containers_links-href']
+# Colonnes brutes remplacées par leur version numérique
+RAW_NUMERIC_COLUMNS = ['prix', 'annee', 'kilometrage']
+# Colonnes texte à faible cardinalité converties en catégories
+CATEGORY_COLUMNS = ['marque', 'carburant', 'boite_vitesse', 'adresse']
+
+_NON_CHIFFRES = re.compile(r"[^\d]")
+_ANNEE = re.compile(r"(\d{4})")
+_KILOMETRAGE = re.compile(r"[^\d-]")
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def _parse_prix(values):
+    return pd.to_numeric(values.str.replace(_NON_CHIFFRES, "", regex=True), errors='coerce')
+
+
+def _parse_annee(values):
+    return pd.to_numeric(values.str.extract(_ANNEE, expand=False), errors='coerce')
+
+
+def _parse_kilometrage(values):
+    return pd.to_numeric(values.str.replace(_KILOMETRAGE, "", regex=True), errors='coerce')
+
+
+def _numeric_values(series, parse):
+    """Convertit une colonne en float64 en ne nettoyant que ses valeurs distinctes
+
+    Une colonne déjà numérique (Parquet typé) est reprise telle quelle.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype='float64', na_value=np.nan, copy=True)
+    codes, uniques = pd.factorize(series)
+    parsed = parse(pd.Series(uniques, dtype='str')).to_numpy(dtype='float64', na_value=np.nan)
+    # Le code -1 (valeur manquante) pointe sur le NaN ajouté en fin de tableau
+    return np.append(parsed, np.nan)[codes]
+
+
+_PARSERS = {'prix': _parse_prix, 'annee': _parse_annee, 'kilometrage': _parse_kilometrage}
+
+
+def parse_numeric(series, field):
+    """Valeurs numériques (float64, NaN si absente) d'un champ prix, annee ou kilometrage, brut ou déjà typé"""
+    values = _numeric_values(series, _PARSERS[field])
+    if field == 'kilometrage':
+        # Traitement des valeurs négatives
+        values[values < 0] = np.nan
+    return values
+
+
+def _smallest_int(values):
+    """Entiers nullable du plus petit type qui contient toutes les valeurs"""
+    mask = np.isnan(values) | (np.abs(values) > _INT64_MAX)
+    ints = np.where(mask, 0, values).astype(np.int64)
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if ints.size == 0 or (ints.min() >= info.min and ints.max() <= info.max):
+            return pd.arrays.IntegerArray(ints.astype(dtype), mask)
+    return pd.arrays.IntegerArray(ints, mask)
+
+
+def clean_data(dataframe):
+    """Fonction pour nettoyer les données scrapées
+
+    Renvoie un nouveau DataFrame : colonnes techniques et brutes supprimées, prix_numerique,
+    annee_numerique et kilometrage_numerique en entiers nullable réduits, marque, carburant,
+    boite_vitesse et adresse en catégories.
+
+    N'est plus appelée par l'application (le dashboard interroge l'entrepôt, listing_store.py) :
+    c'est la référence pandas des benchmarks (bench_clean_data.py, bench_store.py).
+    """
+    if dataframe.empty:
+        return dataframe
+
+    dropped = set(SCRAPER_COLUMNS) | set(RAW_NUMERIC_COLUMNS)
+    columns = {}
+    for col in dataframe.columns:
+        if col in dropped:
+            continue
+        columns[col] = dataframe[col].astype('category') if col in CATEGORY_COLUMNS else dataframe[col]
+
+    columns["prix_numerique"] = _smallest_int(parse_numeric(dataframe["prix"], 'prix'))
+    columns["annee_numerique"] = _smallest_int(parse_numeric(dataframe["annee"], 'annee'))
+    columns["kilometrage_numerique"] = _smallest_int(parse_numeric(dataframe["kilometrage"], 'kilometrage'))
+
+    return pd.DataFrame(columns, index=dataframe.index)
@@ -0,0 +1,165 @@
+"""Journal de crawl : pages terminées et lignes extraites, ajoutées au fil de l'eau sur disque
+
+Chaque page traitée ajoute une ligne JSON au journal ; un crawl interrompu (processus tué, site
+indisponible) reprend en sautant les pages déjà terminées. La compaction relit le journal dans
+l'ordre des pages (la dernière version d'une page l'emporte) et produit le jeu de données final.
+"""
+import json
+import os
+
+from storage import CsvBatchWriter
+
+
+CRAWL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'crawls')
+# Le journal est vidé vers le système à chaque page et synchronisé sur disque (fsync) toutes les N pages
+FSYNC_EVERY = 10
+
+
+def crawl_log_path(category, tag):
+    os.makedirs(CRAWL_DIR, exist_ok=True)
+    return os.path.join(CRAWL_DIR, f'{category}-{tag}.jsonl')
+
+
+def _read_records(path):
+    """Renvoie (position, enregistrement) pour chaque ligne complète et valide du journal"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            if not line.endswith(b'\n'):
+                # Dernière ligne tronquée par un arrêt brutal
+                break
+            try:
+                yield start, json.loads(line)
+            except ValueError:
+                continue
+
+
+def _page_offsets(path):
+    """Position de la dernière version réussie de chaque page"""
+    offsets = {}
+    for offset, record in _read_records(path):
+        if record.get('type') == 'page' and record['ok']:
+            offsets[record['page']] = offset
+    return offsets
+
+
+def completed_pages(path):
+    return set(_page_offsets(path))
+
+
+class CrawlLog:
+    """Journal en ajout seul d'un crawl ; rouvrir un journal existant permet de reprendre le crawl"""
+
+    def __init__(self, path, category, base_url):
+        self.path = path
+        header = None
+        if os.path.exists(path):
+            header = next((record for _, record in _read_records(path) if record.get('type') == 'crawl'), None)
+            if header is not None and (header['category'], header['base_url']) != (category, base_url):
+                raise ValueError(f"Le journal {path} appartient à un autre crawl ({header['category']}, "
+                                 f"{header['base_url']})")
+            self._truncate_partial_line()
+
+        self.completed = completed_pages(path)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._unsynced = 0
+        if header is None:
+            self._write({'type': 'crawl', 'category': category, 'base_url': base_url})
+
+    def _truncate_partial_line(self):
+        """Supprime une dernière ligne incomplète, sinon le prochain ajout la prolongerait"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def append(self, batch):
+        """Enregistre une page traitée (PageBatch) ; les pages en erreur seront retentées à la reprise"""
+        self._write({'type': 'page', 'page': batch.page, 'url': batch.url, 'ok': batch.ok, 'error': batch.error,
+                     'rows': batch.rows})
+        if batch.ok:
+            self.completed.add(batch.page)
+        self._unsynced += 1
+        if self._unsynced >= FSYNC_EVERY:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_rows(path):
+    """Lignes du journal dans l'ordre des pages, sans doublon de page (lecture en flux)"""
+    offsets = _page_offsets(path)
+    with open(path, 'rb') as f:
+        for page in sorted(offsets):
+            f.seek(offsets[page])
+            yield from json.loads(f.readline())['rows']
+
+
+def tail_rows(path, n):
+    """Les n dernières lignes extraites, lues depuis la fin du journal (aperçu pendant le crawl)"""
+    if not os.path.exists(path):
+        return []
+    size = os.path.getsize(path)
+    block = 64 * 1024
+    with open(path, 'rb') as f:
+        while True:
+            start = max(size - block, 0)
+            f.seek(start)
+            lines = f.read(size - start).split(b'\n')
+            if start > 0:
+                # La première ligne du bloc est probablement coupée
+                lines = lines[1:]
+            rows = []
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('type') == 'page':
+                    rows.extend(record['rows'])
+            if len(rows) >= n or start == 0:
+                return rows[-n:]
+            block *= 4
+
+
+def compact(path, output_path, remove_log=False):
+    """Écrit le jeu de données final (CSV, pages dans l'ordre) à partir du journal ; renvoie le nombre de lignes
+
+    L'écriture passe par un fichier temporaire : une compaction interrompue laisse le journal intact.
+    """
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    with CsvBatchWriter(tmp_path) as writer:
+        page_rows = []
+        for row in read_rows(path):
+            page_rows.append(row)
+            if len(page_rows) >= 1000:
+                writer.write(page_rows)
+                page_rows = []
+        writer.write(page_rows)
+
+    if writer.rows_written:
+        os.replace(tmp_path, output_path)
+    elif os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    if remove_log:
+        os.remove(path)
+    return writer.rows_written
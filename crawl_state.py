@@ -0,0 +1,68 @@
+"""État persistant des crawls : index SQLite des annonces déjà vues, pour le scraping incrémental"""
+import hashlib
+import os
+import sqlite3
+import time
+
+
+SEEN_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'annonces_vues.sqlite')
+
+
+def row_hash(row):
+    """Empreinte courte du contenu d'une ligne (hors identifiant) pour détecter les annonces modifiées"""
+    content = '\x1f'.join(f'{key}={value}' for key, value in row.items() if key != 'annonce_id')
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class SeenIndex:
+    """Index (catégorie, annonce_id) -> empreinte des annonces déjà collectées"""
+
+    def __init__(self, path=SEEN_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS annonces (
+                categorie TEXT NOT NULL,
+                annonce_id INTEGER NOT NULL,
+                empreinte TEXT NOT NULL,
+                vue_le REAL NOT NULL,
+                PRIMARY KEY (categorie, annonce_id)
+            ) WITHOUT ROWID
+        ''')
+
+    def lookup(self, category, ids):
+        """Renvoie {annonce_id: empreinte} pour les identifiants déjà connus"""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        cursor = self.conn.execute(
+            f'SELECT annonce_id, empreinte FROM annonces WHERE categorie = ? AND annonce_id IN ({placeholders})',
+            [category, *ids])
+        return dict(cursor.fetchall())
+
+    def filter_page(self, category, rows):
+        """Sépare les lignes d'une page : renvoie (lignes nouvelles ou modifiées, page entièrement connue)
+
+        L'index n'est pas modifié : les lignes ne sont enregistrées (mark_seen) qu'une fois sauvegardées.
+        """
+        known = self.lookup(category, [row['annonce_id'] for row in rows])
+        fresh = [row for row in rows if row['annonce_id'] is None or known.get(row['annonce_id']) != row_hash(row)]
+        all_known = bool(rows) and all(row['annonce_id'] in known for row in rows)
+        return fresh, all_known
+
+    def mark_seen(self, category, rows):
+        """Enregistre les lignes d'une page dans l'index, après leur sauvegarde par l'appelant"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO annonces VALUES (?, ?, ?, ?)',
+                                  [(category, row['annonce_id'], row_hash(row), now)
+                                   for row in rows if row['annonce_id'] is not None])
+
+    def count(self, category=None):
+        if category is None:
+            return self.conn.execute('SELECT COUNT(*) FROM annonces').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM annonces WHERE categorie = ?', (category,)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
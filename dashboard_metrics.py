@@ -0,0 +1,66 @@
+"""Agrégats du dashboard, calculés par l'entrepôt d'annonces (listing_store.py)
+
+Les compteurs (nombre, sommes, répartitions) et un échantillon borné de points prix/kilométrage
+sont calculés sur le jeu dédoublonné (une ligne par annonce) par des requêtes SQL : le jeu n'est
+jamais chargé en mémoire. L'entrepôt est complété quand le CSV source grossit.
+"""
+import os
+from collections import Counter
+
+import numpy as np
+
+from listing_store import get_store
+from storage import DATA_DIR
+
+
+# Au-delà de ce nombre de points, le nuage prix/kilométrage est un échantillon uniforme
+SCATTER_MAX_POINTS = 5000
+
+
+class DashboardAggregates:
+    """Agrégats du dashboard : nombre d'annonces, sommes, répartitions et échantillon des points du nuage"""
+
+    def __init__(self, sample_size=SCATTER_MAX_POINTS):
+        self.sample_size = sample_size
+        self.count = 0
+        self.sum_prix = 0.0
+        self.sum_km = 0.0
+        self.carburant = Counter()
+        self.annee = Counter()
+        self.boite_vitesse = Counter()
+        self.sample = np.empty((0, 2))
+
+    @property
+    def mean_prix(self):
+        return self.sum_prix / self.count if self.count else float('nan')
+
+    @property
+    def mean_km(self):
+        return self.sum_km / self.count if self.count else float('nan')
+
+
+def _resolve(filename):
+    return filename if os.path.isabs(filename) else os.path.join(DATA_DIR, filename)
+
+
+def query_aggregates(filename, store=None):
+    """Agrégats du dashboard calculés par l'entrepôt d'annonces (listing_store.py) : un regroupement
+    sur un index couvrant et un échantillon lu par clé primaire, le jeu n'est pas chargé"""
+    store = store or get_store()
+    jeu = store.ensure(_resolve(filename))
+    # Annonces dont l'année, le prix et le kilométrage sont connus
+    filters = {'complets': True}
+    aggregates = DashboardAggregates()
+    for annee, carburant, boite_vitesse, count, sum_prix, sum_km in store.grouped_totals(
+            jeu, ['annee', 'carburant', 'boite_vitesse'], filters):
+        aggregates.count += count
+        aggregates.sum_prix += sum_prix
+        aggregates.sum_km += sum_km
+        aggregates.annee[annee] += count
+        if carburant is not None:
+            aggregates.carburant[carburant] += count
+        if boite_vitesse is not None:
+            aggregates.boite_vitesse[boite_vitesse] += count
+    aggregates.sample = store.sample(jeu, ['kilometrage', 'prix'], aggregates.sample_size, filters,
+                                     count=aggregates.count)
+    return aggregates
@@ -0,0 +1,97 @@
+"""Cache mémoire des dérivés des jeux de données, partagé entre les reruns et les sessions Streamlit
+
+Les entrées sont indexées par (type, chemin, date de modification, taille, colonnes) : un fichier
+modifié n'est jamais servi depuis le cache. La mémoire totale est bornée, les entrées les moins
+récemment utilisées sont évincées en premier.
+"""
+import os
+import sys
+from collections import OrderedDict
+from threading import Lock
+
+from storage import DATA_DIR
+
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _size_of(value):
+    """Estimation de l'empreinte mémoire d'une valeur mise en cache"""
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if isinstance(value, (tuple, list)):
+        return sum(_size_of(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _resolve(filename):
+    return filename if os.path.isabs(filename) else os.path.join(DATA_DIR, filename)
+
+
+def file_key(filename):
+    """Identité d'un fichier : chemin absolu, date de modification et taille"""
+    path = _resolve(filename)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+class FrameCache:
+    """Cache LRU borné en octets"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        # Calcul hors verrou : les autres sessions ne sont pas bloquées pendant une lecture de fichier
+        value = compute()
+        size = _size_of(value)
+
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.total_bytes -= evicted_size
+        return value
+
+    def invalidate(self, path=None):
+        """Vide le cache, ou seulement les entrées d'un fichier"""
+        with self._lock:
+            for key in [k for k in self._entries if path is None or k[1] == path]:
+                self.total_bytes -= self._entries.pop(key)[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = FrameCache()
+
+
+def file_cached(kind, filename, compute):
+    """Résultat de compute(chemin du fichier) mis en cache, pour les dérivés qui gèrent eux-mêmes leur lecture"""
+    path, mtime, size = file_key(filename)
+    return _cache.get_or_compute((kind, path, mtime, size, None), lambda: compute(path))
+
+
+def invalidate(filename=None):
+    """Invalide le cache après l'arrivée de nouvelles données (tout le cache si aucun fichier n'est donné)"""
+    _cache.invalidate(_resolve(filename) if filename is not None else None)
+
+
+def cache_stats():
+    return {'entries': len(_cache), 'bytes': _cache.total_bytes, 'max_bytes': _cache.max_bytes,
+            'hits': _cache.hits, 'misses': _cache.misses}
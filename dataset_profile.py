@@ -0,0 +1,185 @@
+"""Profil des colonnes d'un jeu de données, calculé à l'ingestion et stocké à côté du fichier
+
+Le fichier <jeu>.profile.json contient le nombre de lignes et, par colonne, le type, le nombre de
+valeurs manquantes, la taille mémoire et une esquisse HyperLogLog du nombre de valeurs distinctes.
+Toutes ces statistiques sont additives (les esquisses se fusionnent par maximum registre par
+registre) : quand le CSV a seulement grossi par des annonces nouvelles, seules les nouvelles
+lignes sont profilées. Le profil porte sur le jeu dédoublonné (voir dedup.py).
+"""
+import base64
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dedup import decode_ids, dedup_frame, encode_ids, read_new_listings
+from storage import DATA_DIR, head_hash, load_dataset
+
+
+# 2^11 registres : erreur type d'environ 2,3 % sur le nombre de valeurs distinctes
+HLL_PRECISION = 11
+
+
+def _bit_length(values):
+    """Nombre de bits significatifs de chaque entier d'un tableau uint64"""
+    lengths = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        lengths[high] += shift
+        values = np.where(high, values >> np.uint64(shift), values)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """Esquisse du nombre de valeurs distinctes, de taille fixe et fusionnable"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, series):
+        """Ajoute les valeurs non manquantes d'une colonne"""
+        values = series.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        # Rang du premier bit à 1 dans le suffixe
+        ranks = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, ranks)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            # Petites cardinalités : comptage linéaire, quasi exact
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+    def to_str(self):
+        return base64.b64encode(self.registers.tobytes()).decode('ascii')
+
+    @classmethod
+    def from_str(cls, data, precision=HLL_PRECISION):
+        return cls(precision, np.frombuffer(base64.b64decode(data), dtype=np.uint8).copy())
+
+
+class DatasetProfile:
+    """Statistiques par colonne d'un jeu de données typé (sortie de load_dataset)"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, df):
+        """Ajoute un bloc de lignes au profil"""
+        memory = df.memory_usage(deep=True, index=False)
+        nulls = df.isna().sum()
+        for col in df.columns:
+            stats = self.columns.setdefault(col, {'dtype': str(df[col].dtype), 'nulls': 0, 'bytes': 0,
+                                                  'hll': HyperLogLog()})
+            stats['nulls'] += int(nulls[col])
+            stats['bytes'] += int(memory[col])
+            stats['hll'].add(df[col])
+        self.rows += len(df)
+
+    def merge(self, other):
+        """Fusionne le profil d'un autre bloc du même jeu de données (par exemple un autre crawl)"""
+        for col, theirs in other.columns.items():
+            if col not in self.columns:
+                self.columns[col] = {**theirs, 'hll': HyperLogLog(theirs['hll'].precision)}
+                self.columns[col]['hll'].merge(theirs['hll'])
+                continue
+            stats = self.columns[col]
+            stats['nulls'] += theirs['nulls']
+            stats['bytes'] += theirs['bytes']
+            stats['hll'].merge(theirs['hll'])
+        self.rows += other.rows
+
+    @property
+    def memory_bytes(self):
+        return sum(stats['bytes'] for stats in self.columns.values())
+
+    def column_info(self):
+        """Tableau affiché sur la page de téléchargement"""
+        return pd.DataFrame({
+            'Colonne': list(self.columns),
+            'Type': [stats['dtype'] for stats in self.columns.values()],
+            'Valeurs uniques (≈)': [stats['hll'].estimate() for stats in self.columns.values()],
+            'Valeurs manquantes': [stats['nulls'] for stats in self.columns.values()],
+        })
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'columns': {col: {**stats, 'hll': stats['hll'].to_str()} for col, stats in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        profile.rows = data['rows']
+        profile.columns = {col: {**stats, 'hll': HyperLogLog.from_str(stats['hll'])}
+                           for col, stats in data['columns'].items()}
+        return profile
+
+
+def _resolve(filename):
+    return filename if os.path.isabs(filename) else os.path.join(DATA_DIR, filename)
+
+
+def sidecar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.profile.json'
+
+
+def build_profile(filename):
+    """Profil du jeu de données : relu depuis le fichier annexe, complété ou recalculé si nécessaire"""
+    csv_path = _resolve(filename)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+    size = os.path.getsize(csv_path)
+    head = head_hash(csv_path)
+    path = sidecar_path(csv_path)
+
+    state = None
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+
+    if state and state['source_size'] == size and state['head_hash'] == head:
+        return DatasetProfile.from_dict(state['profile'])
+
+    appended = None
+    if state and 'ids' in state and state['source_size'] < size and state['head_hash'] == head:
+        # Fichier complété en fin par des annonces nouvelles : seules les nouvelles lignes sont profilées
+        appended = read_new_listings(csv_path, state['source_size'], decode_ids(state['ids']))
+
+    if appended is not None:
+        # Dédoublonnées comme le reste du jeu (mêmes colonnes statut_annonce et prix_precedent)
+        appended = dedup_frame(appended)
+        profile = DatasetProfile.from_dict(state['profile'])
+        profile.update(appended)
+        ids = np.concatenate([decode_ids(state['ids']),
+                              appended.get('annonce_id', pd.Series(dtype='Int64')).dropna().to_numpy(dtype=np.int64)])
+    else:
+        df = load_dataset(csv_path)
+        profile = DatasetProfile()
+        profile.update(df)
+        ids = df['annonce_id'] if 'annonce_id' in df else []
+
+    payload = json.dumps({'source_size': size, 'head_hash': head, 'ids': encode_ids(ids),
+                          'profile': profile.to_dict()})
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return profile
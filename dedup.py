@@ -0,0 +1,245 @@
+"""Dédoublonnage des annonces par identifiant et détection des changements d'un crawl à l'autre
+
+Une même annonce (annonce-XXXX dans son URL) apparaît sur deux pages quand la pagination glisse
+pendant un crawl, ou dans plusieurs crawls. Seule sa dernière version est conservée. Chaque version
+est identifiée par une empreinte des champs comparables entre les exports de data/ et les données
+scrapées (prix, année, kilométrage, une fois convertis en nombres) et enregistrée dans un
+historique SQLite partagé : la version conservée est marquée nouvelle, modifiée ou en baisse de prix,
+avec le prix de la version précédente.
+
+Le traitement se fait en flux, par blocs de lignes et en deux passages : le premier garde en mémoire
+une entrée par annonce (identifiant, ordre, position, sous forme de tableaux numpy), le second écrit
+les lignes retenues.
+"""
+import base64
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from cleaning import parse_numeric
+from listing_parser import SPECS
+
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'annonces_historique.sqlite')
+CHUNK_ROWS = 20_000
+CONTENT_FIELDS = ['prix', 'annee', 'kilometrage']
+
+NOUVELLE = 'nouvelle'
+MODIFIEE = 'modifiee'
+BAISSE_PRIX = 'baisse_prix'
+
+# Champ -> colonne : exports Web Scraper de data/ (colonnes nommées) et données scrapées (V1..Vn)
+DATASET_FIELDS = {field: field for field in CONTENT_FIELDS}
+SCRAPED_FIELDS = {category: {field: column for column, field in spec if field in CONTENT_FIELDS}
+                  for category, spec in SPECS.items()}
+
+# Au-delà de ce nombre de paramètres, SQLite refuse la requête
+_SQL_BATCH = 900
+
+
+class ListingHistory:
+    """Versions déjà vues de chaque annonce : (annonce_id, empreinte) -> prix et ordre de première apparition"""
+
+    def __init__(self, path=None):
+        path = path or HISTORY_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS versions (
+                annonce_id INTEGER NOT NULL,
+                empreinte INTEGER NOT NULL,
+                prix REAL,
+                ordre INTEGER NOT NULL,
+                PRIMARY KEY (annonce_id, empreinte)
+            ) WITHOUT ROWID
+        ''')
+
+    def record(self, ids, hashes, prices, orders):
+        """Enregistre des versions ; une version revue plus tôt qu'enregistré garde l'ordre le plus ancien"""
+        prices = [None if np.isnan(p) else float(p) for p in prices]
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO versions VALUES (?, ?, ?, ?)
+                ON CONFLICT (annonce_id, empreinte) DO UPDATE SET ordre = MIN(ordre, excluded.ordre)
+            ''', zip(map(int, ids), map(int, hashes), prices, map(int, orders)))
+
+    def versions(self, ids):
+        """{annonce_id: [(ordre, empreinte, prix), ...]} pour les identifiants donnés"""
+        result = {}
+        ids = [int(i) for i in ids]
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start:start + _SQL_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            cursor = self.conn.execute(
+                f'SELECT annonce_id, ordre, empreinte, prix FROM versions WHERE annonce_id IN ({placeholders})', batch)
+            for annonce_id, ordre, empreinte, prix in cursor:
+                result.setdefault(annonce_id, []).append((ordre, empreinte, prix))
+        return result
+
+    def close(self):
+        self.conn.close()
+
+
+def order_keys(chunk, start, seen_at=None):
+    """Ordre d'apparition des lignes : horodatage Web Scraper ('1752704199-12') s'il existe,
+    sinon date du crawl (seen_at) puis position dans le flux"""
+    if 'web-scraper-order' in chunk:
+        parts = chunk['web-scraper-order'].astype(str).str.split('-', n=1, expand=True)
+        stamp = pd.to_numeric(parts[0], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        seq = pd.to_numeric(parts[1], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        return stamp * 1_000_000 + seq
+    base = int(seen_at or 0) * 1_000_000
+    return base + start + np.arange(len(chunk), dtype=np.int64)
+
+
+class Deduplicator:
+    """Dédoublonnage en deux passages : scan() sur tous les blocs, puis filter() sur les mêmes blocs"""
+
+    def __init__(self, fields=DATASET_FIELDS, seen_at=None, history_path=None):
+        self.fields = fields
+        self.seen_at = seen_at
+        self.history = ListingHistory(history_path)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._orders = np.empty(0, dtype=np.int64)
+        self._positions = np.empty(0, dtype=np.int64)
+        self._scanned = 0
+        self._filtered = 0
+        self.duplicates = 0
+
+    def _content(self, chunk):
+        """Prix (float) et empreinte (int64) de chaque ligne"""
+        values = {field: parse_numeric(chunk[column], field) if column in chunk else np.full(len(chunk), np.nan)
+                  for field, column in ((f, self.fields.get(f)) for f in CONTENT_FIELDS)}
+        frame = pd.DataFrame(values).fillna(-1.0)
+        hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
+        return values['prix'], hashes
+
+    @staticmethod
+    def _ids_of(chunk):
+        return pd.to_numeric(chunk['annonce_id'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    def scan(self, chunk):
+        """Premier passage : enregistre les versions et retient la plus récente de chaque annonce"""
+        start = self._scanned
+        self._scanned += len(chunk)
+        ids = self._ids_of(chunk)
+        known = ~np.isnan(ids)
+        orders = order_keys(chunk, start, self.seen_at)
+        prices, hashes = self._content(chunk)
+        self.history.record(ids[known], hashes[known], prices[known], orders[known])
+
+        self._ids = np.concatenate([self._ids, ids[known].astype(np.int64)])
+        self._orders = np.concatenate([self._orders, orders[known]])
+        self._positions = np.concatenate([self._positions, start + np.flatnonzero(known)])
+        # Une entrée par annonce : la plus récente (ordre, puis position dans le flux)
+        last = np.lexsort((self._positions, self._orders, self._ids))
+        keep = np.append(self._ids[last][1:] != self._ids[last][:-1], True)
+        self._ids, self._orders, self._positions = (a[last][keep] for a in (self._ids, self._orders,
+                                                                            self._positions))
+
+    def filter(self, chunk):
+        """Second passage : renvoie les lignes retenues, avec statut_annonce et prix_precedent"""
+        start = self._filtered
+        self._filtered += len(chunk)
+        ids = self._ids_of(chunk)
+        positions = start + np.arange(len(chunk))
+        winners = np.isin(positions, self._positions[(self._positions >= start) & (self._positions < self._filtered)])
+        keep = winners | np.isnan(ids)
+        self.duplicates += int((~keep).sum())
+
+        kept = chunk[keep].copy()
+        orders = order_keys(chunk, start, self.seen_at)[keep]
+        prices, hashes = self._content(chunk)
+        statut, previous = self._changes(ids[keep], hashes[keep], prices[keep], orders)
+        kept['statut_annonce'] = pd.Categorical(statut, categories=[NOUVELLE, MODIFIEE, BAISSE_PRIX])
+        kept['prix_precedent'] = pd.array(previous, dtype='Int64')
+        return kept
+
+    def _changes(self, ids, hashes, prices, orders):
+        history = self.history.versions(ids[~np.isnan(ids)])
+        statut = []
+        previous = []
+        for annonce_id, digest, prix, ordre in zip(ids, hashes, prices, orders):
+            # Version différente la plus récente parmi celles vues avant celle-ci
+            older = [v for v in history.get(int(annonce_id), []) if v[1] != digest and v[0] < ordre] \
+                if not np.isnan(annonce_id) else []
+            if not older:
+                statut.append(NOUVELLE)
+                previous.append(None)
+                continue
+            _, _, old_prix = max(older)
+            dropped = old_prix is not None and not np.isnan(prix) and prix < old_prix
+            statut.append(BAISSE_PRIX if dropped else MODIFIEE)
+            previous.append(None if old_prix is None else int(old_prix))
+        return statut, previous
+
+    def close(self):
+        self.history.close()
+
+
+def dedup_frame(df, fields=DATASET_FIELDS, seen_at=None, history_path=None):
+    """Dédoublonne un DataFrame entier (un seul bloc) ; renvoyé tel quel s'il n'a pas de colonne annonce_id"""
+    if 'annonce_id' not in df:
+        return df
+    dedup = Deduplicator(fields, seen_at, history_path)
+    try:
+        dedup.scan(df)
+        return dedup.filter(df)
+    finally:
+        dedup.close()
+
+
+def dedup_csv(path, output_path=None, fields=DATASET_FIELDS, seen_at=None, chunksize=CHUNK_ROWS,
+              history_path=None):
+    """Dédoublonne un CSV en flux (remplacé sur place si output_path est omis) ; renvoie (lignes lues, doublons)"""
+    output_path = output_path or path
+    dedup = Deduplicator(fields, seen_at, history_path)
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    try:
+        # Lecture en texte : les valeurs sont réécrites telles quelles
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=['']):
+            dedup.scan(chunk)
+        header = True
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=['']):
+            dedup.filter(chunk).to_csv(tmp_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+    finally:
+        dedup.close()
+    if header:
+        # Fichier vide : rien à réécrire
+        return 0, 0
+    os.replace(tmp_path, output_path)
+    return dedup._scanned, dedup.duplicates
+
+
+def encode_ids(ids):
+    """Identifiants d'annonces triés, encodés pour un fichier annexe JSON"""
+    values = np.unique(pd.to_numeric(pd.Series(ids), errors='coerce').dropna().to_numpy(dtype=np.int64))
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def decode_ids(data):
+    return np.frombuffer(base64.b64decode(data), dtype=np.int64)
+
+
+def is_new_block(known_ids, ids):
+    """Vrai si un bloc de lignes ajoutées ne contient que des annonces inconnues et sans doublon entre elles"""
+    ids = pd.to_numeric(pd.Series(ids), errors='coerce').dropna().to_numpy(dtype=np.int64)
+    return len(np.unique(ids)) == len(ids) and not np.isin(ids, known_ids).any()
+
+
+def read_new_listings(csv_path, offset, known_ids, columns=None):
+    """Lignes ajoutées au CSV après l'octet offset, typées (avec annonce_id) ; None si elles
+    contiennent une annonce déjà connue ou en double : le fichier entier doit alors être dédoublonné"""
+    from storage import read_appended_rows, typed_frame
+
+    usecols = None
+    if columns is not None:
+        wanted = set(columns) | {'containers_links-href', 'web-scraper-order'}
+        usecols = wanted.__contains__
+    df = typed_frame(read_appended_rows(csv_path, offset, usecols))
+    if 'annonce_id' in df and not is_new_block(known_ids, df['annonce_id']):
+        return None
+    return df
@@ -0,0 +1,112 @@
+"""Fichiers de téléchargement générés à la demande, par blocs, dans plusieurs formats compressés"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from storage import HAS_PARQUET
+
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'exports')
+EXPORT_TTL = 24 * 3600   # les exports plus anciens sont supprimés
+CHUNK_ROWS = 20_000
+
+
+def _frame_chunks(df):
+    """Découpe un DataFrame en blocs de CHUNK_ROWS lignes (au moins un bloc, éventuellement vide)"""
+    for start in range(0, max(len(df), 1), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def _write_csv_gz(chunks, path):
+    with gzip.open(path, 'wt', newline='', encoding='utf-8') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+
+
+def _write_jsonl(chunks, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            if len(chunk):
+                chunk.to_json(f, orient='records', lines=True, force_ascii=False)
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                # Schéma tiré du premier bloc : les blocs suivants ont les mêmes types
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, schema, compression='zstd')
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Libellé -> (extension, type MIME, fonction d'écriture)
+EXPORT_FORMATS = {
+    'CSV (gzip)': ('.csv.gz', 'application/gzip', _write_csv_gz),
+    'JSON Lines': ('.jsonl', 'application/x-ndjson', _write_jsonl),
+}
+if HAS_PARQUET:
+    EXPORT_FORMATS['Parquet'] = ('.parquet', 'application/vnd.apache.parquet', _write_parquet)
+
+
+def _prune():
+    """Supprime les exports expirés"""
+    limit = time.time() - EXPORT_TTL
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def export_file(df, name, fmt, source_key=None):
+    """Écrit (une seule fois) l'export d'un DataFrame et renvoie le chemin du fichier
+
+    source_key identifie le contenu (par exemple l'identité du fichier source) ; à défaut,
+    une empreinte du DataFrame est calculée.
+    """
+    if source_key is None:
+        source_key = (len(df), int(pd.util.hash_pandas_object(df, index=False).sum()))
+    return export_chunks(lambda: _frame_chunks(df), name, fmt, (source_key, list(df.columns)))
+
+
+def export_chunks(chunks, name, fmt, source_key):
+    """Écrit (une seule fois) l'export de blocs de lignes et renvoie le chemin du fichier
+
+    chunks() renvoie les blocs (DataFrames de mêmes colonnes et types, au moins un) ; il n'est
+    appelé que si l'export n'existe pas encore. source_key identifie le contenu.
+    """
+    extension, _, writer = EXPORT_FORMATS[fmt]
+    digest = hashlib.sha1(repr(source_key).encode('utf-8')).hexdigest()[:12]
+    safe_name = re.sub(r'[^\w.-]+', '_', os.path.splitext(name)[0])
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f'{safe_name}-{digest}{extension}')
+    if not os.path.exists(path):
+        _prune()
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        writer(chunks(), tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def download_name(name, fmt):
+    return os.path.splitext(name)[0] + EXPORT_FORMATS[fmt][0]
+
+
+def mime_type(fmt):
+    return EXPORT_FORMATS[fmt][1]
@@ -0,0 +1,252 @@
+"""Contrôle des téléchargements par site : débit adaptatif (AIMD), reprises avec backoff et disjoncteur
+
+Pour chaque site, le nombre de requêtes simultanées autorisées augmente doucement tant que les
+réponses sont rapides et réussies (+1 par fenêtre complète), et il est divisé par deux au premier
+signal de congestion : 429, erreur 5xx, délai dépassé, connexion coupée ou réponse très lente.
+Les erreurs temporaires sont retentées avec un backoff exponentiel aléatoire (ou le délai
+Retry-After du serveur). Après plusieurs pages perdues d'affilée, le disjoncteur s'ouvre : les
+requêtes vers ce site attendent la fin d'une pause, puis une requête test est tentée ; une page
+n'échoue que si le disjoncteur est encore ouvert après DISJONCTEUR_ATTENTE_MAX secondes d'attente.
+"""
+import email.utils
+import random
+import time
+from threading import Condition, Lock
+from urllib.parse import urlparse
+
+import requests
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MAX_TENTATIVES = 4          # tentatives par page, reprises comprises
+BACKOFF_BASE = 0.5          # secondes, doublé à chaque reprise (tirage aléatoire entre 0 et ce plafond)
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 120.0     # au-delà, le Retry-After du serveur est plafonné
+LATENCE_LENTE = 5.0         # une réponse plus lente que ceci compte comme un signal de congestion
+DISJONCTEUR_SEUIL = 5       # pages perdues d'affilée avant ouverture du disjoncteur
+DISJONCTEUR_PAUSE = 60.0    # secondes pendant lesquelles le disjoncteur reste ouvert
+DISJONCTEUR_ATTENTE_MAX = 300.0   # attente maximale d'une requête tant que le disjoncteur reste ouvert
+
+
+class FetchError(Exception):
+    """Page abandonnée après les reprises ; reason résume la dernière erreur"""
+
+    def __init__(self, url, reason):
+        super().__init__(f"{url} : {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class CircuitOpenError(FetchError):
+    pass
+
+
+def _retry_after(response):
+    """Délai Retry-After en secondes (nombre ou date HTTP), ou None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        if parsed is None:
+            return None
+        delay = parsed.timestamp() - time.time()
+    return min(max(delay, 0.0), RETRY_AFTER_MAX)
+
+
+def classify(error):
+    """Renvoie (motif, reprise possible, Retry-After) pour une exception de téléchargement"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return f'HTTP {status}', status in RETRYABLE_STATUS, _retry_after(error.response)
+    if isinstance(error, requests.Timeout):
+        return 'délai dépassé', True, None
+    if isinstance(error, (requests.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+        return 'connexion interrompue', True, None
+    return type(error).__name__, False, None
+
+
+class HostController:
+    """Fenêtre de requêtes simultanées (AIMD), pause Retry-After et disjoncteur d'un site
+
+    Chaque crawl passe sa propre limite à acquire et release : ses requêtes restent sous
+    min(fenêtre, sa limite) et la fenêtre ne croît que jusqu'à cette limite, sans changer celle des
+    autres crawls du site. max_limit est la limite des appels qui n'en donnent pas.
+    """
+
+    def __init__(self, max_limit, circuit_pause=DISJONCTEUR_PAUSE, circuit_wait=DISJONCTEUR_ATTENTE_MAX):
+        self.max_limit = max_limit
+        self.circuit_pause = circuit_pause
+        self.circuit_wait = circuit_wait
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.failures = 0
+        self.opened_at = None
+        self._last_decrease = 0.0
+        self._cond = Condition()
+
+    def acquire(self, url, max_limit=None):
+        """Attend une place dans la fenêtre du site (plafonnée à max_limit) ; lève CircuitOpenError si le
+        disjoncteur est encore ouvert après circuit_wait secondes"""
+        max_limit = max_limit or self.max_limit
+        with self._cond:
+            deadline = time.monotonic() + self.circuit_wait
+            while True:
+                now = time.monotonic()
+                if self.opened_at is not None and now < self.opened_at + self.circuit_pause:
+                    # Disjoncteur ouvert : attente de la requête test (il peut se rouvrir si elle échoue)
+                    if now >= deadline:
+                        raise CircuitOpenError(url, 'disjoncteur ouvert')
+                    self._cond.wait(min(self.opened_at + self.circuit_pause, deadline) - now)
+                    continue
+                if now < self.paused_until:
+                    self._cond.wait(self.paused_until - now)
+                    continue
+                # Disjoncteur refermé à l'essai : une seule requête test à la fois
+                window = 1 if self.opened_at is not None else max(1, min(int(self.limit), max_limit))
+                if self.in_flight < window:
+                    self.in_flight += 1
+                    return
+                self._cond.wait()
+
+    def release(self, congested, retry_after=None, max_limit=None):
+        max_limit = max_limit or self.max_limit
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if congested:
+                # Une seule réduction par épisode de congestion (les requêtes en vol échouent souvent ensemble) ;
+                # la fenêtre de l'appelant est divisée par deux, même si un autre crawl l'a portée plus haut
+                if now - self._last_decrease > 1.0:
+                    self.limit = max(1.0, min(self.limit, float(max_limit)) / 2)
+                    self._last_decrease = now
+            elif self.limit < max_limit:
+                self.limit = min(float(max_limit), self.limit + 1 / self.limit)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self._cond.notify_all()
+
+    def record_page(self, ok):
+        """Bilan d'une page (après reprises) pour le disjoncteur"""
+        with self._cond:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= DISJONCTEUR_SEUIL:
+                    self.opened_at = time.monotonic()
+            self._cond.notify_all()
+
+
+class FetchController:
+    """Téléchargements avec contrôle de débit par site, reprises et disjoncteur, et compteurs"""
+
+    def __init__(self, max_attempts=MAX_TENTATIVES, backoff_base=BACKOFF_BASE, circuit_pause=DISJONCTEUR_PAUSE,
+                 circuit_wait=DISJONCTEUR_ATTENTE_MAX):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.circuit_pause = circuit_pause
+        self.circuit_wait = circuit_wait
+        self._hosts = {}
+        self._lock = Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'server_errors': 0, 'timeouts': 0,
+                      'resets': 0, 'slow': 0, 'failed_pages': 0, 'circuit_open': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def host(self, url, max_limit):
+        """Contrôleur du site de l'URL, partagé par tous les crawls du processus
+
+        max_limit ne sert qu'à la création : chaque crawl passe ensuite sa limite à chaque requête.
+        """
+        netloc = urlparse(url).netloc
+        with self._lock:
+            host = self._hosts.get(netloc)
+            if host is None:
+                host = self._hosts[netloc] = HostController(max_limit, self.circuit_pause, self.circuit_wait)
+            return host
+
+    def limits(self):
+        """Fenêtre actuelle de chaque site (pour les traces et l'interface)"""
+        with self._lock:
+            return {netloc: round(host.limit, 2) for netloc, host in self._hosts.items()}
+
+    def fetch(self, url, get, max_limit):
+        """Renvoie get(url) ; lève FetchError (ou CircuitOpenError) si la page est abandonnée"""
+        host = self.host(url, max_limit)
+        for attempt in range(self.max_attempts):
+            try:
+                host.acquire(url, max_limit)
+            except CircuitOpenError:
+                self._count('circuit_open')
+                raise
+
+            start = time.monotonic()
+            try:
+                result = get(url)
+            except Exception as e:
+                reason, retryable, retry_after = classify(e)
+                self._count('requests')
+                self._count_error(e, reason)
+                host.release(congested=retryable, retry_after=retry_after if reason == 'HTTP 429' else None,
+                             max_limit=max_limit)
+                if not retryable or attempt == self.max_attempts - 1:
+                    if retryable:
+                        # Seules les pannes du site (pas une 404) comptent pour le disjoncteur
+                        host.record_page(False)
+                    self._count('failed_pages')
+                    raise FetchError(url, reason) from e
+                self._count('retries')
+                # Backoff exponentiel avec tirage aléatoire complet, ou délai imposé par le serveur
+                time.sleep(retry_after if retry_after is not None
+                           else random.uniform(0, min(BACKOFF_MAX, self.backoff_base * 2 ** attempt)))
+                continue
+
+            latency = time.monotonic() - start
+            self._count('requests')
+            if latency > LATENCE_LENTE:
+                self._count('slow')
+            host.release(congested=latency > LATENCE_LENTE, max_limit=max_limit)
+            host.record_page(True)
+            return result
+
+    def _count_error(self, error, reason):
+        if reason == 'HTTP 429':
+            self._count('throttled')
+        elif reason.startswith('HTTP 5'):
+            self._count('server_errors')
+        elif isinstance(error, requests.Timeout):
+            self._count('timeouts')
+        elif isinstance(error, (requests.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+            self._count('resets')
+
+
+_default_controller = None
+_default_lock = Lock()
+
+
+def get_controller():
+    """Contrôleur partagé par tous les scrapers du processus"""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = FetchController()
+        return _default_controller
+
+
+def configure_controller(max_attempts=MAX_TENTATIVES, backoff_base=BACKOFF_BASE, circuit_pause=DISJONCTEUR_PAUSE,
+                         circuit_wait=DISJONCTEUR_ATTENTE_MAX):
+    """Remplace le contrôleur partagé (état des sites et compteurs remis à zéro)"""
+    global _default_controller
+    with _default_lock:
+        _default_controller = FetchController(max_attempts, backoff_base, circuit_pause, circuit_wait)
+        return _default_controller
@@ -0,0 +1,277 @@
+"""Couche HTTP partagée : session poolée, cache disque des réponses et requêtes conditionnelles
+
+Les durées de connexion (DNS, TCP, TLS) et de téléchargement ainsi que les octets reçus sont
+cumulés pour le thread courant entre start_timing() et take_timing() (mesures par page).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'pages')
+# Secondes pendant lesquelles une page est servie sans requête. 0 : chaque passage revalide les pages
+# (If-None-Match / If-Modified-Since) ; les listes d'annonces changent trop souvent pour être resservies
+# telles quelles, une page non modifiée ne coûte qu'une réponse 304
+CACHE_TTL = 0
+CACHE_MAX_BYTES = 512 * 1024 * 1024   # taille maximale du cache avant éviction des plus anciennes pages
+POOL_SIZE = 16
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; AutoScrape-Dakar/1.0)',
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+
+_timing = threading.local()
+
+
+def start_timing():
+    """Commence à cumuler les mesures des requêtes du thread courant"""
+    _timing.current = {'connexion': 0.0, 'telechargement': 0.0, 'octets': 0, 'octets_cache': 0, 'connexions': 0}
+
+
+def take_timing():
+    """Renvoie les mesures cumulées depuis start_timing() (dictionnaire vide sinon) et arrête le cumul"""
+    current = getattr(_timing, 'current', None)
+    _timing.current = None
+    return current or {}
+
+
+def _add_timing(key, value):
+    current = getattr(_timing, 'current', None)
+    if current is not None:
+        current[key] += value
+
+
+def _connect_time():
+    current = getattr(_timing, 'current', None)
+    return current['connexion'] if current else 0.0
+
+
+class _TimedConnect:
+    """Mesure l'ouverture des connexions (résolution DNS, TCP, poignée de main TLS) ;
+    une connexion réutilisée (keep-alive) ne coûte rien"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_timing('connexion', time.perf_counter() - start)
+            _add_timing('connexions', 1)
+
+
+class _TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """Adaptateur requests dont les pools ouvrent des connexions mesurées"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+
+class ResponseCache:
+    """Cache disque des pages : un fichier corps + un fichier méta (ETag, Last-Modified, date) par URL"""
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(os.path.join(directory, name))
+                                for name in os.listdir(directory) if name.endswith('.body'))
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.body', base + '.json'
+
+    def get(self, url):
+        """Renvoie (corps, méta) de l'URL en cache, ou (None, None)"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        # La date d'accès sert à l'éviction LRU
+        os.utime(body_path)
+        return body, meta
+
+    def is_fresh(self, meta):
+        return time.time() - meta['fetched_at'] < self.ttl
+
+    def put(self, url, body, etag=None, last_modified=None, encoding=None):
+        body_path, meta_path = self._paths(url)
+        previous = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified, 'encoding': encoding,
+                'fetched_at': time.time()}
+        # Écriture atomique pour les accès concurrents
+        for path, content, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta), 'w')):
+            # Nom propre au thread : une revalidation (touch) peut écrire la même URL qu'un téléchargement
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, mode) as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += len(body) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def touch(self, url):
+        """Marque une entrée comme fraîche après une revalidation 304"""
+        body, meta = self.get(url)
+        if body is not None:
+            self.put(url, body, meta['etag'], meta['last_modified'], meta.get('encoding'))
+
+    def _evict(self):
+        """Supprime les pages les moins récemment utilisées jusqu'à repasser sous 90 % de la taille maximale"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.body'):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getatime(path), os.path.getsize(path), path))
+                except OSError:
+                    continue
+        entries.sort()
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            for stale in (path, path[:-len('.body')] + '.json'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            self._total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+            self._total_bytes = 0
+
+
+def wire_bytes(response):
+    """Octets du corps reçus sur le réseau (compressés si le site a répondu en gzip)"""
+    # Après lecture du contenu, urllib3 connaît le nombre d'octets lus avant décompression
+    read = response.raw.tell() if response.raw is not None else 0
+    return read or len(response.content)
+
+
+class HttpClient:
+    """Session requests poolée (keep-alive, compression) avec cache disque optionnel et compteurs"""
+
+    def __init__(self, cache=None, timeout=30, pool_size=POOL_SIZE):
+        self.cache = cache
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = TimedAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_downloaded': 0, 'bytes_from_cache': 0}
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def get_text(self, url):
+        """Renvoie le HTML de l'URL, depuis le cache si possible ; lève une exception sur erreur HTTP"""
+        body, meta = self.cache.get(url) if self.cache else (None, None)
+
+        if body is not None and self.cache.is_fresh(meta):
+            self._count('hits')
+            self._count('bytes_from_cache', len(body))
+            _add_timing('octets_cache', len(body))
+            return body.decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+        headers = {}
+        if body is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        # Téléchargement : durée de la requête (réponse lue en entier), connexion éventuelle exclue
+        connect_before = _connect_time()
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        finally:
+            _add_timing('telechargement', time.perf_counter() - start - (_connect_time() - connect_before))
+
+        if response.status_code == 304 and body is not None:
+            self._count('revalidated')
+            self._count('bytes_from_cache', len(body))
+            _add_timing('octets_cache', len(body))
+            self.cache.touch(url)
+            return body.decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+        response.raise_for_status()
+        self._count('misses')
+        self._count('bytes_downloaded', wire_bytes(response))
+        _add_timing('octets', wire_bytes(response))
+        if self.cache:
+            self.cache.put(url, response.content, response.headers.get('ETag'),
+                           response.headers.get('Last-Modified'), response.encoding)
+        return response.text
+
+    def hit_rate(self):
+        total = self.stats['hits'] + self.stats['revalidated'] + self.stats['misses']
+        return (self.stats['hits'] + self.stats['revalidated']) / total if total else 0.0
+
+
+_default_client = None
+_default_lock = Lock()
+
+
+def get_client():
+    """Client HTTP partagé par tous les scrapers (créé au premier appel, avec cache disque)"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient(cache=ResponseCache())
+        return _default_client
+
+
+def configure_client(cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, use_cache=True, timeout=30):
+    """Remplace le client partagé (par exemple pour désactiver le cache, changer sa durée de vie ou le délai maximal)"""
+    global _default_client
+    with _default_lock:
+        cache = ResponseCache(cache_dir, ttl, max_bytes) if use_cache else None
+        _default_client = HttpClient(cache=cache, timeout=timeout)
+        return _default_client
@@ -0,0 +1,284 @@
+"""Moteur d'extraction des cartes d'annonces dakar-auto, piloté par une spécification de champs par catégorie"""
+import re
+import time
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+CONTAINER_CLASS = 'listings-cards__list-item'
+
+# Sélecteurs CSS des éléments lus dans chaque carte
+SELECTEURS = {
+    'prix': '.listing-card__header__price',
+    'titre': '.listing-card__header__title a',
+    'adresse': '.entry-zone-address',
+    'auteur': '.time-author a',
+    'attribut': '.listing-card__attribute',
+}
+
+# Icône -> champ pour les attributs de carte (kilométrage, boîte, carburant)
+ICONES = [
+    ('icon-road-perspective', 'kilometrage'),
+    ('icon-gear-icon', 'boite_vitesse'),
+    ('icon-fuel', 'carburant'),
+]
+
+# Colonnes produites pour chaque catégorie : (colonne, champ extrait)
+SPECS = {
+    'voitures': [
+        ('V1', 'marque'),
+        ('V2', 'annee'),
+        ('V3', 'prix'),
+        ('V4', 'adresse'),
+        ('V5', 'kilometrage'),
+        ('V6', 'boite_vitesse'),
+        ('V7', 'carburant'),
+        ('V8', 'proprietaire'),
+    ],
+    'motos': [
+        ('V1', 'marque'),
+        ('V2', 'annee'),
+        ('V3', 'prix'),
+        ('V4', 'adresse'),
+        ('V5', 'kilometrage'),
+        ('V6', 'proprietaire'),
+    ],
+    'location': [
+        ('V1', 'marque'),
+        ('V2', 'annee'),
+        ('V3', 'prix'),
+        ('V4', 'adresse'),
+        ('V5', 'proprietaire'),
+    ],
+}
+
+_NON_CHIFFRES = re.compile(r"[^\d]")
+_ANNONCE_ID = re.compile(r"annonce-(\d+)")
+
+
+def annonce_id(url):
+    """Identifiant stable d'une annonce à partir de son URL ('.../annonce-133859' -> 133859)"""
+    match = _ANNONCE_ID.search(url or '')
+    return int(match.group(1)) if match else None
+
+
+def listing_fragment(html):
+    """Renvoie la partie du document qui commence à la première annonce (entête, menus et scripts ignorés)"""
+    index = html.find(CONTAINER_CLASS)
+    if index == -1:
+        return ''
+    return html[html.rfind('<', 0, index):]
+
+
+# --- Backends : chacun fournit les cartes, le texte d'un sélecteur et les attributs (texte, classes d'icône)
+
+class HtmlParserBackend:
+    """Backend de repli basé sur BeautifulSoup et html.parser"""
+    name = 'html.parser'
+
+    def __init__(self):
+        # Import à la première utilisation : les autres backends n'ont pas besoin de BeautifulSoup
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer(class_=CONTAINER_CLASS)
+
+    def cards(self, fragment):
+        return self._soup(fragment, 'html.parser', parse_only=self._strainer).select('.' + CONTAINER_CLASS)
+
+    def text(self, card, key):
+        element = card.select_one(SELECTEURS[key])
+        return element.text if element else None
+
+    def href(self, card, key):
+        element = card.select_one(SELECTEURS[key])
+        return element.get('href') if element else None
+
+    def attributes(self, card):
+        for attr in card.select(SELECTEURS['attribut']):
+            icon = attr.find('i')
+            yield attr.text, (icon.get('class', []) if icon else None)
+
+
+def _css_to_xpath(selector):
+    """Traduit un sélecteur simple ('.classe tag') en XPath relatif"""
+    steps = []
+    for token in selector.split():
+        if token.startswith('.'):
+            steps.append(f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {token[1:]} ')]")
+        else:
+            steps.append(f'//{token}')
+    return '.' + ''.join(steps)
+
+
+class LxmlBackend:
+    """Backend lxml avec des expressions XPath précompilées"""
+    name = 'lxml'
+
+    def __init__(self):
+        # descendant-or-self : un fragment d'une seule carte est renvoyé par fromstring comme racine
+        self._cards = etree.XPath(f"descendant-or-self::*[contains(concat(' ', normalize-space(@class), ' '), "
+                                  f"' {CONTAINER_CLASS} ')]")
+        self._xpaths = {key: etree.XPath(_css_to_xpath(sel)) for key, sel in SELECTEURS.items()}
+        self._icon = etree.XPath('.//i')
+
+    def cards(self, fragment):
+        if not fragment:
+            return []
+        return self._cards(lxml.html.fromstring(fragment))
+
+    def text(self, card, key):
+        elements = self._xpaths[key](card)
+        return elements[0].text_content() if elements else None
+
+    def href(self, card, key):
+        elements = self._xpaths[key](card)
+        return elements[0].get('href') if elements else None
+
+    def attributes(self, card):
+        for attr in self._xpaths['attribut'](card):
+            icons = self._icon(attr)
+            yield attr.text_content(), (icons[0].get('class', '').split() if icons else None)
+
+
+class SelectolaxBackend:
+    """Backend selectolax (moteur Lexbor), le plus rapide quand il est installé"""
+    name = 'selectolax'
+
+    def cards(self, fragment):
+        return LexborHTMLParser(fragment).css('.' + CONTAINER_CLASS)
+
+    def text(self, card, key):
+        element = card.css_first(SELECTEURS[key])
+        return element.text(deep=True) if element else None
+
+    def href(self, card, key):
+        element = card.css_first(SELECTEURS[key])
+        return element.attributes.get('href') if element else None
+
+    def attributes(self, card):
+        for attr in card.css(SELECTEURS['attribut']):
+            icon = attr.css_first('i')
+            yield attr.text(deep=True), ((icon.attributes.get('class') or '').split() if icon else None)
+
+
+BACKENDS = {'html.parser': HtmlParserBackend}
+if lxml is not None:
+    BACKENDS['lxml'] = LxmlBackend
+if LexborHTMLParser is not None:
+    BACKENDS['selectolax'] = SelectolaxBackend
+
+# Backend par défaut : le plus rapide disponible
+DEFAULT_BACKEND = 'selectolax' if LexborHTMLParser is not None else 'lxml' if lxml is not None else 'html.parser'
+
+_instances = {}
+
+
+def get_backend(name=None):
+    """Renvoie l'instance (partagée) du backend demandé"""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de parsing inconnu ou non installé: {name}")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+# --- Extraction des champs
+
+def _stripped(value):
+    return value.strip() if value is not None else None
+
+
+def extract_card(backend, card, fields):
+    """Extrait les champs demandés d'une carte ; lève une exception si la carte est invalide"""
+    values = {}
+
+    if 'prix' in fields:
+        prix = _stripped(backend.text(card, 'prix')) or ''
+        values['prix'] = int(_NON_CHIFFRES.sub("", prix)) if prix else None
+
+    if 'marque' in fields or 'annee' in fields:
+        titre = _stripped(backend.text(card, 'titre'))
+        nom_complet = titre.split() if titre is not None else []
+        values['marque'] = nom_complet[0] if nom_complet else None
+        values['annee'] = nom_complet[-1] if nom_complet else None
+
+    if 'adresse' in fields:
+        values['adresse'] = _stripped(backend.text(card, 'adresse'))
+
+    if 'proprietaire' in fields:
+        publie_par = _stripped(backend.text(card, 'auteur'))
+        values['proprietaire'] = publie_par[4:] if publie_par else None
+
+    if any(field in fields for _, field in ICONES):
+        values['kilometrage'] = values['boite_vitesse'] = values['carburant'] = None
+        for text, classes in backend.attributes(card):
+            if not classes:
+                continue
+            text = text.strip()
+            for icon, field in ICONES:
+                if icon in classes:
+                    values[field] = int(text.replace(' km', '').replace(' ', '')) if field == 'kilometrage' else text
+                    break
+
+    return values
+
+
+def parse_listing_page(html, category, backend=None, with_id=False, stats=None):
+    """Extrait les lignes (colonnes V1..Vn de la catégorie) de toutes les annonces d'une page
+
+    Avec with_id=True, chaque ligne commence par la colonne 'annonce_id' tirée du lien de l'annonce.
+    Si stats (dictionnaire) est fourni, il reçoit les durées d'analyse et d'extraction, le nombre de
+    cartes et de cartes en erreur, les champs vides ({champ: lignes}) et la dernière erreur.
+    """
+    spec = SPECS[category]
+    fields = {field for _, field in spec}
+    backend = get_backend(backend)
+
+    start = time.perf_counter()
+    cards = backend.cards(listing_fragment(html))
+    parsed = time.perf_counter()
+    rows = []
+    errors = 0
+    last_error = None
+    for card in cards:
+        try:
+            values = extract_card(backend, card, fields)
+            row = {'annonce_id': annonce_id(backend.href(card, 'titre'))} if with_id else {}
+            row.update((column, values[field]) for column, field in spec)
+            rows.append(row)
+        except Exception as e:
+            # Carte en erreur (sélecteur cassé, format inattendu) : comptée, la page continue
+            errors += 1
+            last_error = f"{type(e).__name__}: {e}"
+            continue
+
+    if stats is not None:
+        stats['analyse'] = parsed - start
+        stats['extraction'] = time.perf_counter() - parsed
+        stats['cartes'] = len(cards)
+        stats['lignes'] = len(rows)
+        stats['erreurs_cartes'] = errors
+        stats['derniere_erreur'] = last_error
+        stats['champs_vides'] = {field: sum(row[column] is None for row in rows) for column, field in spec}
+    return rows
+
+
+def parse_page_compact(html, category, backend=None, with_id=False):
+    """parse_listing_page pour un processus d'analyse : renvoie (colonnes, lignes en tuples, mesures)
+
+    Des tuples et une seule liste de colonnes coûtent moins cher à transmettre entre processus que des dictionnaires.
+    """
+    stats = {}
+    rows = parse_listing_page(html, category, backend, with_id=with_id, stats=stats)
+    columns = list(rows[0]) if rows else []
+    return columns, [tuple(row.values()) for row in rows], stats
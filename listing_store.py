@@ -0,0 +1,456 @@
+"""Entrepôt SQLite des annonces : le dashboard, les tableaux et les exports l'interrogent au lieu de charger les CSV
+
+Les jeux de data/ et les résultats de scraping y sont ingérés une fois, en flux par blocs et
+dédoublonnés (dedup.py). Chaque annonce est une ligne de la table annonces, étroite : champs
+normalisés (catégorie, marque, année, prix, kilométrage, localisation, identifiant), indexés. La
+ligne d'origine complète est rangée à part, en JSON, dans la table lignes. Les filtres, comptages
+et agrégats ne parcourent que la table étroite ; seules les lignes de la page affichée (ou d'un
+bloc d'export) sont lues et décodées : un jeu plus gros que la mémoire reste consultable.
+
+Un jeu est réingéré quand son CSV change (taille ou début du fichier) ; un CSV complété en fin
+par des annonces nouvelles n'ajoute que ses nouvelles lignes.
+"""
+import json
+import os
+import sqlite3
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from cleaning import parse_numeric
+from dedup import DATASET_FIELDS, Deduplicator, dedup_frame, read_new_listings
+from listing_parser import SPECS
+from storage import DATA_DIR, head_hash, typed_frame
+
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'entrepot_annonces.sqlite')
+CHUNK_ROWS = 20_000
+
+# Catégorie des exports Web Scraper de data/
+DATASET_CATEGORIES = {
+    'dakar-voiture-2753-sitemap.csv': 'voitures',
+    'data_to_analyse.csv': 'voitures',
+    'motos-scooters-sitemap.csv': 'motos',
+    'dakar-location-voitures-sitemap.csv': 'location',
+}
+
+# Champs normalisés de la table annonces (la marque est le premier mot du titre)
+TEXT_FIELDS = ['marque', 'adresse', 'boite_vitesse', 'carburant']
+NUMERIC_FIELDS = ['annee', 'prix', 'kilometrage']
+
+# Index -> colonnes ; les filtres des tableaux portent toujours sur un seul jeu. Les index de la
+# marque, de l'année et du prix contiennent aussi les deux autres : quel que soit l'index choisi,
+# les comptages et les pages filtrés par ces champs se font sans lire la table
+_INDEXES = {
+    'categorie': ('categorie', 'jeu'),
+    'marque': ('jeu', 'marque', 'annee', 'prix'),
+    'annee': ('jeu', 'annee', 'prix', 'marque'),
+    'prix': ('jeu', 'prix', 'annee', 'marque'),
+    'adresse': ('jeu', 'adresse'),
+    'annonce_id': ('annonce_id',),
+}
+# Lignes exploitables par le dashboard : année, prix et kilométrage connus
+_COMPLETE = ' AND '.join(f'{field} IS NOT NULL' for field in NUMERIC_FIELDS)
+
+
+def field_columns(columns, category):
+    """Champ normalisé -> colonne source : V1..Vn des données scrapées, sinon colonnes nommées de data/"""
+    if 'V1' in columns and category in SPECS:
+        return {field: column for column, field in SPECS[category] if column in columns}
+    return {field: field for field in TEXT_FIELDS + NUMERIC_FIELDS if field in columns}
+
+
+def _dtype_name(dtype):
+    """Type pandas sous lequel une colonne est reconstituée depuis le JSON"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'Int64'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float64'
+    return 'string'
+
+
+def _nullable(values):
+    """Liste Python (None pour les valeurs manquantes) liable par sqlite3"""
+    return [None if pd.isna(value) else value for value in values]
+
+
+def _contains(text, pattern):
+    """Sous-chaîne insensible à la casse (LIKE de SQLite ne replie que l'ASCII)"""
+    return text is not None and pattern.casefold() in text.casefold()
+
+
+def _connect(path, **kwargs):
+    conn = sqlite3.connect(path, timeout=60, check_same_thread=False, **kwargs)
+    conn.create_function('contient', 2, _contains, deterministic=True)
+    return conn
+
+
+class ListingStore:
+    """Table des annonces de tous les jeux ingérés, et requêtes du dashboard, des tableaux et des exports"""
+
+    def __init__(self, path=None):
+        self.path = path or STORE_PATH
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = _connect(self.path)
+        self._lock = Lock()
+        with self._lock, self.conn:
+            # WAL : les requêtes de l'interface ne sont pas bloquées par une ingestion
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS jeux (
+                    jeu INTEGER PRIMARY KEY,
+                    chemin TEXT NOT NULL UNIQUE,
+                    categorie TEXT,
+                    colonnes TEXT NOT NULL,
+                    source_size INTEGER NOT NULL,
+                    head_hash TEXT NOT NULL,
+                    lignes INTEGER NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS annonces (
+                    jeu INTEGER NOT NULL,
+                    rang INTEGER NOT NULL,
+                    categorie TEXT,
+                    annonce_id INTEGER,
+                    marque TEXT,
+                    annee INTEGER,
+                    prix INTEGER,
+                    kilometrage INTEGER,
+                    adresse TEXT,
+                    boite_vitesse TEXT,
+                    carburant TEXT,
+                    statut_annonce TEXT,
+                    prix_precedent INTEGER,
+                    PRIMARY KEY (jeu, rang)
+                ) WITHOUT ROWID
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS lignes (
+                    jeu INTEGER NOT NULL,
+                    rang INTEGER NOT NULL,
+                    donnees TEXT NOT NULL,
+                    PRIMARY KEY (jeu, rang)
+                ) WITHOUT ROWID
+            ''')
+            for name, columns in _INDEXES.items():
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_annonces_{name} ON annonces ({", ".join(columns)})')
+            # Index partiel couvrant les agrégats du dashboard
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_annonces_dashboard ON annonces '
+                              f'(jeu, annee, carburant, boite_vitesse, prix, kilometrage) WHERE {_COMPLETE}')
+
+    # --- Ingestion
+
+    @staticmethod
+    def _state(conn, path):
+        row = conn.execute('SELECT jeu, source_size, head_hash, lignes, colonnes FROM jeux WHERE chemin = ?',
+                           (path,)).fetchone()
+        return None if row is None else {'jeu': row[0], 'source_size': row[1], 'head_hash': row[2],
+                                         'lignes': row[3], 'colonnes': json.loads(row[4])}
+
+    def ensure(self, csv_path, category=None, deduplicate=True):
+        """Ingère le CSV s'il a changé depuis la dernière ingestion ; renvoie l'identifiant (entier) du jeu
+
+        deduplicate=False pour un fichier déjà dédoublonné (résultats des tâches de scraping).
+        """
+        csv_path = csv_path if os.path.isabs(csv_path) else os.path.join(DATA_DIR, csv_path)
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(csv_path)
+        path = os.path.abspath(csv_path)
+        category = category or DATASET_CATEGORIES.get(os.path.basename(csv_path))
+        size = os.path.getsize(csv_path)
+        head = head_hash(csv_path)
+        with self._lock:
+            state = self._state(self.conn, path)
+        if state and state['source_size'] == size and state['head_hash'] == head:
+            return state['jeu']
+
+        # Connexion dédiée : les requêtes des autres sessions continuent pendant l'ingestion ;
+        # isolation_level=None : la transaction est ouverte explicitement (BEGIN IMMEDIATE)
+        conn = _connect(self.path, isolation_level=None)
+        try:
+            # BEGIN IMMEDIATE : deux sessions qui ingèrent le même fichier ne le font qu'une fois
+            conn.execute('BEGIN IMMEDIATE')
+            state = self._state(conn, path)
+            if state and state['source_size'] == size and state['head_hash'] == head:
+                jeu = state['jeu']
+            else:
+                jeu = self._ingest(conn, path, category, deduplicate, state, size, head)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            # Une ingestion écrit tout le jeu dans le WAL : il est reporté dans la base tout de suite,
+            # sinon les lectures suivantes passent par un WAL de plusieurs centaines de Mo
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            conn.close()
+        with self._lock:
+            # La connexion partagée garde les statistiques lues à son ouverture : elle les recharge,
+            # sinon le tirage par rang passe par l'index du dashboard au lieu de la clé primaire
+            self.conn.execute('ANALYZE sqlite_schema')
+        return jeu
+
+    def _ingest(self, conn, csv_path, category, deduplicate, state, size, head):
+        """Ingère (ou complète) un jeu dans la transaction en cours ; renvoie son identifiant"""
+        if state is None:
+            jeu = conn.execute("INSERT INTO jeux (chemin, categorie, colonnes, source_size, head_hash, lignes) "
+                               "VALUES (?, ?, '[]', 0, '', 0)", (csv_path, category)).lastrowid
+        else:
+            jeu = state['jeu']
+        appended = None
+        if state and state['source_size'] < size and state['head_hash'] == head:
+            # Fichier complété en fin par des annonces nouvelles : seules les nouvelles lignes sont ajoutées
+            known = np.array([row[0] for row in conn.execute(
+                'SELECT annonce_id FROM annonces WHERE jeu = ? AND annonce_id IS NOT NULL', (jeu,))], dtype=np.int64)
+            appended = read_new_listings(csv_path, state['source_size'], known)
+
+        if appended is not None:
+            chunk = dedup_frame(appended) if deduplicate else appended
+            columns = state['colonnes']
+            rows = state['lignes'] + self._insert(conn, jeu, category, chunk, state['lignes'], columns)
+        else:
+            conn.execute('DELETE FROM annonces WHERE jeu = ?', (jeu,))
+            conn.execute('DELETE FROM lignes WHERE jeu = ?', (jeu,))
+            columns = None
+            rows = 0
+            for chunk in self._typed_chunks(csv_path, deduplicate):
+                if columns is None:
+                    columns = [[name, _dtype_name(dtype)] for name, dtype in chunk.dtypes.items()]
+                rows += self._insert(conn, jeu, category, chunk, rows, columns)
+        conn.execute('UPDATE jeux SET categorie = ?, colonnes = ?, source_size = ?, head_hash = ?, lignes = ? '
+                     'WHERE jeu = ?', (category, json.dumps(columns or []), size, head, rows, jeu))
+        # Statistiques des index pour le planificateur (choix entre l'index de la marque et celui du prix)
+        conn.execute('ANALYZE annonces')
+        return jeu
+
+    @staticmethod
+    def _typed_chunks(csv_path, deduplicate):
+        """Blocs typés du CSV ; avec deduplicate, deux passages (dedup.Deduplicator) et seules les lignes retenues"""
+        def chunks():
+            # Lecture en texte : le typage ne dépend pas du découpage en blocs
+            for chunk in pd.read_csv(csv_path, chunksize=CHUNK_ROWS, dtype=str, keep_default_na=False,
+                                     na_values=['']):
+                chunk = typed_frame(chunk)
+                for column in ('annonce_id', 'prix_precedent'):
+                    if column in chunk and not pd.api.types.is_numeric_dtype(chunk[column]):
+                        chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype('Int64')
+                yield chunk
+
+        if not deduplicate:
+            yield from chunks()
+            return
+        dedup = Deduplicator(DATASET_FIELDS)
+        try:
+            for chunk in chunks():
+                if 'annonce_id' not in chunk:
+                    # Pas d'identifiant d'annonce : rien à dédoublonner
+                    yield from chunks()
+                    return
+                dedup.scan(chunk)
+            for chunk in chunks():
+                yield dedup.filter(chunk)
+        finally:
+            dedup.close()
+
+    @staticmethod
+    def _insert(conn, jeu, category, chunk, start, columns):
+        """Ajoute un bloc de lignes à partir du rang start ; renvoie le nombre de lignes ajoutées"""
+        if chunk.empty:
+            return 0
+        fields = field_columns(chunk.columns, category)
+        values = {}
+        for field in NUMERIC_FIELDS:
+            numbers = parse_numeric(chunk[fields[field]], field) if field in fields else np.full(len(chunk), np.nan)
+            values[field] = [None if np.isnan(v) else int(v) for v in numbers]
+        for field in TEXT_FIELDS:
+            if field not in fields:
+                values[field] = [None] * len(chunk)
+                continue
+            text = chunk[fields[field]].astype('string').str.replace(r'\s+', ' ', regex=True).str.strip()
+            if field == 'marque':
+                text = text.str.split().str[0]
+            values[field] = _nullable(text.replace('', pd.NA))
+        for column in ('annonce_id', 'statut_annonce', 'prix_precedent'):
+            values[column] = _nullable(chunk[column].astype(object)) if column in chunk else [None] * len(chunk)
+        values['annonce_id'] = [None if v is None else int(v) for v in values['annonce_id']]
+        values['prix_precedent'] = [None if v is None else int(v) for v in values['prix_precedent']]
+
+        # Ligne d'origine : colonnes du jeu dans l'ordre enregistré à la première ingestion
+        names = [name for name, _ in columns]
+        # (les retours à la ligne sont échappés dans le JSON : une ligne par enregistrement)
+        donnees = chunk.reindex(columns=names).to_json(orient='records', lines=True, force_ascii=False)
+        donnees = donnees.rstrip('\n').split('\n')
+        ranks = range(start, start + len(chunk))
+        conn.executemany(
+            'INSERT INTO annonces VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            zip([jeu] * len(chunk), ranks, [category] * len(chunk),
+                values['annonce_id'], values['marque'], values['annee'], values['prix'], values['kilometrage'],
+                values['adresse'], values['boite_vitesse'], values['carburant'], values['statut_annonce'],
+                values['prix_precedent']))
+        conn.executemany('INSERT INTO lignes VALUES (?, ?, ?)', zip([jeu] * len(chunk), ranks, donnees))
+        return len(chunk)
+
+    # --- Requêtes
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def columns(self, jeu):
+        """[(colonne, type pandas), ...] du jeu, dans l'ordre du CSV"""
+        rows = self._query('SELECT colonnes FROM jeux WHERE jeu = ?', (jeu,))
+        return [tuple(column) for column in json.loads(rows[0][0])] if rows else []
+
+    @staticmethod
+    def _where(jeu, filters=None):
+        """Clause WHERE et paramètres ; filtres : marques, annees, prix (bornes), adresse (sous-chaîne), complets"""
+        filters = filters or {}
+        clauses = ['jeu = ?']
+        params = [jeu]
+        if filters.get('marques'):
+            clauses.append(f"marque IN ({','.join('?' * len(filters['marques']))})")
+            params.extend(filters['marques'])
+        for field in ('annees', 'prix'):
+            if filters.get(field) is not None:
+                column = 'annee' if field == 'annees' else field
+                clauses.append(f'{column} BETWEEN ? AND ?')
+                params.extend(filters[field])
+        if filters.get('adresse'):
+            clauses.append('contient(adresse, ?)')
+            params.append(filters['adresse'])
+        if filters.get('complets'):
+            clauses.append(_COMPLETE)
+        return ' AND '.join(clauses), params
+
+    def count(self, jeu, filters=None):
+        where, params = self._where(jeu, filters)
+        return self._query(f'SELECT COUNT(*) FROM annonces WHERE {where}', params)[0][0]
+
+    def distinct(self, jeu, field):
+        """Valeurs distinctes d'un champ normalisé, triées (lecture de l'index seul)"""
+        return [row[0] for row in self._query(
+            f'SELECT DISTINCT {field} FROM annonces WHERE jeu = ? AND {field} IS NOT NULL ORDER BY {field}', (jeu,))]
+
+    def bounds(self, jeu, field):
+        """(minimum, maximum) d'un champ numérique normalisé, ou None"""
+        # Deux requêtes : MIN et MAX séparés sont chacun une seule lecture d'index
+        low = self._query(f'SELECT MIN({field}) FROM annonces WHERE jeu = ?', (jeu,))[0][0]
+        high = self._query(f'SELECT MAX({field}) FROM annonces WHERE jeu = ?', (jeu,))[0][0]
+        return None if low is None else (low, high)
+
+    def grouped_totals(self, jeu, fields, filters=None):
+        """[(valeurs des champs..., lignes, somme des prix, somme des kilométrages), ...] en un seul parcours"""
+        where, params = self._where(jeu, filters)
+        columns = ', '.join(fields)
+        return self._query(f'SELECT {columns}, COUNT(*), TOTAL(prix), TOTAL(kilometrage) FROM annonces '
+                           f'WHERE {where} GROUP BY {columns}', params)
+
+    def sample(self, jeu, fields, n, filters=None, count=None, seed=0):
+        """Au plus n points (tableau n x len(fields)) tirés uniformément, de façon reproductible
+
+        Des rangs sont tirés au hasard puis lus par clé primaire : le jeu n'est pas parcouru. count
+        est le nombre de lignes qui passent les filtres, s'il est déjà connu.
+        """
+        where, params = self._where(jeu, filters)
+        columns = ', '.join(fields)
+        count = self.count(jeu, filters) if count is None else count
+        if count <= n:
+            rows = self._query(f'SELECT {columns} FROM annonces WHERE {where}', params)
+        else:
+            total = self._query('SELECT lignes FROM jeux WHERE jeu = ?', (jeu,))[0][0]
+            # Tirage un peu plus large que n / (proportion de lignes retenues), complété si besoin
+            rng = np.random.default_rng(seed)
+            rows = []
+            drawn = set()
+            step = int(n * total / count * 1.2) + 1
+            while len(rows) < n and len(drawn) < total:
+                remaining = total - len(drawn)
+                if remaining <= step:
+                    # Fin du jeu : les rangs pas encore tirés, dans le désordre
+                    ranks = rng.permutation(np.setdiff1d(np.arange(total), list(drawn))).tolist()
+                else:
+                    # Tirage sans remise (rng.choice) : O(step) quand step est petit devant le jeu, pas de
+                    # permutation de tous les rangs
+                    ranks = [rank for rank in rng.choice(total, size=step, replace=False).tolist()
+                             if rank not in drawn]
+                drawn.update(ranks)
+                for i in range(0, len(ranks), 900):
+                    batch = ranks[i:i + 900]
+                    rows += self._query(f"SELECT {columns} FROM annonces WHERE {where} AND rang IN "
+                                        f"({','.join('?' * len(batch))})", [*params, *batch])
+            rows = rows[:n]
+        return np.array(rows, dtype='float64').reshape(-1, len(fields))
+
+    def _frame(self, jeu, rows):
+        """DataFrame des lignes d'origine [(rang, donnees JSON), ...], indexé par rang"""
+        columns = self.columns(jeu)
+        names = [name for name, _ in columns]
+        df = pd.DataFrame.from_records([json.loads(donnees) for _, donnees in rows], columns=names,
+                                       index=pd.Index([rang for rang, _ in rows]))
+        return df.astype(dict(columns))
+
+    def _rows(self, jeu, ranks):
+        """Lignes d'origine des rangs donnés, dans cet ordre"""
+        donnees = {}
+        for i in range(0, len(ranks), 900):
+            batch = ranks[i:i + 900]
+            donnees.update(self._query(f"SELECT rang, donnees FROM lignes WHERE jeu = ? AND rang IN "
+                                       f"({','.join('?' * len(batch))})", [jeu, *batch]))
+        return [(rang, donnees[rang]) for rang in ranks]
+
+    def page(self, jeu, filters=None, sort_by=None, descending=False, offset=0, limit=25):
+        """Une page de lignes d'origine filtrées et triées ; seules ces lignes sont lues et décodées"""
+        where, params = self._where(jeu, filters)
+        source = 'annonces'
+        order = 'rang'
+        order_params = []
+        if sort_by is not None:
+            category = self._query('SELECT categorie FROM jeux WHERE jeu = ?', (jeu,))[0][0]
+            field = {column: field for field, column in field_columns(dict(self.columns(jeu)), category).items()}
+            if field.get(sort_by) in NUMERIC_FIELDS + ['adresse', 'boite_vitesse', 'carburant']:
+                # Colonne normalisée de la table étroite (la marque normalisée n'est que le premier mot)
+                expr = field[sort_by]
+            else:
+                # Autre colonne : valeur de la ligne d'origine (lecture de toutes les lignes filtrées)
+                source = 'annonces JOIN lignes USING (jeu, rang)'
+                expr = 'json_extract(donnees, ?)'
+                order_params = ['$.' + json.dumps(sort_by)] * 2
+            order = f"{expr} IS NULL, {expr} {'DESC' if descending else 'ASC'}, rang"
+        ranks = [row[0] for row in self._query(
+            f'SELECT rang FROM {source} WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?',
+            [*params, *order_params, limit, offset])]
+        return self._frame(jeu, self._rows(jeu, ranks))
+
+    def iter_chunks(self, jeu, chunksize=CHUNK_ROWS):
+        """Toutes les lignes d'origine par blocs (exports) ; un bloc vide est renvoyé pour un jeu vide"""
+        last = -1
+        while True:
+            # Pagination par rang (clé primaire) : chaque bloc est une lecture d'intervalle
+            rows = self._query('SELECT rang, donnees FROM lignes WHERE jeu = ? AND rang > ? ORDER BY rang LIMIT ?',
+                               (jeu, last, chunksize))
+            if rows or last < 0:
+                yield self._frame(jeu, rows)
+            if len(rows) < chunksize:
+                return
+            last = rows[-1][0]
+
+    def close(self):
+        self.conn.close()
+
+
+_store = None
+_store_lock = Lock()
+
+
+def get_store():
+    """Connexion partagée par les sessions du processus Streamlit"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ListingStore()
+        return _store
@@ -0,0 +1,98 @@
+"""Page Dashboard de l'application : métriques et graphiques plotly calculés sur l'entrepôt d'annonces"""
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from dashboard_metrics import query_aggregates
+from data_cache import file_cached
+
+
+def build_figures(path):
+    """Figures plotly du dashboard à partir des agrégats du fichier (mises en cache par data_cache)"""
+    aggregates = file_cached('aggregates', path, query_aggregates)
+
+    # Distribution des carburants
+    carburant_counts = pd.Series(aggregates.carburant).sort_values(ascending=False)
+    fig_carburant = px.pie(values=carburant_counts.values, names=carburant_counts.index,
+                           title='Répartition par Type de Carburant')
+
+    # Distribution des années
+    year_counts = pd.Series(aggregates.annee).sort_index()
+    fig_year = px.bar(x=year_counts.index, y=year_counts.values,
+                      title='Distribution par Année',
+                      labels={'x': 'Année', 'y': 'Nombre de voitures'})
+
+    # Prix vs Kilométrage : rendu WebGL, échantillon uniforme au-delà de SCATTER_MAX_POINTS points
+    sample = aggregates.sample
+    fig_scatter = px.scatter(x=sample[:, 0], y=sample[:, 1], render_mode='webgl',
+                             title='Relation Prix vs Kilométrage',
+                             labels={'x': 'Kilométrage (km)', 'y': 'Prix (FCFA)'})
+
+    # Distribution des boîtes de vitesse
+    boite_counts = pd.Series(aggregates.boite_vitesse).sort_values(ascending=False)
+    fig_boite = px.pie(values=boite_counts.values, names=boite_counts.index,
+                       title='Répartition par Type de Boîte de Vitesse')
+
+    return {'carburant': fig_carburant, 'annee': fig_year, 'prix_km': fig_scatter, 'boite_vitesse': fig_boite}
+
+
+# Page dashboard
+def show_dashboard():
+    st.markdown("<h2>📊 Dashboard Analytique</h2>", unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="feature-card">
+        <span>Visualisez et analysez vos données avec des graphiques interactifs et des métriques clés.</span>
+    </div>
+    """, unsafe_allow_html=True)
+
+    try:
+        # Agrégats calculés par requêtes sur l'entrepôt d'annonces, puis cache mémoire
+        aggregates = file_cached('aggregates', "data_to_analyse.csv", query_aggregates)
+        
+        if aggregates.count == 0:
+            st.warning("Aucune donnée valide à afficher dans le dashboard.")
+            return
+        
+        # Métriques principales
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Nombre total", aggregates.count)
+        
+        with col2:
+            st.metric("Prix moyen", f"{aggregates.mean_prix:,.0f} FCFA")
+          
+        with col3:
+            st.metric("Km moyen", f"{aggregates.mean_km:,.0f} km")
+        
+        st.markdown("---")
+        
+        # Graphiques (construits une fois par version du fichier, pas à chaque passage du script)
+        figures = file_cached('figures', "data_to_analyse.csv", build_figures)
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(figures['carburant'], use_container_width=True)
+        
+        with col2:
+            st.plotly_chart(figures['annee'], use_container_width=True)
+        
+        # Deuxième ligne de graphiques
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(figures['prix_km'], use_container_width=True)
+            sample = aggregates.sample
+            if aggregates.count > len(sample):
+                st.caption(f"Échantillon aléatoire de {len(sample):,} annonces sur {aggregates.count:,}")
+        
+        with col2:
+            st.plotly_chart(figures['boite_vitesse'], use_container_width=True)
+        
+    
+    except FileNotFoundError:
+        st.error("Fichier 'data/data_to_analyse.csv' non trouvé. Veuillez d'abord scraper des données.")
+    except Exception as e:
+        st.error(f"Erreur lors du chargement du dashboard: {str(e)}")
+        st.info("Assurez-vous que le fichier CSV contient les colonnes attendues.")
@@ -0,0 +1,71 @@
+"""Page Téléchargement de l'application : profils des jeux de data/, aperçu et exports depuis l'entrepôt"""
+import streamlit as st
+
+from data_cache import file_cached, file_key
+from dataset_profile import build_profile
+from listing_store import get_store
+from table_view import download_button, show_store_table
+
+
+# Page de téléchargement
+def show_download():
+    st.markdown("<h2>📥 Téléchargement de Données</h2>", unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="feature-card">
+        <span>Téléchargez les données déjà scrapées et stockées dans notre base de données.</span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Liste des fichiers disponibles
+    available_files = [
+        ('dakar-location-voitures-sitemap.csv', 'https://dakar-auto.com/senegal/location-de-voitures-19'),
+        ('motos-scooters-sitemap.csv', 'https://dakar-auto.com/senegal/motos-and-scooters-3'),
+        ('dakar-voiture-2753-sitemap.csv', 'https://dakar-auto.com/senegal/voitures-4'),
+    ]
+    
+    st.subheader("Fichiers Disponibles")
+    
+    for filename, description in available_files:
+        try:
+            # Profil pré-calculé (fichier annexe) : le jeu de données n'est chargé qu'à la demande
+            profile = file_cached('profile', filename, build_profile)
+            n_columns = len(profile.columns)
+            
+            # Créer un expander pour chaque fichier
+            with st.expander(f"📁 {description} ({profile.rows} lignes, {n_columns} colonnes)", expanded=False):
+                
+                # Afficher les informations du fichier
+                col1, col2, col3 = st.columns([1, 1, 1])
+                
+                with col1:
+                    st.metric("Lignes", profile.rows)
+                
+                with col2:
+                    st.metric("Colonnes", n_columns)
+                
+                with col3:
+                    st.metric("Taille", f"{profile.memory_bytes / 1024:.1f} KB")
+                
+                # Afficher les informations sur les colonnes
+                st.subheader("📋 Informations sur les colonnes")
+                st.dataframe(profile.column_info(), use_container_width=True)
+                
+                if st.toggle("👀 Afficher l'aperçu et le téléchargement", key=f"{filename}_charger"):
+                    # Entrepôt d'annonces : le jeu est ingéré une fois puis interrogé page par page
+                    store = get_store()
+                    jeu = store.ensure(filename)
+                    
+                    # Afficher un aperçu des données
+                    st.subheader("👀 Aperçu des données")
+                    show_store_table(store, jeu, key=filename)
+                    
+                    # Bouton de téléchargement (export lu par blocs depuis l'entrepôt)
+                    st.subheader("📥 Téléchargement")
+                    download_button(lambda: store.iter_chunks(jeu), filename, key=filename,
+                                    source_key=file_key(filename))
+            
+            st.divider()
+            
+        except FileNotFoundError:
+            st.warning(f"Fichier {filename} non trouvé.")
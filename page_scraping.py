@@ -0,0 +1,256 @@
+"""Page Scraping de l'application : lancement des tâches de scraping, progression, bilan et données collectées
+
+Une tâche peut couvrir plusieurs catégories, scrapées en un seul passage : les données collectées
+sont affichées par catégorie, dans un onglet chacune.
+
+Importée à la première visite de la page (my_data_app.main) : pandas et le moteur de scraping ne
+sont pas chargés pour les autres pages.
+"""
+import json
+import os
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from crawl_log import tail_rows
+from data_cache import invalidate
+from listing_parser import SPECS
+from scrape_jobs import (LIBELLES, REQUETES_PAR_HOTE_PAR_TACHE, STATUTS_ACTIFS, cancel_job, get_job, recent_jobs,
+                         resume_job, submit_crawl)
+from scrape_metrics import prometheus_text, selector_warnings, summary
+from scraping_functions import CATEGORY_URLS
+from table_view import SCRAPED_COLUMNS, download_button, show_table
+
+
+# Nombre de dernières lignes affichées dans le tableau en direct pendant le scraping
+PREVIEW_ROWS = 200
+
+# Libellé de chaque champ, pour la description des colonnes V1..Vn (listing_parser.SPECS)
+LIBELLES_CHAMPS = {
+    'marque': "Marque",
+    'annee': "Année",
+    'prix': "Prix",
+    'adresse': "Adresse",
+    'kilometrage': "Kilométrage",
+    'boite_vitesse': "Boite de vitesse",
+    'carburant': "Carburant",
+    'proprietaire': "Propriétaire",
+}
+
+
+def session_owner():
+    """Identifiant de la session, pour limiter le nombre de scrapings simultanés par utilisateur"""
+    if 'owner_id' not in st.session_state:
+        st.session_state.owner_id = uuid.uuid4().hex
+    return st.session_state.owner_id
+
+
+def load_job_result(job):
+    """Charge le résultat d'une tâche terminée dans la session (une seule fois par tâche)"""
+    if st.session_state.get('loaded_job') == job['id']:
+        return
+    st.session_state.loaded_job = job['id']
+    # Une table par catégorie scrapée
+    st.session_state.scraped_data = {category: pd.read_csv(path) for category, path in job['fichiers'].items()
+                                     if os.path.exists(path)}
+    # De nouvelles données sont arrivées : les jeux de données en cache ne sont plus à jour
+    invalidate()
+
+
+@st.fragment(run_every=1.0)
+def job_progress(job_id):
+    """Progression d'une tâche en cours, rafraîchie chaque seconde sans relancer toute la page"""
+    job = get_job(job_id)
+    if job['statut'] not in STATUTS_ACTIFS:
+        # Tâche finie : relancer la page pour afficher les résultats
+        st.rerun()
+
+    label = f"Page {job['pages_faites']}/{job['max_pages']}"
+    if job['eta'] is not None:
+        label += f" — environ {job['eta']:.0f} s restantes"
+    st.progress(job['pages_faites'] / job['max_pages'], text=f"{LIBELLES[job['statut']]} · {label}")
+    st.markdown(f"**{job['lignes']} lignes collectées** ({job['erreurs']} pages en erreur)")
+    if job['metriques']:
+        for warning in selector_warnings(job['metriques']):
+            st.warning(f"⚠️ Sélecteurs à vérifier — {warning}")
+
+    if st.button("⏹️ Annuler", key=f"cancel_{job_id}", disabled=bool(job['annulation'])):
+        cancel_job(job_id)
+        st.rerun(scope="fragment")
+
+    # Aperçu des dernières lignes de chaque catégorie, lues à la fin de son journal de crawl (complété à chaque page)
+    if job['lignes']:
+        for category, log_path in job['journaux'].items():
+            rows = tail_rows(log_path, PREVIEW_ROWS)
+            if rows:
+                st.caption(category)
+                st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+
+def show_metrics(report, key):
+    """Bilan des mesures d'un scraping : temps par étape, compteurs par catégorie et exports JSON / Prometheus"""
+    for warning in selector_warnings(report):
+        st.warning(f"⚠️ Sélecteurs à vérifier — {warning}")
+    with st.expander("⏱️ Mesures du scraping", expanded=False):
+        st.dataframe(pd.DataFrame(summary(report)), use_container_width=True, hide_index=True,
+                     column_config={'part': st.column_config.ProgressColumn("Part du temps", min_value=0,
+                                                                            max_value=1, format="percent")})
+        counters = pd.DataFrame({category: data['compteurs'] for category, data in report['categories'].items()})
+        st.dataframe(counters.T, use_container_width=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("📄 Rapport JSON", json.dumps(report, ensure_ascii=False, indent=1),
+                             file_name=f"metriques_{key}.json", mime="application/json", key=f"metrics_json_{key}")
+        col2.download_button("📈 Format Prometheus", prometheus_text(report), file_name=f"metriques_{key}.prom",
+                             mime="text/plain", key=f"metrics_prom_{key}")
+
+
+def show_job(job_id):
+    """Affiche une tâche : progression si elle est active, bilan et chargement des résultats sinon"""
+    job = get_job(job_id)
+    if job is None:
+        return
+    if job['statut'] in STATUTS_ACTIFS:
+        job_progress(job_id)
+        return
+
+    st.caption(f"Tâche {job['id']} : {LIBELLES[job['statut']]} — {job['pages_faites']}/{job['max_pages']} pages, "
+               f"{job['lignes']} lignes, {job['erreurs']} pages en erreur")
+    if job['message']:
+        st.error(job['message'])
+    if job['pages_ignorees']:
+        with st.expander(f"⚠️ {len(job['pages_ignorees'])} pages non collectées", expanded=False):
+            st.dataframe(pd.DataFrame(job['pages_ignorees'], columns=['Page', 'URL', 'Motif']),
+                         use_container_width=True, hide_index=True)
+    if job['journaux']:
+        # Crawl incomplet (annulé, interrompu, en échec ou avec des pages en erreur) : reprise possible
+        if st.button("▶️ Reprendre le scraping", key=f"resume_{job_id}",
+                     help="Les pages déjà collectées ne sont pas retéléchargées"):
+            try:
+                resume_job(job_id, owner=session_owner())
+                st.session_state.pop('loaded_job', None)
+                st.rerun()
+            except RuntimeError as e:
+                st.warning(str(e))
+    for category, path in job['fichiers'].items():
+        st.caption(f"Résultats {category} enregistrés dans `{os.path.relpath(path)}`")
+    if job['cache_http']:
+        stats = job['cache_http']
+        st.caption(f"Cache HTTP : {stats['hits']} pages servies localement, {stats['revalidated']} revalidées (304), "
+                   f"{stats['misses']} téléchargées ({stats['bytes_downloaded'] / 1024:.0f} KB)")
+    if job['metriques']:
+        show_metrics(job['metriques'], job_id)
+    load_job_result(job)
+
+
+def show_columns(category):
+    """Correspondance entre les colonnes V1..Vn d'une catégorie et les champs des annonces"""
+    st.markdown("#### 🗂️ Description des colonnes")
+    st.markdown("""
+    <ul style="list-style: none; padding-left: 0;">
+    """, unsafe_allow_html=True)
+
+    for col, field in SPECS[category]:
+        st.markdown(
+            f"""
+            <li style="margin-bottom: 0.7rem;">
+                <span style="display: inline-block; background: #667eea; color: white; border-radius: 6px; padding: 0.3rem 0.8rem; font-weight: bold; margin-right: 0.7rem;">{col}</span>
+                <span style="font-size: 1.08rem;">{LIBELLES_CHAMPS[field]}</span>
+            </li>
+            """,
+            unsafe_allow_html=True
+        )
+
+    st.markdown("</ul>", unsafe_allow_html=True)
+
+
+def show_category_data(category, df):
+    # Afficher les données page par page (filtres et tri côté serveur)
+    show_table(df, key=f"scraped_{category}", columns=SCRAPED_COLUMNS)
+
+    # Afficher le nombre total de données
+    st.write(f"**Total des données scrapées : {len(df)} lignes et {len(df.columns)} colonnes**")
+
+    # Bouton de téléchargement
+    download_button(df, f"donnees_scrapees_{category}", key=f"scraped_{category}")
+
+    show_columns(category)
+
+
+# Page de scraping
+def show_scraping():
+    if 'scraped_data' not in st.session_state:
+        st.session_state.scraped_data = {}
+
+    st.markdown("<h2>🕷️ Scraping de Données</h2>", unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="feature-card">
+        <span>Configurez vos paramètres de scraping et lancez la collecte de données depuis AutoScraper.</span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader("Configuration")
+        categories = st.multiselect("Catégories", options=list(CATEGORY_URLS), default=['voitures'],
+                                    help="Les catégories choisies sont scrapées en un seul passage, "
+                                         "en partageant les requêtes simultanées")
+        
+        max_pages = st.number_input("Nombre de pages à scraper par catégorie", value=1, min_value=1, step=1)
+
+        # Toutes les catégories sont sur le même site : au-delà de la limite par site d'une tâche,
+        # les requêtes supplémentaires attendraient leur tour
+        concurrency = st.slider("Requêtes simultanées", min_value=1, max_value=REQUETES_PAR_HOTE_PAR_TACHE,
+                                value=REQUETES_PAR_HOTE_PAR_TACHE,
+                                help="Nombre de pages téléchargées en parallèle, pour toutes les catégories "
+                                     "de la tâche (limite par site d'une tâche)")
+
+        parser_processes = st.number_input("Processus d'analyse", value=0, min_value=0, max_value=os.cpu_count() or 1,
+                                           step=1, help="Analyse du HTML dans des processus séparés, en parallèle "
+                                                        "des téléchargements (0 : dans le même processus)")
+
+        incremental = st.checkbox("Mode incrémental", value=False,
+                                  help="Ne renvoie que les annonces nouvelles ou modifiées et s'arrête, pour chaque "
+                                       "catégorie, à la première page déjà connue")
+        
+        if st.button("🚀 Lancer le Scraping", key="scrape_btn"):
+            if categories:
+                try:
+                    # Le scraping tourne dans un processus du pool : la page reste utilisable
+                    job_id = submit_crawl({category: max_pages for category in categories}, concurrency,
+                                          incremental, owner=session_owner(), parser_processes=parser_processes)
+                    st.session_state.current_job = job_id
+                    # L'identifiant dans l'URL permet de retrouver la tâche après une reconnexion
+                    st.query_params['job'] = job_id
+                except RuntimeError as e:
+                    st.warning(str(e))
+            else:
+                st.error("Veuillez choisir au moins une catégorie.")
+
+        jobs = recent_jobs(limit=10)
+        if jobs:
+            with st.expander("🗂️ Scrapings récents", expanded=False):
+                st.dataframe(pd.DataFrame([{
+                    'Tâche': job['id'], 'Catégorie': ', '.join(job['categories']), 'Statut': LIBELLES[job['statut']],
+                    'Pages': f"{job['pages_faites']}/{job['max_pages']}", 'Lignes': job['lignes'],
+                    'Erreurs': job['erreurs'],
+                } for job in jobs]), use_container_width=True, hide_index=True)
+    
+    with col2:
+        st.subheader("Données Scrapées")
+        job_id = st.session_state.get('current_job') or st.query_params.get('job')
+        if job_id:
+            show_job(job_id)
+
+        scraped = {category: df for category, df in st.session_state.scraped_data.items() if not df.empty}
+        if len(scraped) == 1:
+            show_category_data(*next(iter(scraped.items())))
+        elif scraped:
+            # Un onglet par catégorie
+            for tab, (category, df) in zip(st.tabs(list(scraped)), scraped.items()):
+                with tab:
+                    show_category_data(category, df)
+        else:
+            st.info("Aucune donnée scrapée pour le moment. Lancez le scraping pour commencer.")
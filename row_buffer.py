@@ -0,0 +1,129 @@
+"""Tampon colonnaire des lignes scrapées : le DataFrame est construit colonne par colonne, sans liste de dicts
+
+Chaque colonne d'une catégorie (SPECS) est rangée dans un tampon adapté à son champ : tableaux
+d'entiers (array) avec un masque des valeurs absentes pour le prix, l'année et le kilométrage,
+codes de catégorie pour la marque, la boîte et le carburant, chaînes partagées (une seule copie
+par valeur distincte) pour l'adresse et le propriétaire. Une ligne coûte quelques octets par
+colonne au lieu d'un dictionnaire et de ses chaînes.
+"""
+from array import array
+
+from listing_parser import SPECS
+
+
+# Champ -> (code array, dtype pandas) des colonnes entières
+INT_FIELDS = {
+    'annonce_id': ('q', 'Int64'),
+    'prix': ('q', 'Int64'),
+    'annee': ('h', 'Int16'),
+    'kilometrage': ('q', 'Int64'),
+}
+# Champs texte à faible cardinalité : colonnes catégorielles
+CATEGORY_FIELDS = {'marque', 'boite_vitesse', 'carburant'}
+
+
+class _IntColumn:
+    __slots__ = ('values', 'missing', 'dtype', '_low', '_high')
+
+    def __init__(self, typecode, dtype):
+        self.values = array(typecode)
+        self.missing = bytearray()
+        self.dtype = dtype
+        limit = 2 ** (8 * self.values.itemsize - 1)
+        self._low, self._high = -limit, limit - 1
+
+    def append(self, value):
+        if isinstance(value, str):
+            # Année : dernier mot du titre de l'annonce
+            value = value.strip()
+            value = int(value) if value.isdigit() else None
+        if value is None or value != value or not self._low <= value <= self._high:
+            self.values.append(0)
+            self.missing.append(1)
+        else:
+            self.values.append(int(value))
+            self.missing.append(0)
+
+    def to_array(self):
+        import numpy as np
+        import pandas as pd
+
+        values = np.frombuffer(self.values, dtype=self.values.typecode).copy()
+        mask = np.frombuffer(self.missing, dtype=np.bool_).copy()
+        return pd.arrays.IntegerArray(values, mask).astype(self.dtype)
+
+
+class _CategoryColumn:
+    __slots__ = ('codes', 'categories')
+
+    def __init__(self):
+        self.codes = array('i')
+        self.categories = {}
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return
+        code = self.categories.get(value)
+        if code is None:
+            code = self.categories[value] = len(self.categories)
+        self.codes.append(code)
+
+    def to_array(self):
+        import numpy as np
+        import pandas as pd
+
+        return pd.Categorical.from_codes(np.frombuffer(self.codes, dtype=np.intc).copy(), list(self.categories))
+
+
+class _TextColumn:
+    __slots__ = ('values', '_shared')
+
+    def __init__(self):
+        self.values = []
+        self._shared = {}
+
+    def append(self, value):
+        self.values.append(value if value is None else self._shared.setdefault(value, value))
+
+    def to_array(self):
+        return self.values
+
+
+def _column_for(field):
+    if field in INT_FIELDS:
+        return _IntColumn(*INT_FIELDS[field])
+    if field in CATEGORY_FIELDS:
+        return _CategoryColumn()
+    return _TextColumn()
+
+
+class ColumnBuffer:
+    """Lignes d'une catégorie (colonnes V1..Vn, précédées d'annonce_id si with_id) rangées par colonne"""
+
+    def __init__(self, category, with_id=False):
+        spec = [('annonce_id', 'annonce_id')] if with_id else []
+        spec += SPECS[category]
+        self.columns = [column for column, _ in spec]
+        self._buffers = [_column_for(field) for _, field in spec]
+        self.rows = 0
+
+    def append(self, row):
+        """Ajoute une ligne (dictionnaire colonne -> valeur, comme celles de parse_listing_page)"""
+        for column, buffer in zip(self.columns, self._buffers):
+            buffer.append(row.get(column))
+        self.rows += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return self.rows
+
+    def to_frame(self):
+        """DataFrame typé : entiers nullable, catégories pour les textes répétitifs"""
+        # pandas n'est importé qu'ici : un crawl qui écrit ses lignes au fil de l'eau s'en passe
+        import pandas as pd
+
+        return pd.DataFrame({column: buffer.to_array() for column, buffer in zip(self.columns, self._buffers)})
@@ -0,0 +1,208 @@
+"""Crawler en ligne de commande, sans Streamlit, pour les lancements planifiés (cron) et par lots
+
+Les pages d'une ou plusieurs catégories sont scrapées en un seul passage (scraping_functions.iter_crawl)
+et leurs lignes écrites au fil des pages dans un fichier CSV ou JSON Lines par catégorie, ou rangées
+dans un tampon colonnaire (row_buffer) puis écrites en Parquet.
+Seuls les modules du crawl sont importés : ni streamlit, ni plotly, ni matplotlib, et pandas /
+pyarrow uniquement pour la sortie Parquet. Le fichier est écrit sous un nom temporaire puis
+renommé : une sortie existante n'est remplacée que par un résultat complet.
+
+    python scrape_cli.py voitures 1-50 --format parquet --output voitures.parquet
+    python scrape_cli.py motos 20 --concurrency 4 --incremental      (pages 1 à 20, CSV dans data/scraped/)
+    python scrape_cli.py all 5 --concurrency 4 --output 'export/{categorie}.jsonl'   (toutes les catégories)
+
+Code de sortie : 0 si toutes les pages ont été collectées, 1 si des pages sont perdues malgré les reprises.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from crawl_log import crawl_log_path, read_rows
+from http_client import configure_client
+from row_buffer import ColumnBuffer
+from scrape_metrics import ScrapeMetrics, write_report
+from scraping_functions import CATEGORY_URLS, MAX_REQUETES_PAR_HOTE, iter_crawl
+from storage import HAS_PARQUET, CsvBatchWriter, scrape_output_path
+
+
+FORMATS = {'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet'}
+# Lignes relues du journal de crawl par lot écrit
+LOT_JOURNAL = 5000
+
+
+def category_list(value):
+    """'voitures' -> ['voitures'] ; 'voitures,motos' -> ['voitures', 'motos'] ; 'all' -> toutes les catégories"""
+    if value == 'all':
+        return list(CATEGORY_URLS)
+    categories = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in categories if name not in CATEGORY_URLS]
+    if unknown or not categories:
+        raise argparse.ArgumentTypeError(f"catégorie inconnue: {', '.join(unknown) or value} "
+                                         f"(choix : {', '.join(CATEGORY_URLS)} ou all)")
+    return categories
+
+
+def page_range(value):
+    """'50' -> (1, 50) ; '10-50' -> (10, 50)"""
+    first, _, last = value.partition('-')
+    try:
+        first, last = (int(first), int(last)) if last else (1, int(first))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"plage de pages invalide: {value} (attendu N ou DEBUT-FIN)")
+    if not 1 <= first <= last:
+        raise argparse.ArgumentTypeError(f"plage de pages invalide: {value}")
+    return first, last
+
+
+class JsonlBatchWriter:
+    """Ajoute des lots de lignes (dicts) à un fichier JSON Lines, une annonce par ligne"""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self._file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetBatchWriter:
+    """Parquet : les lignes restent en colonnes typées (row_buffer) et le fichier est écrit à la fermeture"""
+
+    def __init__(self, path, category, with_id):
+        self.path = path
+        self._buffer = ColumnBuffer(category, with_id=with_id)
+
+    def write(self, rows):
+        self._buffer.extend(rows)
+
+    def close(self):
+        self._buffer.to_frame().to_parquet(self.path, index=False, compression='zstd')
+
+
+def open_writer(fmt, path, category, with_id):
+    if fmt == 'parquet':
+        return ParquetBatchWriter(path, category, with_id)
+    return JsonlBatchWriter(path) if fmt == 'jsonl' else CsvBatchWriter(path)
+
+
+def run(categories, first_page, last_page, fmt, outputs, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE,
+        base_urls=None, parser_backend=None, parser_processes=0, incremental=False, checkpoints=None, with_id=False):
+    """Scrape les pages first_page à last_page de chaque catégorie et écrit ses lignes dans outputs[catégorie] ;
+    renvoie (lignes par catégorie, pages perdues, métriques)
+
+    Avec un journal de crawl (checkpoints), la sortie est produite à partir du journal à la fin du
+    passage : elle contient aussi les pages des passages précédents, dans l'ordre des pages.
+    """
+    checkpoints = checkpoints or {}
+    tmp_paths = {category: f'{outputs[category]}.{os.getpid()}.tmp' for category in categories}
+    with_id = with_id or incremental
+    metrics = ScrapeMetrics()
+    rows = dict.fromkeys(categories, 0)
+    skipped = []
+    try:
+        writers = {}
+        try:
+            for category in categories:
+                writers[category] = open_writer(fmt, tmp_paths[category], category, with_id)
+            for category, batch in iter_crawl(dict.fromkeys(categories, last_page), concurrency, per_host_limit,
+                                              base_urls, parser_backend, incremental, checkpoints, first_page,
+                                              with_id, metrics, parser_processes):
+                if category not in checkpoints:
+                    writers[category].write(batch.rows)
+                    rows[category] += len(batch.rows)
+                if not batch.ok:
+                    skipped.append((category, batch.page, batch.url, batch.error))
+            for category, log_path in checkpoints.items():
+                # Pages déjà journalisées (ni retéléchargées ni renvoyées par iter_crawl) et pages de ce passage
+                logged = read_rows(log_path) if os.path.exists(log_path) else iter(())
+                while chunk := list(islice(logged, LOT_JOURNAL)):
+                    writers[category].write(chunk)
+                    rows[category] += len(chunk)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        for category, tmp_path in tmp_paths.items():
+            if not os.path.exists(tmp_path):
+                # CSV sans aucune ligne : CsvBatchWriter n'a pas créé le fichier
+                open(tmp_path, 'w').close()
+            os.replace(tmp_path, outputs[category])
+    finally:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return rows, skipped, metrics.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('categories', type=category_list, metavar='CATEGORIES',
+                        help=f"{', '.join(CATEGORY_URLS)}, plusieurs séparées par des virgules, ou all")
+    parser.add_argument('pages', type=page_range, help="N (pages 1 à N) ou DEBUT-FIN")
+    parser.add_argument('--format', choices=sorted(FORMATS), help="par défaut, tiré de l'extension de --output, "
+                                                                 "sinon csv")
+    parser.add_argument('--output', help="fichier de sortie (par défaut data/scraped/<catégorie>-<date>.<format>) ; "
+                                         "avec plusieurs catégories, doit contenir {categorie}")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--per-host-limit', type=int, default=MAX_REQUETES_PAR_HOTE)
+    parser.add_argument('--parser-backend', help="html.parser, lxml ou selectolax (par défaut le plus rapide)")
+    parser.add_argument('--parser-processes', type=int, default=0)
+    parser.add_argument('--incremental', action='store_true', help="seulement les annonces nouvelles ou modifiées")
+    parser.add_argument('--with-id', action='store_true', help="ajoute la colonne annonce_id")
+    parser.add_argument('--checkpoint', metavar='TAG',
+                        help="journal de crawl .cache/crawls/<catégorie>-TAG.jsonl : relancé avec le même TAG, "
+                             "le crawl reprend où il s'était arrêté, et la sortie contient aussi les pages "
+                             "des passages précédents")
+    parser.add_argument('--base-url', help="avec plusieurs catégories, doit contenir {categorie}")
+    parser.add_argument('--no-cache', action='store_true', help="ne pas utiliser le cache disque des pages")
+    parser.add_argument('--metrics', metavar='DOSSIER', help="écrit le bilan (JSON et Prometheus) dans DOSSIER")
+    parser.add_argument('--quiet', action='store_true', help="n'affiche que le bilan final")
+    args = parser.parse_args()
+
+    fmt = args.format or next((name for name, ext in FORMATS.items() if args.output and args.output.endswith(ext)),
+                              'csv')
+    if fmt == 'parquet' and not HAS_PARQUET:
+        parser.error("la sortie Parquet demande pyarrow")
+    categories = args.categories
+    for option, value in (('--output', args.output), ('--base-url', args.base_url)):
+        if value and len(categories) > 1 and '{categorie}' not in value:
+            parser.error(f"{option} doit contenir {{categorie}} quand plusieurs catégories sont scrapées")
+    outputs = {category: args.output.replace('{categorie}', category) if args.output
+               else os.path.splitext(scrape_output_path(category))[0] + FORMATS[fmt] for category in categories}
+    base_urls = {category: args.base_url.replace('{categorie}', category)
+                 for category in categories} if args.base_url else None
+    if args.no_cache:
+        configure_client(use_cache=False)
+    checkpoints = {category: crawl_log_path(category, args.checkpoint)
+                   for category in categories} if args.checkpoint else None
+    first_page, last_page = args.pages
+
+    start = time.perf_counter()
+    # --quiet : les traces de chaque page sont jetées au fur et à mesure, pas gardées en mémoire
+    with open(os.devnull, 'w') if args.quiet else contextlib.nullcontext(sys.stdout) as out, \
+            contextlib.redirect_stdout(out):
+        rows, skipped, report = run(categories, first_page, last_page, fmt, outputs, args.concurrency,
+                                    args.per_host_limit, base_urls, args.parser_backend, args.parser_processes,
+                                    args.incremental, checkpoints, args.with_id)
+    elapsed = time.perf_counter() - start
+
+    for category in categories:
+        print(f"{rows[category]} lignes écrites dans {outputs[category]} ({fmt}), {category} pages "
+              f"{first_page}-{last_page}")
+    print(f"{sum(rows.values())} lignes en {elapsed:.1f}s")
+    if skipped:
+        print(f"{len(skipped)} pages non collectées: {[f'{category} {page}' for category, page, _, _ in skipped]}")
+    if args.metrics:
+        name = f"{'-'.join(categories)}-{time.strftime('%Y%m%d-%H%M%S')}"
+        print(f"Bilan écrit dans {', '.join(write_report(report, name, args.metrics))}")
+    sys.exit(1 if skipped else 0)
+
+
+if __name__ == '__main__':
+    main()
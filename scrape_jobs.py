@@ -0,0 +1,390 @@
+"""Tâches de scraping en arrière-plan : file d'attente, pool de processus, progression persistée et annulation
+
+Chaque tâche est enregistrée dans une base SQLite (.cache/scrape_jobs.sqlite) : l'interface
+Streamlit ne fait que la créer puis relire son état, le scraping tourne dans un processus du pool.
+Une tâche survit donc à un rechargement de la page ou à une reconnexion du navigateur. Une tâche
+peut couvrir plusieurs catégories, scrapées en un seul passage (scraping_functions.iter_crawl) avec
+un journal et un fichier de résultats par catégorie.
+"""
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+from crawl_log import compact, completed_pages, crawl_log_path
+from dedup import SCRAPED_FIELDS, dedup_csv
+from http_client import get_client
+from listing_store import ListingStore
+from scrape_metrics import ScrapeMetrics, write_report
+from scraping_functions import CATEGORY_URLS, MAX_REQUETES_PAR_HOTE, iter_crawl
+from storage import scrape_output_path
+
+
+JOBS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'scrape_jobs.sqlite')
+# Processus de scraping simultanés sur le serveur, toutes sessions confondues
+MAX_JOBS_SIMULTANES = 2
+# Tâches en attente ou en cours par session : un utilisateur ne peut pas monopoliser le pool
+MAX_JOBS_PAR_SESSION = 2
+# Les tâches simultanées se partagent la limite de requêtes par site
+REQUETES_PAR_HOTE_PAR_TACHE = max(1, MAX_REQUETES_PAR_HOTE // MAX_JOBS_SIMULTANES)
+
+EN_ATTENTE = 'en_attente'
+EN_COURS = 'en_cours'
+TERMINE = 'termine'
+ANNULE = 'annule'
+ECHEC = 'echec'
+INTERROMPU = 'interrompu'
+STATUTS_ACTIFS = (EN_ATTENTE, EN_COURS)
+
+LIBELLES = {
+    EN_ATTENTE: "⏳ En attente",
+    EN_COURS: "🔄 En cours",
+    TERMINE: "✅ Terminée",
+    ANNULE: "⏹️ Annulée",
+    ECHEC: "❌ Échec",
+    INTERROMPU: "⚠️ Interrompue (redémarrage du serveur)",
+}
+
+
+# Colonnes ajoutées après la première version de la table
+_MIGRATIONS = [
+    ('journal', 'TEXT'),
+    ('pages_reprises', 'INTEGER NOT NULL DEFAULT 0'),
+    ('pages_ignorees', 'TEXT'),
+    ('metriques', 'TEXT'),
+]
+
+
+class JobStore:
+    """Table des tâches, partagée entre le processus Streamlit et les processus de scraping"""
+
+    def __init__(self, path=JOBS_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = Lock()
+        with self._lock, self.conn:
+            # WAL : les lectures de l'interface ne bloquent pas les écritures des workers
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    proprietaire TEXT,
+                    categorie TEXT NOT NULL,
+                    max_pages INTEGER NOT NULL,
+                    options TEXT NOT NULL,
+                    statut TEXT NOT NULL,
+                    pages_faites INTEGER NOT NULL DEFAULT 0,
+                    lignes INTEGER NOT NULL DEFAULT 0,
+                    erreurs INTEGER NOT NULL DEFAULT 0,
+                    annulation INTEGER NOT NULL DEFAULT 0,
+                    fichier TEXT,
+                    message TEXT,
+                    cache_http TEXT,
+                    journal TEXT,
+                    pages_reprises INTEGER NOT NULL DEFAULT 0,
+                    pages_ignorees TEXT,
+                    metriques TEXT,
+                    cree_le REAL NOT NULL,
+                    demarre_le REAL,
+                    maj_le REAL,
+                    fini_le REAL
+                )
+            ''')
+            # Bases créées par une version précédente : ajout des colonnes manquantes
+            existing = {row[1] for row in self.conn.execute('PRAGMA table_info(jobs)')}
+            for column, definition in _MIGRATIONS:
+                if column not in existing:
+                    self.conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+
+    def create(self, budgets, options, owner=None):
+        """budgets : catégorie -> nombre de pages ; categorie contient les catégories séparées par des virgules
+        et max_pages le total des pages"""
+        job_id = uuid.uuid4().hex[:12]
+        options = {**options, 'budgets': budgets}
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO jobs (id, proprietaire, categorie, max_pages, options, statut, cree_le) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, owner, ','.join(budgets), sum(budgets.values()), json.dumps(options), EN_ATTENTE,
+                 time.time()))
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self.conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _job_dict(row) if row is not None else None
+
+    def recent(self, limit=10, owner=None):
+        query = 'SELECT * FROM jobs'
+        params = []
+        if owner is not None:
+            query += ' WHERE proprietaire = ?'
+            params.append(owner)
+        with self._lock:
+            rows = self.conn.execute(query + ' ORDER BY cree_le DESC LIMIT ?', [*params, limit]).fetchall()
+        return [_job_dict(row) for row in rows]
+
+    def active_count(self, owner):
+        placeholders = ','.join('?' * len(STATUTS_ACTIFS))
+        with self._lock:
+            return self.conn.execute(
+                f'SELECT COUNT(*) FROM jobs WHERE proprietaire = ? AND statut IN ({placeholders})',
+                [owner, *STATUTS_ACTIFS]).fetchone()[0]
+
+    def update(self, job_id, **fields):
+        fields['maj_le'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock, self.conn:
+            self.conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', [*fields.values(), job_id])
+
+    def reset_for_resume(self, job_id):
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE jobs SET statut = ?, annulation = 0, message = NULL, fini_le = NULL, maj_le = ? '
+                              'WHERE id = ?', (EN_ATTENTE, time.time(), job_id))
+
+    def request_cancel(self, job_id):
+        """Demande l'annulation ; une tâche encore en attente est annulée immédiatement"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE jobs SET annulation = 1, maj_le = ? WHERE id = ?', (now, job_id))
+            self.conn.execute('UPDATE jobs SET statut = ?, fini_le = ? WHERE id = ? AND statut = ?',
+                              (ANNULE, now, job_id, EN_ATTENTE))
+
+    def cancel_requested(self, job_id):
+        with self._lock:
+            row = self.conn.execute('SELECT annulation FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_interrupted(self):
+        """Les tâches actives d'un précédent processus serveur ne reprendront pas"""
+        placeholders = ','.join('?' * len(STATUTS_ACTIFS))
+        with self._lock, self.conn:
+            self.conn.execute(f'UPDATE jobs SET statut = ?, fini_le = ? WHERE statut IN ({placeholders})',
+                              [INTERROMPU, time.time(), *STATUTS_ACTIFS])
+
+    def close(self):
+        self.conn.close()
+
+
+def _paths(value, category):
+    """Chemins par catégorie (JSON) ; une tâche d'une version précédente n'a qu'un chemin, pour sa catégorie"""
+    if not value:
+        return {}
+    return json.loads(value) if value.startswith('{') else {category: value}
+
+
+def _job_dict(row):
+    job = dict(row)
+    job['options'] = json.loads(job['options'])
+    job['categories'] = job['categorie'].split(',')
+    job['budgets'] = job['options'].pop('budgets', None) or {job['categorie']: job['max_pages']}
+    # Journal de crawl et fichier de résultats de chaque catégorie
+    job['journaux'] = _paths(job.pop('journal'), job['categorie'])
+    job['fichiers'] = _paths(job.pop('fichier'), job['categorie'])
+    job['cache_http'] = json.loads(job['cache_http']) if job['cache_http'] else None
+    # Pages abandonnées malgré les reprises : [numéro, URL, motif]
+    job['pages_ignorees'] = json.loads(job['pages_ignorees']) if job['pages_ignorees'] else []
+    # Durées par étape et compteurs du dernier passage (scrape_metrics)
+    job['metriques'] = json.loads(job['metriques']) if job['metriques'] else None
+    job['eta'] = None
+    # Rythme mesuré sur les pages de ce passage (les pages reprises d'un passage précédent sont exclues)
+    pages_run = job['pages_faites'] - job['pages_reprises']
+    if job['statut'] == EN_COURS and pages_run > 0 and job['demarre_le']:
+        per_page = ((job['maj_le'] or time.time()) - job['demarre_le']) / pages_run
+        job['eta'] = per_page * max(job['max_pages'] - job['pages_faites'], 0)
+    return job
+
+
+def run_job(job_id, path=JOBS_PATH):
+    """Exécute une tâche (dans un processus du pool) en enregistrant sa progression page par page
+
+    Les pages sont écrites dans un journal de crawl par catégorie : une tâche interrompue, annulée
+    ou en échec reprend là où elle s'était arrêtée. Le CSV de résultats de chaque catégorie est
+    produit par compaction de son journal, puis dédoublonné par annonce (dedup.py) et ingéré dans
+    l'entrepôt d'annonces. Les mesures du passage (scrape_metrics) sont enregistrées avec la tâche
+    et exportées en JSON et au format Prometheus.
+    """
+    store = JobStore(path)
+    try:
+        job = store.get(job_id)
+        if job is None or job['annulation']:
+            return
+        budgets = job['budgets']
+        options = dict(job['options'])
+        # Tâches d'une version précédente : une seule URL de base, pour leur unique catégorie
+        base_url = options.pop('base_url', None)
+        base_urls = options.pop('base_urls', None) or ({job['categorie']: base_url} if base_url else None)
+        # Reprise : journaux et fichiers du passage précédent (une catégorie sans résultat n'a pas de fichier)
+        journaux = {category: crawl_log_path(category, job_id) for category in budgets} | job['journaux']
+        fichiers = {category: scrape_output_path(category, tag=job_id) for category in budgets} | job['fichiers']
+        done = sum(len(completed_pages(log_path)) for log_path in journaux.values())
+        started = time.time()
+        store.update(job_id, statut=EN_COURS, demarre_le=started, journal=json.dumps(journaux),
+                     fichier=json.dumps(fichiers), pages_faites=done, pages_reprises=done)
+        get_client().reset_stats()
+        metrics = ScrapeMetrics()
+
+        skipped = []
+        rows = job['lignes'] if done else 0
+        cancelled = False
+        for category, batch in iter_crawl(budgets, base_urls=base_urls, checkpoints=journaux, metrics=metrics,
+                                          **options):
+            done += batch.ok
+            rows += len(batch.rows)
+            if not batch.ok:
+                skipped.append([batch.page, batch.url, batch.error])
+            store.update(job_id, pages_faites=done, lignes=rows, erreurs=len(skipped),
+                         pages_ignorees=json.dumps(skipped), metriques=json.dumps(metrics.to_dict()))
+            if store.cancel_requested(job_id):
+                cancelled = True
+                break
+
+        # Compaction : le CSV contient aussi les pages des passages précédents ; les journaux ne sont
+        # supprimés que pour un crawl terminé, sinon ils servent à la reprise
+        complete = not cancelled and not skipped
+        rows = 0
+        results = {}
+        for category in budgets:
+            output_path = fichiers[category]
+            count = compact(journaux[category], output_path, remove_log=complete)
+            if count and options.get('with_id'):
+                # Annonces vues sur deux pages (pagination qui glisse) : seule la dernière version est gardée
+                read, duplicates = dedup_csv(output_path, fields=SCRAPED_FIELDS[category], seen_at=started)
+                count = read - duplicates
+            if count:
+                # Résultat ingéré dans l'entrepôt d'annonces (déjà dédoublonné) : consultable par requêtes
+                store_annonces = ListingStore()
+                try:
+                    store_annonces.ensure(output_path, category, deduplicate=False)
+                finally:
+                    store_annonces.close()
+                results[category] = output_path
+            rows += count
+        write_report(metrics.to_dict(), job_id)
+        store.update(job_id, statut=ANNULE if cancelled else TERMINE, fini_le=time.time(), lignes=rows,
+                     fichier=json.dumps(results) if results else None,
+                     journal=None if complete else json.dumps(journaux), cache_http=json.dumps(get_client().stats))
+    except Exception as e:
+        store.update(job_id, statut=ECHEC, fini_le=time.time(), message=str(e))
+    finally:
+        store.close()
+
+
+_executor = None
+_executor_lock = Lock()
+_store = None
+_futures = {}
+
+
+def get_store():
+    """Connexion partagée par les sessions du processus Streamlit"""
+    global _store
+    with _executor_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+
+def _get_executor(broken=None):
+    """Pool de processus du serveur, créé au premier usage ou recréé s'il est cassé (broken)"""
+    global _executor
+    store = get_store()
+    with _executor_lock:
+        if _executor is None:
+            store.mark_interrupted()
+        elif _executor is broken:
+            # Les tâches du pool cassé sont marquées en échec par _job_done
+            _executor.shutdown(wait=False, cancel_futures=True)
+        if _executor is None or _executor is broken:
+            # spawn : pas de fork d'un processus serveur multi-threadé
+            _executor = ProcessPoolExecutor(max_workers=MAX_JOBS_SIMULTANES,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def submit_crawl(budgets, concurrency=1, incremental=False, base_urls=None, owner=None, parser_processes=0):
+    """Crée une tâche qui scrape plusieurs catégories en un seul passage et la place dans la file du pool
+
+    budgets associe à chaque catégorie son nombre de pages ; les pages de toutes les catégories se
+    partagent les requêtes simultanées de la tâche (scraping_functions.iter_crawl). Renvoie l'identifiant
+    de la tâche ; lève RuntimeError si la session a déjà MAX_JOBS_PAR_SESSION tâches actives.
+    """
+    unknown = [category for category in budgets if category not in CATEGORY_URLS]
+    if unknown or not budgets:
+        raise ValueError(f"Catégorie inconnue : {', '.join(unknown) or 'aucune catégorie'}")
+    executor = _get_executor()
+    store = get_store()
+    if owner is not None and store.active_count(owner) >= MAX_JOBS_PAR_SESSION:
+        raise RuntimeError(f"{MAX_JOBS_PAR_SESSION} scrapings sont déjà en cours pour cette session.")
+
+    options = {
+        'concurrency': concurrency,
+        'incremental': incremental,
+        'base_urls': base_urls,
+        # Processus d'analyse du HTML (0 : dans le processus de la tâche), voir scraping_functions.parse_pages
+        'parser_processes': parser_processes,
+        # annonce_id sert au dédoublonnage du résultat
+        'with_id': True,
+        'per_host_limit': REQUETES_PAR_HOTE_PAR_TACHE,
+    }
+    job_id = store.create(dict(budgets), options, owner)
+    _start(executor, job_id)
+    return job_id
+
+
+def submit_job(category, max_pages, concurrency=1, incremental=False, base_url=None, owner=None, parser_processes=0):
+    """Crée une tâche pour une seule catégorie (voir submit_crawl) ; renvoie son identifiant"""
+    return submit_crawl({category: max_pages}, concurrency, incremental, {category: base_url} if base_url else None,
+                        owner, parser_processes)
+
+
+def _start(executor, job_id):
+    try:
+        future = executor.submit(run_job, job_id, get_store().path)
+    except BrokenProcessPool:
+        # Un processus du pool a été tué : le pool est recréé
+        future = _get_executor(broken=executor).submit(run_job, job_id, get_store().path)
+    _futures[job_id] = future
+    future.add_done_callback(lambda f: _job_done(job_id, f))
+
+
+def _job_done(job_id, future):
+    _futures.pop(job_id, None)
+    if not future.cancelled() and future.exception() is not None:
+        # Processus du pool tué (mémoire, signal) : run_job n'a pas pu enregistrer l'échec
+        get_store().update(job_id, statut=ECHEC, fini_le=time.time(), message=str(future.exception()))
+
+
+def get_job(job_id):
+    return get_store().get(job_id)
+
+
+def recent_jobs(limit=10, owner=None):
+    return get_store().recent(limit, owner)
+
+
+def resume_job(job_id, owner=None):
+    """Relance une tâche interrompue, annulée ou en échec, sans retélécharger les pages déjà journalisées"""
+    store = get_store()
+    job = store.get(job_id)
+    if job is None or job['statut'] in STATUTS_ACTIFS:
+        return
+    executor = _get_executor()
+    if owner is not None and store.active_count(owner) >= MAX_JOBS_PAR_SESSION:
+        raise RuntimeError(f"{MAX_JOBS_PAR_SESSION} scrapings sont déjà en cours pour cette session.")
+    store.reset_for_resume(job_id)
+    _start(executor, job_id)
+
+
+def cancel_job(job_id):
+    get_store().request_cancel(job_id)
+    future = _futures.get(job_id)
+    if future is not None:
+        future.cancel()
@@ -0,0 +1,188 @@
+"""Mesures du scraping : durée de chaque étape par page, octets, cartes trouvées, lignes produites et erreurs
+
+Chaque page traitée enregistre, par catégorie, ses durées de connexion (DNS, TCP, TLS), de
+téléchargement, d'analyse du HTML et d'extraction des cartes, ainsi que ses compteurs. Le bilan est
+un dictionnaire sérialisable en JSON (enregistré avec chaque tâche de scraping), exportable au
+format texte Prometheus et résumé dans l'interface Streamlit. Des cartes sans ligne produite ou des
+champs toujours vides signalent un sélecteur cassé par un changement du site.
+"""
+import heapq
+import json
+import os
+from threading import Lock
+
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'metriques')
+
+ETAPES = ['connexion', 'telechargement', 'analyse', 'extraction']
+COMPTEURS = ['pages', 'pages_en_erreur', 'pages_sans_annonce', 'cartes', 'lignes', 'erreurs_cartes',
+             'octets', 'octets_cache', 'connexions']
+# Compteurs fournis par chaque page (les trois premiers sont déduits de son résultat)
+COMPTEURS_PAGE = COMPTEURS[3:]
+# Bornes (secondes) de l'histogramme des durées par étape
+BORNES = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+PAGES_LENTES = 5
+
+_AIDE = {
+    'pages': 'Pages traitées',
+    'pages_en_erreur': 'Pages abandonnées (téléchargement ou analyse)',
+    'pages_sans_annonce': 'Pages téléchargées sans aucune carte d\'annonce',
+    'cartes': 'Cartes d\'annonces trouvées',
+    'lignes': 'Lignes produites par l\'extraction',
+    'erreurs_cartes': 'Cartes dont l\'extraction a échoué',
+    'octets': 'Octets téléchargés',
+    'octets_cache': 'Octets servis par le cache HTTP',
+    'connexions': 'Connexions ouvertes (DNS, TCP, TLS)',
+}
+
+
+def _empty_category():
+    return {
+        'compteurs': dict.fromkeys(COMPTEURS, 0),
+        'etapes': {stage: {'nombre': 0, 'total': 0.0, 'max': 0.0, 'histogramme': [0] * len(BORNES)}
+                   for stage in ETAPES},
+        'champs_vides': {},
+        'derniere_erreur': None,
+        'pages_lentes': [],
+    }
+
+
+class ScrapeMetrics:
+    """Mesures cumulées par catégorie ; record_page() est appelé une fois par page traitée"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.categories = {}
+
+    def record_page(self, category, page, url, ok, timings):
+        """Ajoute une page ; timings contient les durées (clés de ETAPES), les compteurs de la page
+        (clés de COMPTEURS_PAGE), champs_vides ({champ: lignes}) et derniere_erreur"""
+        with self._lock:
+            data = self.categories.setdefault(category, _empty_category())
+            counters = data['compteurs']
+            counters['pages'] += 1
+            counters['pages_en_erreur'] += not ok
+            if ok and not timings.get('cartes'):
+                counters['pages_sans_annonce'] += 1
+            for key in COMPTEURS_PAGE:
+                counters[key] += timings.get(key, 0)
+
+            total = 0.0
+            for stage in ETAPES:
+                if stage not in timings:
+                    continue
+                seconds = timings[stage]
+                total += seconds
+                stats = data['etapes'][stage]
+                stats['nombre'] += 1
+                stats['total'] += seconds
+                stats['max'] = max(stats['max'], seconds)
+                for i, bound in enumerate(BORNES):
+                    if seconds <= bound:
+                        stats['histogramme'][i] += 1
+                        break
+
+            for field, n in timings.get('champs_vides', {}).items():
+                data['champs_vides'][field] = data['champs_vides'].get(field, 0) + n
+            if timings.get('derniere_erreur'):
+                data['derniere_erreur'] = timings['derniere_erreur']
+            # Pages les plus lentes (somme des étapes), pour repérer les pages problématiques
+            entry = [round(total, 4), page, url]
+            if len(data['pages_lentes']) < PAGES_LENTES:
+                heapq.heappush(data['pages_lentes'], entry)
+            else:
+                heapq.heappushpop(data['pages_lentes'], entry)
+
+    def to_dict(self):
+        """Bilan sérialisable en JSON : {'categories': {catégorie: {...}}}"""
+        with self._lock:
+            report = json.loads(json.dumps({'categories': self.categories}))
+        for data in report['categories'].values():
+            data['pages_lentes'].sort(reverse=True)
+        return report
+
+
+def summary(report):
+    """Lignes de résumé par catégorie et par étape : durée totale, moyenne, maximum et part du temps"""
+    rows = []
+    for category, data in report['categories'].items():
+        grand_total = sum(stats['total'] for stats in data['etapes'].values()) or 1.0
+        for stage, stats in data['etapes'].items():
+            if not stats['nombre']:
+                continue
+            rows.append({'categorie': category, 'etape': stage, 'pages': stats['nombre'],
+                         'total_s': round(stats['total'], 3),
+                         'moyenne_ms': round(stats['total'] / stats['nombre'] * 1000, 1),
+                         'max_ms': round(stats['max'] * 1000, 1),
+                         'part': round(stats['total'] / grand_total, 3)})
+    return rows
+
+
+def selector_warnings(report):
+    """Signaux d'un sélecteur cassé : pages sans annonce, cartes en erreur, champs toujours vides"""
+    warnings = []
+    for category, data in report['categories'].items():
+        counters = data['compteurs']
+        if counters['pages_sans_annonce']:
+            warnings.append(f"{category} : {counters['pages_sans_annonce']} pages téléchargées sans aucune annonce")
+        if counters['erreurs_cartes']:
+            warnings.append(f"{category} : {counters['erreurs_cartes']}/{counters['cartes']} cartes en erreur "
+                            f"(dernière : {data['derniere_erreur']})")
+        empty = [field for field, n in data['champs_vides'].items() if counters['lignes'] and n == counters['lignes']]
+        if empty:
+            warnings.append(f"{category} : champs toujours vides {', '.join(sorted(empty))}")
+    return warnings
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def prometheus_text(report):
+    """Bilan au format texte d'exposition Prometheus"""
+    categories = report['categories']
+    lines = []
+    for key in COMPTEURS:
+        name = f'scraping_{key}_total'
+        lines += [f'# HELP {name} {_AIDE[key]}', f'# TYPE {name} counter']
+        lines += [f'{name}{_labels(categorie=category)} {data["compteurs"][key]}'
+                  for category, data in categories.items()]
+
+    name = 'scraping_etape_secondes'
+    lines += [f'# HELP {name} Durée de chaque étape par page', f'# TYPE {name} histogram']
+    for category, data in categories.items():
+        for stage, stats in data['etapes'].items():
+            cumulated = 0
+            for bound, n in zip(BORNES, stats['histogramme']):
+                cumulated += n
+                lines.append(f'{name}_bucket{_labels(categorie=category, etape=stage, le=bound)} {cumulated}')
+            lines.append(f'{name}_bucket{_labels(categorie=category, etape=stage, le="+Inf")} {stats["nombre"]}')
+            lines.append(f'{name}_sum{_labels(categorie=category, etape=stage)} {stats["total"]:.6f}')
+            lines.append(f'{name}_count{_labels(categorie=category, etape=stage)} {stats["nombre"]}')
+
+    name = 'scraping_champs_vides_total'
+    lines += [f'# HELP {name} Lignes dont le champ est vide', f'# TYPE {name} counter']
+    for category, data in categories.items():
+        lines += [f'{name}{_labels(categorie=category, champ=field)} {n}'
+                  for field, n in sorted(data['champs_vides'].items())]
+    return '\n'.join(lines) + '\n'
+
+
+def write_report(report, name, directory=None):
+    """Écrit le bilan en JSON et au format Prometheus (name.json, name.prom) ; renvoie les deux chemins"""
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for extension, content in (('json', json.dumps(report, ensure_ascii=False, indent=1)),
+                               ('prom', prometheus_text(report))):
+        path = os.path.join(directory, f'{name}.{extension}')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return tuple(paths)
+
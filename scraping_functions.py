@@ -1,208 +1,359 @@
-import streamlit as st
-import pandas as pd
-from requests import get
-from bs4 import BeautifulSoup as bs
-import re
-
-
-def scrape_voitures_data(max_pages):
-    """Scraping de voitures avec BeautifulSoup"""
-    base_url = 'https://dakar-auto.com/senegal/voitures-4'
-    data = []
-
-    for p_index in range(1, max_pages + 1):
-        # Construire l'URL
-        url = f'{base_url}?page={p_index}' if p_index > 1 else base_url
-        print(f"Scraping: {url}, page {p_index}")
-
-        try:
-            response = get(url)
-            soup = bs(response.text, 'html.parser')
-
-            # Sélectionner les annonces
-            containers = soup.select('.listings-cards__list-item')
-
-            for container in containers:
+import multiprocessing
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice, tee
+from threading import Lock
+from listing_parser import parse_listing_page, parse_page_compact
+from http_client import get_client, start_timing, take_timing
+from fetch_control import FetchError, get_controller
+from crawl_state import SeenIndex
+from crawl_log import CrawlLog, read_rows
+from row_buffer import ColumnBuffer
+from scrape_metrics import ScrapeMetrics
+
+
+BASE_URL_VOITURES = 'https://dakar-auto.com/senegal/voitures-4'
+BASE_URL_MOTOS = 'https://dakar-auto.com/senegal/motos-and-scooters-3'
+BASE_URL_LOCATION = 'https://dakar-auto.com/senegal/location-de-voitures-19'
+
+CATEGORY_URLS = {
+    'voitures': BASE_URL_VOITURES,
+    'motos': BASE_URL_MOTOS,
+    'location': BASE_URL_LOCATION,
+}
+
+# Nombre maximal de requêtes simultanées vers un même site (politesse)
+MAX_REQUETES_PAR_HOTE = 4
+
+
+def page_urls(base_url, max_pages):
+    """Construit la liste des URLs de pages à scraper"""
+    return [f'{base_url}?page={p_index}' if p_index > 1 else base_url
+            for p_index in range(1, max_pages + 1)]
+
+
+def _fetch_page(p_index, url, per_host_limit):
+    """Télécharge une page via le contrôleur du site (débit adaptatif, reprises, disjoncteur)
+
+    Renvoie (html, None, mesures), ou (None, motif, mesures) si la page est abandonnée ; mesures
+    cumule les durées de connexion et de téléchargement et les octets de toutes les tentatives.
+    """
+    print(f"Scraping: {url}, page {p_index}")
+    start_timing()
+    try:
+        return get_controller().fetch(url, get_client().get_text, per_host_limit), None, take_timing()
+    except FetchError as e:
+        print(f"Page abandonnée: {e}")
+        return None, e.reason, take_timing()
+    except Exception as e:
+        print(f"Erreur lors du chargement de la page: {e}")
+        return None, str(e), take_timing()
+
+
+def fetch_pages(urls, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, page_numbers=None):
+    """Télécharge les pages, en parallèle si concurrency > 1, et les renvoie dans l'ordre des URLs
+
+    page_numbers donne le numéro de chaque URL (pour les traces), par défaut 1, 2, 3...
+    Renvoie des quadruplets (url, html, motif, mesures) : html vaut None et motif explique l'échec si la
+    page est perdue ; mesures est le dictionnaire de durées et d'octets de la page (http_client.take_timing).
+    """
+    numbered = zip(page_numbers, urls) if page_numbers is not None else enumerate(urls, start=1)
+    if concurrency <= 1:
+        for p_index, url in numbered:
+            yield (url, *_fetch_page(p_index, url, per_host_limit))
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Fenêtre bornée de pages lancées en avance : l'ordre est conservé et un arrêt
+        # anticipé (scraping incrémental) n'attend que les pages déjà en cours
+        queued = iter(numbered)
+        pending = deque()
+        for p_index, url in islice(queued, 2 * concurrency):
+            pending.append((url, executor.submit(_fetch_page, p_index, url, per_host_limit)))
+        while pending:
+            url, future = pending.popleft()
+            for p_index, next_url in islice(queued, 1):
+                pending.append((next_url, executor.submit(_fetch_page, p_index, next_url, per_host_limit)))
+            yield (url, *future.result())
+
+
+_parser_pools = {}
+_parser_pools_lock = Lock()
+
+
+def get_parser_pool(processes):
+    """Pool de processus d'analyse partagé (un par nombre de processus), créé au premier usage"""
+    with _parser_pools_lock:
+        if processes not in _parser_pools:
+            # spawn : pas de fork d'un processus serveur multi-threadé
+            _parser_pools[processes] = ProcessPoolExecutor(max_workers=processes,
+                                                           mp_context=multiprocessing.get_context('spawn'))
+        return _parser_pools[processes]
+
+
+def _drop_parser_pool(processes):
+    """Oublie un pool cassé (processus tué) : le prochain scraping en recrée un"""
+    with _parser_pools_lock:
+        executor = _parser_pools.pop(processes, None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_here(html, category, backend, with_id, timings):
+    try:
+        return parse_listing_page(html, category, backend, with_id=with_id, stats=timings), None
+    except Exception as e:
+        print(f"Erreur lors de l'analyse de la page: {e}")
+        return None, f"analyse : {e}"
+
+
+def _parse_result(future, processes, timings):
+    try:
+        columns, rows, stats = future.result()
+    except BrokenProcessPool as e:
+        _drop_parser_pool(processes)
+        return None, f"analyse : {e}"
+    except Exception as e:
+        print(f"Erreur lors de l'analyse de la page: {e}")
+        return None, f"analyse : {e}"
+    timings.update(stats)
+    return [dict(zip(columns, row)) for row in rows], None
+
+
+def parse_pages(pages, category, backend=None, with_id=False, processes=0):
+    """Analyse les pages de fetch_pages et renvoie (url, lignes, motif, mesures) dans l'ordre ; lignes vaut
+    None si la page est perdue (téléchargement ou analyse)
+
+    category est la catégorie des pages, ou une fonction url -> catégorie quand les pages de
+    plusieurs catégories sont mêlées (iter_crawl).
+
+    Avec processes > 0, l'analyse tourne dans un pool de processus pendant que les téléchargements
+    continuent : le HTML brut part vers le pool, les lignes reviennent en tuples. Au plus
+    2 * processes pages attendent leur analyse ; au-delà, la page suivante n'est pas demandée aux
+    téléchargements (contre-pression), la mémoire reste bornée.
+    """
+    category_of = category if callable(category) else lambda url: category
+    if processes <= 0:
+        for url, html, error, timings in pages:
+            rows = None
+            if html is not None:
+                rows, error = _parse_here(html, category_of(url), backend, with_id, timings)
+            yield url, rows, error, timings
+        return
+
+    pending = deque()
+
+    def oldest():
+        url, future, error, timings = pending.popleft()
+        rows = None
+        if future is not None:
+            rows, error = _parse_result(future, processes, timings)
+        return url, rows, error, timings
+
+    try:
+        for url, html, error, timings in pages:
+            future = None
+            if html is not None:
                 try:
-                    prix_raw = container.select_one('.listing-card__header__price')
-                    prix = prix_raw.text.strip() if prix_raw else ''
-                    cleaned_price = int(re.sub(r"[^\d]", "", prix)) if prix else None
-
-                    titre = container.select_one('.listing-card__header__title a')
-                    nom_complet = titre.text.strip().split() if titre else []
-                    marque = nom_complet[0] if nom_complet else None
-                    annee = nom_complet[-1] if nom_complet else None
-
-                    localisation_elem = container.select_one('.entry-zone-address')
-                    localisation = localisation_elem.text.strip() if localisation_elem else None
-
-                    auteur_elem = container.select_one('.time-author a')
-                    publie_par = auteur_elem.text.strip() if auteur_elem else None
-                    proprietaire = publie_par[4:] if publie_par else None
-
-                    kilometrage = type_boite = carburant = None
-                    attributes = container.select('.listing-card__attribute')
-
-                    for attr in attributes:
-                        text = attr.text.strip()
-                        icon = attr.select_one('i')
-                        if icon and 'icon-road-perspective' in icon['class']:
-                            kilometrage = int(text.replace(' km', '').replace(' ',''))
-                        elif icon and 'icon-gear-icon' in icon['class']:
-                            type_boite = text
-                        elif icon and 'icon-fuel' in icon['class']:
-                            carburant = text
-
-                    voiture = {
-                        'V1': marque,
-                        'V2': annee,
-                        'V3': cleaned_price,
-                        'V4': localisation,
-                        'V5': kilometrage,
-                        'V6': type_boite,
-                        'V7': carburant,
-                        'V8': proprietaire,
-                    }
-                    data.append(voiture)
-                except Exception as e:
-                    print(f"Erreur interne dans un container: {e}")
-                    continue
-
-        except Exception as e:
-            print(f"Erreur lors du chargement de la page: {e}")
-            continue
-
-    # Créer un DataFrame
-    df = pd.DataFrame(data)
-    print(df)
-    return df
-
-def scrape_motos_data(max_pages):
+                    # Pool relu à chaque page : un pool cassé est remplacé au lieu de faire échouer la suite
+                    future = get_parser_pool(processes).submit(parse_page_compact, html, category_of(url), backend,
+                                                               with_id)
+                except BrokenProcessPool as e:
+                    _drop_parser_pool(processes)
+                    error = f"analyse : {e}"
+            pending.append((url, future, error, timings))
+            if len(pending) >= 2 * processes:
+                yield oldest()
+        while pending:
+            yield oldest()
+    finally:
+        # Arrêt anticipé (scraping incrémental, annulation) : les analyses en attente sont abandonnées
+        for _, future, _, _ in pending:
+            if future is not None:
+                future.cancel()
+
+
+# Résultat d'une page : numéro, URL, lignes extraites, succès et motif de l'échec éventuel
+PageBatch = namedtuple('PageBatch', ['page', 'url', 'rows', 'ok', 'error'], defaults=[None])
+
+
+def crawl_plan(budgets, base_urls=None, first_page=1, skip=None, stopped=()):
+    """Ordre de téléchargement des pages de plusieurs catégories : (catégorie, numéro, URL)
+
+    Les catégories sont entrelacées rang par rang (page 1 de chacune, puis page 2...) : les pages les
+    plus récentes de toutes les catégories passent en premier, et une catégorie au petit budget
+    ne retarde pas les autres. budgets donne le nombre de pages par catégorie ; les pages de skip
+    (catégorie -> numéros déjà journalisés) sont sautées, et une catégorie ajoutée à stopped
+    pendant le parcours n'a plus de nouvelles pages.
+    """
+    base_urls = base_urls or {}
+    urls = {category: page_urls(base_urls.get(category) or CATEGORY_URLS[category], max_pages)
+            for category, max_pages in budgets.items()}
+    for p_index in range(first_page, max(budgets.values(), default=0) + 1):
+        for category, category_urls in urls.items():
+            if p_index > len(category_urls) or category in stopped:
+                continue
+            if skip and p_index in skip.get(category, ()):
+                continue
+            yield category, p_index, category_urls[p_index - 1]
+
+
+def iter_crawl(budgets, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, base_urls=None, parser_backend=None,
+               incremental=False, checkpoints=None, first_page=1, with_id=False, metrics=None, parser_processes=0):
+    """Générateur : scrape plusieurs catégories en un seul passage et renvoie (catégorie, PageBatch) par page
+
+    budgets associe à chaque catégorie son nombre de pages (pages first_page à budget). Les pages de
+    toutes les catégories passent par les mêmes téléchargements (concurrency requêtes, session HTTP
+    et limite par site partagées : les catégories sont sur le même site) et la même analyse, dans
+    l'ordre de crawl_plan. Les lots d'une catégorie sont renvoyés dans l'ordre de ses pages.
+
+    checkpoints associe à une catégorie le chemin de son journal de crawl (crawl_log) : ses pages y
+    sont enregistrées, et celles déjà terminées ne sont ni retéléchargées ni renvoyées. En mode
+    incrémental, une catégorie s'arrête à sa première page entièrement connue, les autres continuent.
+    with_id, metrics et parser_processes : voir iter_scrape.
+    """
+    base_urls = base_urls or {}
+    if len({base_urls.get(category) or CATEGORY_URLS[category] for category in budgets}) < len(budgets):
+        raise ValueError("Deux catégories ont la même URL de base")
+    seen_index = SeenIndex() if incremental else None
+    logs = {category: CrawlLog(path, category, base_urls.get(category) or CATEGORY_URLS[category])
+            for category, path in (checkpoints or {}).items()}
+    stopped = set()
+    origin = {}
+
+    try:
+        skip = {category: log.completed for category, log in logs.items()}
+        numbers, planned = tee(crawl_plan(budgets, base_urls, first_page, skip, stopped))
+
+        def urls():
+            for category, p_index, url in planned:
+                origin[url] = (category, p_index)
+                yield url
+
+        pages = fetch_pages(urls(), concurrency, per_host_limit, (p_index for _, p_index, _ in numbers))
+        parsed = parse_pages(pages, lambda url: origin[url][0], parser_backend, incremental or with_id,
+                             parser_processes)
+        for url, rows, error, timings in parsed:
+            category, p_index = origin.pop(url)
+            if category in stopped:
+                # Page lancée avant l'arrêt incrémental de sa catégorie : ignorée
+                continue
+            if rows is None:
+                batch = PageBatch(p_index, url, [], False, error)
+            else:
+                batch = PageBatch(p_index, url, rows, True)
+            if metrics is not None:
+                metrics.record_page(category, p_index, url, batch.ok, timings)
+
+            all_known = False
+            if seen_index is not None and batch.ok:
+                fresh, all_known = seen_index.filter_page(category, batch.rows)
+                batch = batch._replace(rows=fresh)
+            if category in logs:
+                logs[category].append(batch)
+            yield category, batch
+            if seen_index is not None and batch.ok:
+                # L'appelant demande la page suivante : le lot est sauvegardé, ses annonces deviennent connues.
+                # Un arrêt avant (plantage, annulation) les laisse nouvelles pour le prochain passage.
+                seen_index.mark_seen(category, batch.rows)
+
+            if all_known:
+                print(f"Page déjà connue, arrêt du scraping incrémental: {url}")
+                stopped.add(category)
+                if stopped >= set(budgets):
+                    break
+    finally:
+        if seen_index is not None:
+            seen_index.close()
+        for log in logs.values():
+            log.close()
+
+
+def iter_scrape(category, max_pages, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, base_url=None,
+                parser_backend=None, incremental=False, checkpoint=None, first_page=1, with_id=False, metrics=None,
+                parser_processes=0):
+    """Générateur : renvoie un PageBatch par page, dans l'ordre, dès que la page est traitée
+
+    Les pages first_page à max_pages sont scrapées (first_page sert au crawl découpé en tranches).
+
+    En mode incrémental, seules les annonces nouvelles ou modifiées sont renvoyées (avec leur annonce_id)
+    et le scraping s'arrête à la première page dont toutes les annonces sont déjà connues. Les annonces
+    d'un lot ne sont enregistrées comme vues que lorsque l'appelant demande le lot suivant.
+
+    checkpoint est le chemin d'un journal de crawl (crawl_log) : chaque page y est enregistrée, et les
+    pages déjà terminées lors d'un précédent passage ne sont ni retéléchargées ni renvoyées.
+    with_id ajoute annonce_id aux lignes (toujours présent en mode incrémental).
+    metrics (scrape_metrics.ScrapeMetrics) reçoit les durées et compteurs de chaque page.
+    parser_processes > 0 analyse les pages dans un pool de processus (voir parse_pages).
+    C'est iter_crawl pour une seule catégorie.
+    """
+    for _, batch in iter_crawl({category: max_pages}, concurrency, per_host_limit,
+                               {category: base_url} if base_url else None, parser_backend, incremental,
+                               {category: checkpoint} if checkpoint else None, first_page, with_id, metrics,
+                               parser_processes):
+        yield batch
+
+
+def scrape_categories(budgets, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, base_urls=None,
+                      parser_backend=None, incremental=False, checkpoints=None, parser_processes=0):
+    """Scrape plusieurs catégories en un seul passage (iter_crawl) ; renvoie {catégorie: DataFrame}
+
+    Les lignes de chaque catégorie sont rangées au fil des pages dans son tampon colonnaire
+    (row_buffer) : entiers nullable pour l'année, le prix et le kilométrage, catégories pour la
+    marque, la boîte et le carburant.
+    """
+    checkpoints = checkpoints or {}
+    buffers = {category: ColumnBuffer(category, with_id=incremental) for category in budgets}
+    skipped = {category: [] for category in budgets}
+    metrics = ScrapeMetrics()
+    for category, batch in iter_crawl(budgets, concurrency, per_host_limit, base_urls, parser_backend, incremental,
+                                      checkpoints, metrics=metrics, parser_processes=parser_processes):
+        if category not in checkpoints:
+            buffers[category].extend(batch.rows)
+        if not batch.ok:
+            skipped[category].append((batch.page, batch.url, batch.error))
+
+    frames = {}
+    for category, data in buffers.items():
+        if category in checkpoints:
+            # Les lignes sont relues depuis le journal, y compris celles des passages précédents
+            data.extend(read_rows(checkpoints[category]))
+        df = frames[category] = data.to_frame()
+        # Pages perdues malgré les reprises : signalées plutôt qu'ignorées
+        df.attrs['pages_en_erreur'] = skipped[category]
+        # Durées par étape et compteurs (scrape_metrics), pour le bilan JSON ou Prometheus
+        df.attrs['metriques'] = metrics.to_dict()
+        if skipped[category]:
+            print(f"{category} : {len(skipped[category])} pages non collectées: "
+                  f"{[page for page, _, _ in skipped[category]]}")
+    return frames
+
+
+def _scrape_category(category, base_url, max_pages, concurrency, per_host_limit, parser_backend, incremental,
+                     checkpoint=None, parser_processes=0):
+    """Scrape les pages d'une catégorie et renvoie un DataFrame (colonnes V1..Vn de la catégorie)"""
+    return scrape_categories({category: max_pages}, concurrency, per_host_limit, {category: base_url},
+                             parser_backend, incremental, {category: checkpoint} if checkpoint else None,
+                             parser_processes)[category]
+
+
+def scrape_voitures_data(max_pages, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, base_url=BASE_URL_VOITURES,
+                         parser_backend=None, incremental=False, checkpoint=None, parser_processes=0):
+    """Scraping de voitures"""
+    return _scrape_category('voitures', base_url, max_pages, concurrency, per_host_limit, parser_backend, incremental,
+                            checkpoint, parser_processes)
+
+
+def scrape_motos_data(max_pages, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, base_url=BASE_URL_MOTOS,
+                      parser_backend=None, incremental=False, checkpoint=None, parser_processes=0):
     """Fonction de scraping pour les données de motos"""
-    base_url = 'https://dakar-auto.com/senegal/motos-and-scooters-3'
-    data = []
-
-    for p_index in range(1, max_pages + 1): 
-        # Construire l'URL
-        url = f'{base_url}?page={p_index}' if p_index > 1 else base_url
-        print(f"Scraping: {url}, page {p_index}")
+    return _scrape_category('motos', base_url, max_pages, concurrency, per_host_limit, parser_backend, incremental,
+                            checkpoint, parser_processes)
 
-        try:
-            response = get(url)
-            soup = bs(response.text, 'html.parser')
 
-            # Sélectionner les annonces
-            containers = soup.select('.listings-cards__list-item')
-
-            for container in containers: 
-                try:
-                    prix_raw = container.select_one('.listing-card__header__price')
-                    prix = prix_raw.text.strip() if prix_raw else ''
-                    cleaned_price = int(re.sub(r"[^\d]", "", prix)) if prix else None
-
-                    titre = container.select_one('.listing-card__header__title a')
-                    nom_complet = titre.text.strip().split() if titre else []
-                    marque = nom_complet[0] if nom_complet else None
-                    annee = nom_complet[-1] if nom_complet else None
-                
-                    localisation_elem = container.select_one('.entry-zone-address')
-                    localisation = localisation_elem.text.strip() if localisation_elem else None
-
-                    auteur_elem = container.select_one('.time-author a')
-                    publie_par = auteur_elem.text.strip() if auteur_elem else None
-                    proprietaire = publie_par[4:] if publie_par else None
-
-                    attributes = container.select('.listing-card__attribute')
-                    kilometrage = type_boite = carburant = None
-
-                    for attr in attributes:
-                        text = attr.text.strip()
-                        icon = attr.select_one('i')
-                        if icon and 'icon-road-perspective' in icon['class']:
-                            kilometrage = int(text.replace(' km', '').replace(' ',''))
-                        elif icon and 'icon-gear-icon' in icon['class']:
-                            type_boite = text
-                        elif icon and 'icon-fuel' in icon['class']:
-                            carburant = text
-
-                    voiture = {
-                        'V1': marque,
-                        'V2': annee,
-                        'V3': cleaned_price,
-                        'V4': localisation,
-                        'V5': kilometrage,
-                        'V6': proprietaire
-                    }                
-                    data.append(voiture)    
-                except Exception as e:
-                    print(f"Erreur interne dans un container: {e}")
-                    continue
-
-        except Exception as e:
-            print(f"Erreur lors du chargement de la page: {e}")
-            continue
-
-       
-    # Créer un DataFrame
-    df = pd.DataFrame(data)
-    print(df)
-    return df
-
-def scrape_location_data(max_pages):
+def scrape_location_data(max_pages, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE, base_url=BASE_URL_LOCATION,
+                         parser_backend=None, incremental=False, checkpoint=None, parser_processes=0):
     """Fonction de scraping pour les données de location de voitures"""
-    
-    base_url = 'https://dakar-auto.com/senegal/location-de-voitures-19'
-    data = []
-
-    for p_index in range(1, max_pages + 1): 
-        # Construire l'URL
-        url = f'{base_url}?page={p_index}' if p_index > 1 else base_url
-        print(f"Scraping: {url}, page {p_index}")
-
-        try:
-            response = get(url)
-            soup = bs(response.text, 'html.parser')
-
-            # Sélectionner les annonces
-            containers = soup.select('.listings-cards__list-item')
-
-            for container in containers: 
-                try:
-                    prix_raw = container.select_one('.listing-card__header__price')
-                    prix = prix_raw.text.strip() if prix_raw else ''
-                    cleaned_price = int(re.sub(r"[^\d]", "", prix)) if prix else None
-
-                    titre = container.select_one('.listing-card__header__title a')
-                    nom_complet = titre.text.strip().split() if titre else []
-                    marque = nom_complet[0] if nom_complet else None
-                    annee = nom_complet[-1] if nom_complet else None
-
-                    localisation_elem = container.select_one('.entry-zone-address')
-                    localisation = localisation_elem.text.strip() if localisation_elem else None
-
-                    auteur_elem = container.select_one('.time-author a')
-                    publie_par = auteur_elem.text.strip() if auteur_elem else None
-                    proprietaire = publie_par[4:] if publie_par else None
-                
-                    # Insérer les données scrapées
-                    voiture = {
-                        'V1': marque,
-                        'V2': annee,
-                        'V3': cleaned_price,
-                        'V4': localisation,
-                        'V5': proprietaire,
-                    }
-                    data.append(voiture)
-
-                except Exception as e:
-                    print(f"Erreur interne dans un container: {e}")
-                    continue
-
-        except Exception as e:
-            print(f"Erreur lors du chargement de la page: {e}")
-            continue
-
-    # Créer un DataFrame
-    df = pd.DataFrame(data)
-    print(df)
-    return df
\ No newline at end of file
+    return _scrape_category('location', base_url, max_pages, concurrency, per_host_limit, parser_backend, incremental,
+                            checkpoint, parser_processes)
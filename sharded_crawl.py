@@ -0,0 +1,307 @@
+"""Crawl découpé en tranches de pages (shards) réparties entre plusieurs processus ou machines
+
+Un répertoire de crawl partagé contient la table des baux (leases.sqlite) et un journal de crawl
+par tranche. Chaque worker prend le bail d'une tranche libre, la scrape en renouvelant son bail
+depuis un thread (LeaseHeartbeat, même pendant une page longue à cause des reprises), puis passe
+à la suivante ; une tranche dont le bail a expiré (worker arrêté) est reprise par un autre worker
+à partir de son journal. La fusion relit les tranches dans l'ordre et ne garde que la dernière
+version de chaque annonce (même annonce_id), son résultat ne dépend pas du nombre de workers.
+
+    python sharded_crawl.py plan   DOSSIER voitures 2750
+    python sharded_crawl.py worker DOSSIER          (sur chaque machine, autant de fois que voulu)
+    python sharded_crawl.py merge  DOSSIER sortie.csv
+"""
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from crawl_log import read_rows
+from dedup import SCRAPED_FIELDS, dedup_csv
+from scrape_metrics import ScrapeMetrics, write_report
+from scraping_functions import CATEGORY_URLS, MAX_REQUETES_PAR_HOTE, iter_scrape
+from storage import CsvBatchWriter
+
+
+SHARD_PAGES = 50      # pages par tranche
+LEASE_SECONDS = 120   # un bail non renouvelé pendant cette durée est considéré comme abandonné
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4   # intervalle de renouvellement du bail d'une tranche en cours
+MAX_TENTATIVES = 3    # une tranche avec des pages en erreur est remise en jeu jusqu'à ce nombre de tentatives
+
+LIBRE = 'libre'
+PRIS = 'pris'
+FINI = 'fini'
+
+
+class LeaseTable:
+    """Table SQLite des tranches d'un crawl et de leurs baux"""
+
+    def __init__(self, crawl_dir):
+        os.makedirs(crawl_dir, exist_ok=True)
+        self.crawl_dir = crawl_dir
+        # isolation_level=None : les transactions sont ouvertes explicitement (BEGIN IMMEDIATE)
+        self.conn = sqlite3.connect(os.path.join(crawl_dir, 'leases.sqlite'), timeout=30, isolation_level=None)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl (
+                categorie TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                max_pages INTEGER NOT NULL,
+                demarre_le REAL
+            )
+        ''')
+        # Crawls planifiés par une version précédente : pas de date de départ
+        if 'demarre_le' not in {row[1] for row in self.conn.execute('PRAGMA table_info(crawl)')}:
+            self.conn.execute('ALTER TABLE crawl ADD COLUMN demarre_le REAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS shards (
+                shard INTEGER PRIMARY KEY,
+                premiere_page INTEGER NOT NULL,
+                derniere_page INTEGER NOT NULL,
+                statut TEXT NOT NULL,
+                worker TEXT,
+                expire_le REAL,
+                tentatives INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+    def plan(self, category, max_pages, shard_pages=SHARD_PAGES, base_url=None):
+        """Découpe les pages 1..max_pages en tranches (sans effet si le crawl est déjà planifié)
+
+        La date de planification sert de date du crawl au dédoublonnage de la fusion (dedup.py).
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self.conn.execute('SELECT COUNT(*) FROM crawl').fetchone()[0] == 0:
+                self.conn.execute('INSERT INTO crawl VALUES (?, ?, ?, ?)',
+                                  (category, base_url or CATEGORY_URLS[category], max_pages, time.time()))
+                self.conn.executemany(
+                    'INSERT INTO shards (shard, premiere_page, derniere_page, statut) VALUES (?, ?, ?, ?)',
+                    [(i, first, min(first + shard_pages - 1, max_pages), LIBRE)
+                     for i, first in enumerate(range(1, max_pages + 1, shard_pages))])
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def crawl_info(self):
+        """(catégorie, URL de base, nombre de pages, date de planification) du crawl, ou None"""
+        return self.conn.execute('SELECT categorie, base_url, max_pages, demarre_le FROM crawl').fetchone()
+
+    def acquire(self, worker):
+        """Prend le bail d'une tranche libre ou abandonnée ; renvoie (shard, première page, dernière page) ou None"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                'SELECT shard, premiere_page, derniere_page FROM shards '
+                'WHERE statut = ? OR (statut = ? AND expire_le < ?) ORDER BY shard LIMIT 1',
+                (LIBRE, PRIS, now)).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    'UPDATE shards SET statut = ?, worker = ?, expire_le = ?, tentatives = tentatives + 1 '
+                    'WHERE shard = ?', (PRIS, worker, now + LEASE_SECONDS, row[0]))
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def renew(self, shard, worker):
+        """Prolonge le bail ; renvoie False si la tranche a été reprise par un autre worker"""
+        cursor = self.conn.execute('UPDATE shards SET expire_le = ? WHERE shard = ? AND worker = ? AND statut = ?',
+                                   (time.time() + LEASE_SECONDS, shard, worker, PRIS))
+        return cursor.rowcount == 1
+
+    def release(self, shard, worker):
+        """Rend une tranche incomplète : elle sera reprise (depuis son journal) par le prochain worker"""
+        self.conn.execute('UPDATE shards SET statut = ?, worker = NULL, expire_le = NULL '
+                          'WHERE shard = ? AND worker = ?', (LIBRE, shard, worker))
+
+    def attempts(self, shard):
+        return self.conn.execute('SELECT tentatives FROM shards WHERE shard = ?', (shard,)).fetchone()[0]
+
+    def finish(self, shard, worker):
+        self.conn.execute('UPDATE shards SET statut = ?, expire_le = NULL WHERE shard = ? AND worker = ?',
+                          (FINI, shard, worker))
+
+    def progress(self):
+        """Nombre de tranches par statut"""
+        return dict(self.conn.execute('SELECT statut, COUNT(*) FROM shards GROUP BY statut').fetchall())
+
+    def shard_ids(self):
+        return [row[0] for row in self.conn.execute('SELECT shard FROM shards ORDER BY shard')]
+
+    def close(self):
+        self.conn.close()
+
+
+class LeaseHeartbeat:
+    """Renouvelle le bail d'une tranche dans un thread tant qu'elle est scrapée
+
+    Une page peut durer plus que le bail (reprises qui respectent Retry-After) : le bail est donc
+    prolongé toutes les HEARTBEAT_SECONDS, indépendamment des pages. lost indique qu'un autre worker
+    a repris la tranche.
+    """
+
+    def __init__(self, crawl_dir, shard, worker, interval=HEARTBEAT_SECONDS):
+        self.crawl_dir = crawl_dir
+        self.shard = shard
+        self.worker = worker
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # Connexion propre au thread (une connexion sqlite3 ne se partage pas entre threads)
+        leases = LeaseTable(self.crawl_dir)
+        try:
+            while not self._stop.wait(self.interval):
+                if not leases.renew(self.shard, self.worker):
+                    self.lost.set()
+                    return
+        finally:
+            leases.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def shard_log_path(crawl_dir, shard):
+    return os.path.join(crawl_dir, f'shard-{shard:05d}.jsonl')
+
+
+def run_worker(crawl_dir, worker=None, concurrency=1, per_host_limit=MAX_REQUETES_PAR_HOTE):
+    """Scrape des tranches jusqu'à ce qu'il n'y en ait plus de libre ; renvoie le nombre de tranches terminées
+
+    Les mesures du worker (scrape_metrics) sont écrites dans le dossier du crawl : metriques-<worker>.json
+    et .prom.
+    """
+    worker = worker or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+    leases = LeaseTable(crawl_dir)
+    if leases.crawl_info() is None:
+        leases.close()
+        raise ValueError(f"Aucun crawl planifié dans {crawl_dir}")
+    category, base_url, _, _ = leases.crawl_info()
+    finished = 0
+    metrics = ScrapeMetrics()
+    try:
+        while True:
+            lease = leases.acquire(worker)
+            if lease is None:
+                return finished
+            shard, first_page, last_page = lease
+            failed = 0
+            with LeaseHeartbeat(crawl_dir, shard, worker) as heartbeat:
+                for batch in iter_scrape(category, last_page, concurrency, per_host_limit, base_url,
+                                         checkpoint=shard_log_path(crawl_dir, shard), first_page=first_page,
+                                         with_id=True, metrics=metrics):
+                    failed += not batch.ok
+                    if heartbeat.lost.is_set():
+                        # Bail expiré et repris ailleurs : l'autre worker termine la tranche
+                        break
+            if heartbeat.lost.is_set() or not leases.renew(shard, worker):
+                continue
+            if failed and leases.attempts(shard) < MAX_TENTATIVES:
+                leases.release(shard, worker)
+            else:
+                leases.finish(shard, worker)
+                finished += 1
+    finally:
+        leases.close()
+        if metrics.categories:
+            write_report(metrics.to_dict(), f'metriques-{worker}', crawl_dir)
+
+
+def merge_shards(crawl_dir, output_path):
+    """Fusionne les tranches dans l'ordre des pages, sans doublon d'annonce_id ; renvoie le nombre de lignes
+
+    La dernière occurrence d'une annonce est conservée (une annonce peut glisser d'une page à la
+    suivante pendant le crawl et apparaître dans deux tranches) ; voir dedup.py. Les versions sont
+    datées du début du crawl, comme celles des autres scrapings dans l'historique des annonces.
+    """
+    leases = LeaseTable(crawl_dir)
+    try:
+        category, _, _, started = leases.crawl_info()
+        shards = leases.shard_ids()
+    finally:
+        leases.close()
+
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    with CsvBatchWriter(tmp_path) as writer:
+        for shard in shards:
+            path = shard_log_path(crawl_dir, shard)
+            if os.path.exists(path):
+                writer.write(list(read_rows(path)))
+    if not writer.rows_written:
+        return 0
+    # Crawl planifié par une version précédente (sans date) : date de la fusion
+    rows, duplicates = dedup_csv(tmp_path, fields=SCRAPED_FIELDS[category], seen_at=started or time.time())
+    os.replace(tmp_path, output_path)
+    return rows - duplicates
+
+
+def run_sharded_crawl(category, max_pages, output_path, workers=4, shard_pages=SHARD_PAGES, base_url=None,
+                      crawl_dir=None, concurrency=1):
+    """Crawl complet sur une machine : planification, N processus workers, puis fusion ; renvoie le nombre de lignes
+
+    Chaque worker reçoit une part de la limite de requêtes par site, le total reste dans la limite de politesse.
+    """
+    crawl_dir = crawl_dir or os.path.splitext(output_path)[0] + '.shards'
+    leases = LeaseTable(crawl_dir)
+    try:
+        leases.plan(category, max_pages, shard_pages, base_url)
+    finally:
+        leases.close()
+
+    per_host_limit = max(1, MAX_REQUETES_PAR_HOTE // workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_worker, crawl_dir, None, concurrency, per_host_limit) for _ in range(workers)]
+        for future in futures:
+            future.result()
+    return merge_shards(crawl_dir, output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    plan = commands.add_parser('plan', help="Découpe un crawl en tranches dans DOSSIER")
+    plan.add_argument('crawl_dir')
+    plan.add_argument('category', choices=sorted(CATEGORY_URLS))
+    plan.add_argument('max_pages', type=int)
+    plan.add_argument('--shard-pages', type=int, default=SHARD_PAGES)
+    plan.add_argument('--base-url')
+
+    worker = commands.add_parser('worker', help="Scrape les tranches libres de DOSSIER")
+    worker.add_argument('crawl_dir')
+    worker.add_argument('--concurrency', type=int, default=1)
+    worker.add_argument('--per-host-limit', type=int, default=MAX_REQUETES_PAR_HOTE)
+
+    merge = commands.add_parser('merge', help="Fusionne les tranches de DOSSIER dans un CSV")
+    merge.add_argument('crawl_dir')
+    merge.add_argument('output')
+
+    args = parser.parse_args()
+    if args.command == 'plan':
+        leases = LeaseTable(args.crawl_dir)
+        leases.plan(args.category, args.max_pages, args.shard_pages, args.base_url)
+        print(leases.progress())
+        leases.close()
+    elif args.command == 'worker':
+        print(f"{run_worker(args.crawl_dir, None, args.concurrency, args.per_host_limit)} tranches terminées")
+    else:
+        print(f"{merge_shards(args.crawl_dir, args.output)} lignes écrites dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Écriture des résultats de scraping sur disque, par lots, sans garder tout le crawl en mémoire"""
+import csv
+import importlib.util
+import os
+import threading
+import time
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SCRAPED_DIR = os.path.join(DATA_DIR, 'scraped')
+
+
+def scrape_output_path(category, tag=None):
+    """Chemin d'un nouveau fichier de résultats pour une catégorie (horodaté, suivi de tag s'il est donné)"""
+    os.makedirs(SCRAPED_DIR, exist_ok=True)
+    suffix = f"-{tag}" if tag else ""
+    return os.path.join(SCRAPED_DIR, f"{category}-{time.strftime('%Y%m%d-%H%M%S')}{suffix}.csv")
+
+
+class CsvBatchWriter:
+    """Ajoute des lots de lignes (dicts) à un CSV ; l'entête est tirée du premier lot non vide"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0]))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        # Vider le tampon à chaque lot : le fichier reste lisible pendant le crawl
+        self._file.flush()
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Stockage colonnaire typé (Parquet) à côté des CSV bruts de Web Scraper
+
+# pyarrow n'est importé qu'au moment d'écrire ou de lire du Parquet (démarrage rapide du crawler)
+HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+# Colonnes texte à faible cardinalité, stockées en dictionnaire (catégories)
+CATEGORY_COLUMNS = ['web-scraper-start-url', 'marque', 'adresse', 'boite_vitesse', 'carburant', 'proprietaire']
+
+
+def typed_frame(df):
+    """Nettoie et type un export Web Scraper : nombres extraits, espaces normalisés, catégories"""
+    import pandas as pd
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            # Les adresses contiennent des retours à la ligne et des dizaines d'espaces
+            df[col] = df[col].str.replace(r'\s+', ' ', regex=True).str.strip()
+
+    if 'prix' in df:
+        df['prix'] = pd.to_numeric(df['prix'].str.replace(r'[^\d]', '', regex=True), errors='coerce').astype('Int64')
+    if 'annee' in df:
+        df['annee'] = pd.to_numeric(df['annee'].str.extract(r'(\d{4})', expand=False), errors='coerce').astype('Int16')
+    if 'kilometrage' in df:
+        km = pd.to_numeric(df['kilometrage'].str.replace(r'[^\d-]', '', regex=True), errors='coerce')
+        df['kilometrage'] = km.where(km >= 0).astype('Int64')
+    if 'containers_links-href' in df:
+        df['annonce_id'] = pd.to_numeric(df['containers_links-href'].str.extract(r'annonce-(\d+)', expand=False),
+                                         errors='coerce').astype('Int64')
+
+    for col in CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def convert_to_parquet(csv_path):
+    """Écrit la version typée et dédoublonnée (Parquet, colonnes en dictionnaire, zstd) d'un CSV et renvoie son chemin"""
+    import pandas as pd
+
+    from dedup import dedup_frame
+
+    path = parquet_path(csv_path)
+    # Une seule version par annonce (la plus récente), marquée nouvelle, modifiée ou en baisse de prix
+    df = dedup_frame(typed_frame(pd.read_csv(csv_path)))
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    df.to_parquet(tmp_path, engine='pyarrow', index=False, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+
+def ensure_parquet(csv_path):
+    """Renvoie le chemin Parquet à jour pour un CSV (converti si absent ou plus ancien), ou None sans pyarrow"""
+    if not HAS_PARQUET:
+        return None
+    path = parquet_path(csv_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(csv_path):
+        convert_to_parquet(csv_path)
+    return path
+
+
+def load_dataset(filename):
+    """Charge un jeu de données typé et dédoublonné de data/ (calcul complet du profil, dataset_profile.py)
+
+    Lit le Parquet quand pyarrow est installé, sinon le CSV (typé et dédoublonné à la volée de la même façon).
+    """
+    import pandas as pd
+
+    csv_path = filename if os.path.isabs(filename) else os.path.join(DATA_DIR, filename)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+
+    path = ensure_parquet(csv_path)
+    if path is not None:
+        return pd.read_parquet(path)
+
+    from dedup import dedup_frame
+
+    return dedup_frame(typed_frame(pd.read_csv(csv_path)))
+
+
+# --- Fichiers annexes (agrégats, profils) mis à jour quand un CSV est complété en fin de fichier
+
+_HEAD_BYTES = 4096
+
+
+def head_hash(csv_path):
+    """Empreinte du début du fichier : si elle change, le fichier a été réécrit et non complété"""
+    import hashlib
+
+    with open(csv_path, 'rb') as f:
+        return hashlib.sha1(f.read(_HEAD_BYTES)).hexdigest()
+
+
+def read_appended_rows(csv_path, offset, usecols=None):
+    """Lit les lignes ajoutées au CSV après l'octet offset (l'entête est relue en début de fichier)"""
+    import io
+    import pandas as pd
+
+    with open(csv_path, 'rb') as f:
+        header = f.readline().decode('utf-8-sig')
+        f.seek(offset)
+        tail = f.read()
+    return pd.read_csv(io.StringIO(header + tail.decode('utf-8')), usecols=usecols)
+
+
+if __name__ == '__main__':
+    from dataset_profile import build_profile
+
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith('.csv'):
+            csv_path = os.path.join(DATA_DIR, name)
+            print(f"{name} -> {os.path.basename(convert_to_parquet(csv_path))}")
+            build_profile(csv_path)
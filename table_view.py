@@ -0,0 +1,155 @@
+"""Tableaux paginés : filtres, tri et découpage faits côté serveur (en mémoire ou par requêtes sur l'entrepôt
+d'annonces), seule la page visible est envoyée au navigateur ; bouton de téléchargement des exports"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from exports import EXPORT_FORMATS, download_name, export_chunks, export_file, mime_type
+
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Correspondance rôle -> colonne pour les exports Web Scraper de data/ et pour les données scrapées (V1..Vn)
+DATASET_COLUMNS = {'marque': 'marque', 'annee': 'annee', 'prix': 'prix', 'adresse': 'adresse'}
+SCRAPED_COLUMNS = {'marque': 'V1', 'annee': 'V2', 'prix': 'V3', 'adresse': 'V4'}
+
+
+def _map_categories(series, func):
+    """Applique func aux seules catégories d'une colonne catégorielle (sinon à toute la colonne)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        mapped = np.append(func(pd.Series(series.cat.categories)).to_numpy(dtype=object), None)
+        return pd.Series(mapped[series.cat.codes], index=series.index)
+    return func(series)
+
+
+def brand_series(series):
+    """Marque = premier mot ('Ford Focus 2012 Dakar' -> 'Ford')"""
+    return _map_categories(series, lambda s: s.astype(str).str.split().str[0])
+
+
+def filter_frame(df, columns, marques=None, annees=None, prix=None, adresse=None):
+    """Renvoie les lignes qui passent tous les filtres donnés (les filtres à None sont ignorés)"""
+    mask = np.ones(len(df), dtype=bool)
+
+    if marques:
+        mask &= brand_series(df[columns['marque']]).isin(marques).to_numpy()
+    if annees is not None:
+        values = pd.to_numeric(df[columns['annee']], errors='coerce')
+        mask &= values.between(*annees).fillna(False).to_numpy(dtype=bool)
+    if prix is not None:
+        values = pd.to_numeric(df[columns['prix']], errors='coerce')
+        mask &= values.between(*prix).fillna(False).to_numpy(dtype=bool)
+    if adresse:
+        matches = _map_categories(df[columns['adresse']],
+                                  lambda s: s.astype(str).str.contains(adresse, case=False, regex=False))
+        mask &= matches.fillna(False).to_numpy(dtype=bool)
+
+    return df if mask.all() else df[mask]
+
+
+def page_slice(df, page, page_size):
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def _numeric_bounds(series):
+    values = pd.to_numeric(series, errors='coerce').dropna()
+    if values.empty:
+        return None
+    return int(values.min()), int(values.max())
+
+
+def _filter_widgets(key, brands, bounds, with_adresse, sort_columns):
+    """Widgets de filtre et de tri (brands None : pas de filtre par marque) ; renvoie (filtres, colonne de tri ou None, décroissant)"""
+    filters = {}
+    with st.expander("🔎 Filtres et tri", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            if brands is not None:
+                filters['marques'] = st.multiselect("Marque", brands, key=f"{key}_marques")
+            if with_adresse:
+                filters['adresse'] = st.text_input("Localisation contient", key=f"{key}_adresse").strip()
+        with col2:
+            for role, label in (('annee', "Année"), ('prix', "Prix (FCFA)")):
+                role_bounds = bounds.get(role)
+                if role_bounds and role_bounds[0] < role_bounds[1]:
+                    selected = st.slider(label, role_bounds[0], role_bounds[1], role_bounds, key=f"{key}_{role}")
+                    filters[role if role == 'prix' else 'annees'] = selected if selected != role_bounds else None
+
+        sort_col, order_col = st.columns([2, 1])
+        sort_by = sort_col.selectbox("Trier par", ["(ordre d'origine)"] + list(sort_columns), key=f"{key}_tri")
+        descending = order_col.checkbox("Décroissant", key=f"{key}_desc")
+    return filters, sort_by if sort_by in sort_columns else None, descending
+
+
+def _pager(key, n_rows):
+    """Sélecteurs de taille et de numéro de page ; renvoie (page, taille de page)"""
+    size_col, page_col = st.columns(2)
+    page_size = size_col.selectbox("Lignes par page", PAGE_SIZES, key=f"{key}_taille")
+    n_pages = max(1, -(-n_rows // page_size))
+    # Après un filtrage plus restrictif, revenir à la dernière page existante
+    page_key = f"{key}_page"
+    st.session_state[page_key] = min(st.session_state.get(page_key, 1), n_pages)
+    page = page_col.number_input(f"Page (sur {n_pages})", min_value=1, max_value=n_pages, step=1, key=page_key)
+    return page, page_size
+
+
+def _show_page(rows, page, page_size, n_view, n_total):
+    st.dataframe(rows, use_container_width=True)
+    start = (page - 1) * page_size
+    st.caption(f"Lignes {start + 1}–{min(start + page_size, n_view)} sur {n_view}"
+               + (f" (filtrées parmi {n_total})" if n_view != n_total else ""))
+
+
+def show_table(df, key, columns):
+    """Affiche un DataFrame page par page avec filtres (marque, année, prix, localisation) et tri"""
+    available = {role: col for role, col in columns.items() if col in df.columns}
+    brands = None
+    if 'marque' in available:
+        brands = sorted(b for b in brand_series(df[available['marque']]).dropna().unique() if b)
+    bounds = {role: _numeric_bounds(df[available[role]]) for role in ('annee', 'prix') if role in available}
+    filters, sort_by, descending = _filter_widgets(key, brands, bounds, 'adresse' in available, df.columns)
+
+    view = filter_frame(df, available, **filters)
+    if sort_by is not None:
+        view = view.sort_values(sort_by, ascending=not descending, na_position='last', kind='stable')
+
+    page, page_size = _pager(key, len(view))
+    if view.empty:
+        st.info("Aucune ligne ne correspond aux filtres.")
+        return
+    _show_page(page_slice(view, page, page_size), page, page_size, len(view), len(df))
+
+
+def show_store_table(store, jeu, key):
+    """Comme show_table, pour un jeu de l'entrepôt d'annonces : filtres, tri et découpage sont des
+    requêtes SQL, seule la page affichée est lue"""
+    bounds = {'annee': store.bounds(jeu, 'annee'), 'prix': store.bounds(jeu, 'prix')}
+    columns = [name for name, _ in store.columns(jeu)]
+    filters, sort_by, descending = _filter_widgets(key, store.distinct(jeu, 'marque'), bounds, True, columns)
+
+    n_total = store.count(jeu)
+    n_view = store.count(jeu, filters)
+    page, page_size = _pager(key, n_view)
+    if n_view == 0:
+        st.info("Aucune ligne ne correspond aux filtres.")
+        return
+    rows = store.page(jeu, filters, sort_by, descending, offset=(page - 1) * page_size, limit=page_size)
+    _show_page(rows, page, page_size, n_view, n_total)
+
+
+# Bouton de téléchargement : le fichier n'est généré (par blocs, compressé) qu'au clic ;
+# dataframe peut aussi être une fonction qui renvoie les blocs (jeu de l'entrepôt, source_key obligatoire).
+# L'écriture du fichier se fait par blocs, mais st.download_button sert des octets : le fichier compressé
+# est lu en entier en mémoire pour être envoyé
+def download_button(dataframe, filename, key, source_key=None):
+    fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key=f"format_{key}")
+
+    def build_file():
+        path = export_chunks(dataframe, filename, fmt, source_key) if callable(dataframe) \
+            else export_file(dataframe, filename, fmt, source_key)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    st.download_button(f"📥 Télécharger {filename}", data=build_file, file_name=download_name(filename, fmt),
+                       mime=mime_type(fmt), key=f"download_{key}", on_click='ignore')
@@ -0,0 +1,85 @@
+"""Fenêtre AIMD et disjoncteur d'un site (fetch_control.HostController)"""
+import threading
+import time
+
+import pytest
+
+from fetch_control import DISJONCTEUR_SEUIL, CircuitOpenError, FetchController, HostController
+
+
+def open_circuit(host):
+    for _ in range(DISJONCTEUR_SEUIL):
+        host.record_page(False)
+
+
+def test_congestion_halves_the_window_once_per_episode():
+    host = HostController(8)
+    host.acquire('http://site/1')
+    host.acquire('http://site/2')
+    host.release(congested=True)
+    assert host.limit == 4.0
+    # Les requêtes en vol échouent souvent ensemble : une seule réduction par épisode
+    host.release(congested=True)
+    assert host.limit == 4.0
+
+
+def test_success_grows_the_window_up_to_the_maximum():
+    host = HostController(2)
+    host.limit = 1.0
+    for _ in range(10):
+        host.acquire('http://site/')
+        host.release(congested=False)
+    assert host.limit == 2.0
+
+
+def test_open_circuit_fails_after_the_wait():
+    host = HostController(4, circuit_pause=60.0, circuit_wait=0.05)
+    open_circuit(host)
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        host.acquire('http://site/')
+    assert time.monotonic() - start >= 0.05
+
+
+def test_half_open_circuit_allows_a_single_probe():
+    host = HostController(4, circuit_pause=0.1, circuit_wait=5.0)
+    open_circuit(host)
+    # La première requête attend la fin de la pause, puis passe seule (requête test)
+    host.acquire('http://site/1')
+    second = threading.Thread(target=host.acquire, args=('http://site/2',), daemon=True)
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+
+    # Requête test réussie : le disjoncteur se referme et la fenêtre normale s'applique
+    host.release(congested=False)
+    host.record_page(True)
+    second.join(1.0)
+    assert not second.is_alive()
+    assert host.opened_at is None
+    assert host.in_flight == 1
+
+
+def test_each_crawl_keeps_its_own_limit():
+    controller = FetchController()
+    host = controller.host('http://site/a', 2)
+    # Un crawl plus strict ne change pas la limite d'un autre crawl du même site, et inversement
+    assert controller.host('http://site/b', 8) is host
+    for _ in range(50):
+        host.acquire('http://site/', 8)
+        host.release(congested=False, max_limit=8)
+    assert host.limit == 8.0
+
+    for i in range(2):
+        host.acquire(f'http://site/{i}', 2)
+    waiting = threading.Thread(target=host.acquire, args=('http://site/3', 2), daemon=True)
+    waiting.start()
+    waiting.join(0.1)
+    assert waiting.is_alive()
+    # Le crawl moins strict a encore de la place dans sa fenêtre
+    host.acquire('http://site/4', 8)
+    assert host.in_flight == 3
+
+    # Congestion vue par le crawl strict : sa fenêtre (2) est divisée par deux
+    host.release(congested=True, max_limit=2)
+    assert host.limit == 1.0
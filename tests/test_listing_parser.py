@@ -0,0 +1,24 @@
+"""Les backends de parsing renvoient les mêmes lignes (listing_parser)"""
+import pytest
+
+from benchmarks.bench_parser import single_card_page
+from benchmarks.fixtures import build_pages
+from listing_parser import BACKENDS, SPECS, parse_listing_page
+
+
+@pytest.mark.parametrize('category', list(SPECS))
+def test_backends_agree(category):
+    pages = build_pages(category, 3)
+    expected = [parse_listing_page(page, category, 'html.parser', with_id=True) for page in pages]
+    assert all(expected)
+    for name in BACKENDS:
+        assert [parse_listing_page(page, category, name, with_id=True) for page in pages] == expected, name
+
+
+@pytest.mark.parametrize('name', list(BACKENDS))
+def test_single_card_page(name):
+    # Fragment réduit à une seule carte : elle en est la racine
+    page = single_card_page(build_pages('voitures', 1)[0])
+    rows = parse_listing_page(page, 'voitures', name, with_id=True)
+    assert rows == parse_listing_page(page, 'voitures', 'html.parser', with_id=True)
+    assert len(rows) == 1
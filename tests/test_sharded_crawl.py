@@ -0,0 +1,70 @@
+"""Baux des tranches et fusion d'un crawl découpé (sharded_crawl)"""
+import pandas as pd
+import pytest
+
+import dedup
+import sharded_crawl
+from crawl_log import CrawlLog
+from scraping_functions import PageBatch
+from sharded_crawl import PRIS, LeaseHeartbeat, LeaseTable, merge_shards, shard_log_path
+
+BASE_URL = 'http://site/annonces/voitures'
+
+
+@pytest.fixture
+def leases(tmp_path):
+    table = LeaseTable(str(tmp_path))
+    table.plan('voitures', 100, shard_pages=50, base_url=BASE_URL)
+    yield table
+    table.close()
+
+
+def test_live_lease_is_not_taken_twice(leases):
+    assert leases.acquire('w1') == (0, 1, 50)
+    assert leases.acquire('w2') == (1, 51, 100)
+    assert leases.acquire('w3') is None
+
+
+def test_expired_lease_is_stolen(leases, monkeypatch):
+    monkeypatch.setattr(sharded_crawl, 'LEASE_SECONDS', -1)
+    leases.acquire('w1')
+    monkeypatch.setattr(sharded_crawl, 'LEASE_SECONDS', 120)
+    # Bail de w1 expiré : un autre worker reprend la tranche, w1 ne peut plus ni la prolonger ni la terminer
+    assert leases.acquire('w2') == (0, 1, 50)
+    assert leases.attempts(0) == 2
+    assert not leases.renew(0, 'w1')
+    leases.finish(0, 'w1')
+    assert leases.progress()[PRIS] == 1
+    assert leases.renew(0, 'w2')
+
+
+def test_heartbeat_reports_a_stolen_lease(tmp_path, leases, monkeypatch):
+    monkeypatch.setattr(sharded_crawl, 'LEASE_SECONDS', -1)
+    leases.acquire('w1')
+    with LeaseHeartbeat(str(tmp_path), 0, 'w1', interval=0.01) as heartbeat:
+        assert leases.acquire('w2') == (0, 1, 50)
+        assert heartbeat.lost.wait(2.0)
+
+
+def write_shard(crawl_dir, shard, pages):
+    with CrawlLog(shard_log_path(crawl_dir, shard), 'voitures', BASE_URL) as log:
+        for page, ids in pages.items():
+            rows = [{'annonce_id': i, 'V1': f'Marque {i}', 'V3': f'{page} 000 F CFA'} for i in ids]
+            log.append(PageBatch(page, f'{BASE_URL}?page={page}', rows, True))
+
+
+def test_merge_keeps_the_last_version_of_each_listing(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup, 'HISTORY_PATH', str(tmp_path / 'historique.sqlite'))
+    crawl_dir = str(tmp_path / 'crawl')
+    table = LeaseTable(crawl_dir)
+    table.plan('voitures', 4, shard_pages=2, base_url=BASE_URL)
+    table.close()
+    # L'annonce 3 a glissé de la page 2 à la page 3 pendant le crawl : elle apparaît dans les deux tranches
+    write_shard(crawl_dir, 0, {1: [1, 2], 2: [3]})
+    write_shard(crawl_dir, 1, {3: [3, 4], 4: [5]})
+
+    output = str(tmp_path / 'fusion.csv')
+    assert merge_shards(crawl_dir, output) == 5
+    df = pd.read_csv(output)
+    assert df['annonce_id'].tolist() == [1, 2, 3, 4, 5]
+    assert df.loc[df['annonce_id'] == 3, 'V3'].item() == '3 000 F CFA'